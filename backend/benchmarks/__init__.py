@@ -0,0 +1,58 @@
+"""
+Offline benchmarks for the backend.
+
+Each module is runnable on its own, e.g. ``python -m benchmarks.home_cache``.
+They run against a throwaway in-memory SQLite database and Django's test
+client, so no running server, Postgres or Redis is needed.
+"""
+import os
+import time
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "my_app_17226.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["DATABASE_URL"] = "sqlite://:memory:"
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    django.setup()
+    settings.ALLOWED_HOSTS = ["*"]
+    settings.STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+    # The benchmarks log in and sign up far more often than the throttles allow.
+    settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] = {}
+    call_command("migrate", verbosity=0, interactive=False)
+
+
+def measure(func, iterations=500, warmup=20):
+    """Call `func` repeatedly and return a dict of timing figures."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "iterations": iterations,
+        "requests_per_sec": round(iterations / total, 1),
+        "mean_ms": round(total / iterations * 1000, 3),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1] * 1000, 3),
+    }
+
+
+def report(title, rows):
+    """Print `rows` (name -> measure() result) as an aligned table."""
+    print(title)
+    for name, result in rows.items():
+        line = "  {:<24} {:>10} req/s  mean {:>8} ms  p99 {:>8} ms".format(
+            name, result["requests_per_sec"], result["mean_ms"], result["p99_ms"]
+        )
+        if "queries" in result:
+            line += "  queries {:>3}/{}".format(result["queries"], result["budget"])
+        print(line)
@@ -0,0 +1,121 @@
+"""
+Throughput of the waitress (WSGI) and uvicorn (ASGI) setups side by side.
+
+Both servers are started as subprocesses against the same throwaway SQLite
+database and hit with `clients` concurrent keep-alive connections, more than
+either server has worker threads. Needs uvicorn (`pipenv install --dev`).
+
+    $ python -m benchmarks.asgi_vs_wsgi [seconds] [clients]
+"""
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+THREADS = 4
+PATHS = ["/", "/api/v1/customtext/", "/api/v1/homepage/"]
+
+
+def run_manage(env, *args):
+    return subprocess.run(
+        [sys.executable, "manage.py"] + list(args),
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    ).stdout.decode()
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server on port %d did not start" % port)
+
+
+def load(port, token, seconds, clients):
+    counts = [0] * clients
+    errors = [0] * clients
+    deadline = time.monotonic() + seconds
+
+    def client(index):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        headers = {"Authorization": "Token " + token}
+        i = index
+        while time.monotonic() < deadline:
+            path = PATHS[i % len(PATHS)]
+            i += 1
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status == 200:
+                    counts[index] += 1
+                else:
+                    errors[index] += 1
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"requests_per_sec": round(sum(counts) / seconds, 1), "errors": sum(errors)}
+
+
+def main(seconds=10, clients=32):
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        SECRET_KEY="benchmark",
+        DATABASE_URL="sqlite:///" + os.path.join(tmp, "db.sqlite3"),
+        ASGI_THREADS=str(THREADS),
+    )
+    run_manage(env, "migrate", "--no-input")
+    run_manage(env, "collectstatic", "--no-input")
+    token = run_manage(
+        env,
+        "shell",
+        "-c",
+        "from django.contrib.auth import get_user_model;"
+        "from rest_framework.authtoken.models import Token;"
+        "user = get_user_model().objects.create_superuser('bench', 'bench@example.com', 'bench');"
+        "print(Token.objects.create(user=user).key)",
+    ).strip()
+
+    servers = {
+        "waitress (wsgi)": (
+            8765,
+            ["waitress-serve", "--port=8765", "--threads=%d" % THREADS, "my_app_17226.wsgi:application"],
+        ),
+        "uvicorn (asgi)": (
+            8766,
+            [sys.executable, "-m", "uvicorn", "my_app_17226.asgi:application", "--port", "8766", "--no-access-log"],
+        ),
+    }
+    print("GET %s, %d clients, %d worker threads, %ss each" % (", ".join(PATHS), clients, THREADS, seconds))
+    for name, (port, command) in servers.items():
+        process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            result = load(port, token, seconds, clients)
+        finally:
+            process.terminate()
+            process.wait()
+        print("  {:<16} {:>10} req/s  errors {}".format(name, result["requests_per_sec"], result["errors"]))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
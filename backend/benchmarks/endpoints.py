@@ -0,0 +1,234 @@
+"""
+Timing and query counts of the main endpoints, checked against budgets.
+
+Every endpoint in ENDPOINTS has a query budget: the number of queries one
+request may run once caches are warm. The run fails (exit status 1) if any
+endpoint goes over its budget, and the results are written as JSON so runs
+can be compared, e.g. before and after a change:
+
+    $ python -m benchmarks.endpoints --output before.json
+    $ python -m benchmarks.endpoints --compare before.json
+
+home/tests/test_query_budgets.py checks the same budgets in the test suite.
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+PASSWORD = "bench-Passw0rd"
+
+
+class Endpoint:
+    """One request to benchmark.
+
+    `client` names one of the clients built by make_clients(). `path` and
+    `data` may be callables taking the fixtures dict, for values that depend
+    on created objects or must differ between requests.
+    """
+
+    def __init__(self, name, method, path, budget, client="anonymous", data=None, status=200):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.budget = budget
+        self.client = client
+        self.data = data
+        self.status = status
+
+    def request(self, clients, fixtures):
+        client = clients[self.client]
+        path = self.path(fixtures) if callable(self.path) else self.path
+        data = self.data(fixtures) if callable(self.data) else self.data
+        if self.method == "GET":
+            return client.get(path)
+        if self.method == "PATCH":
+            return client.patch(path, json.dumps(data), content_type="application/json")
+        return client.post(path, data)
+
+
+_emails = itertools.count()
+
+
+def signup_data(fixtures):
+    return {"email": "signup%d@example.com" % next(_emails), "password": PASSWORD, "name": "Signup"}
+
+
+ENDPOINTS = [
+    Endpoint("home", "GET", "/", budget=0),
+    Endpoint(
+        "login",
+        "POST",
+        "/api/v1/login/",
+        budget=2,
+        data={"username": "bench-user", "password": PASSWORD},
+    ),
+    Endpoint("signup", "POST", "/api/v1/signup/", budget=9, data=signup_data, status=201),
+    Endpoint("customtext list", "GET", "/api/v1/customtext/", budget=1, client="admin"),
+    Endpoint(
+        "customtext detail",
+        "GET",
+        lambda fixtures: "/api/v1/customtext/%d/" % fixtures["customtext"].pk,
+        budget=1,
+        client="admin",
+    ),
+    Endpoint(
+        "customtext patch",
+        "PATCH",
+        lambda fixtures: "/api/v1/customtext/%d/" % fixtures["customtext"].pk,
+        budget=3,
+        client="admin",
+        data={"title": "Benchmark"},
+    ),
+    Endpoint("homepage list", "GET", "/api/v1/homepage/", budget=1, client="admin"),
+    Endpoint(
+        "homepage detail",
+        "GET",
+        lambda fixtures: "/api/v1/homepage/%d/" % fixtures["homepage"].pk,
+        budget=1,
+        client="admin",
+    ),
+    Endpoint(
+        "homepage patch",
+        "PATCH",
+        lambda fixtures: "/api/v1/homepage/%d/" % fixtures["homepage"].pk,
+        budget=3,
+        client="admin",
+        data={"body": "<p>Benchmark</p>"},
+    ),
+    Endpoint(
+        "users detail",
+        "GET",
+        lambda fixtures: "/users/%s/" % fixtures["user"].username,
+        budget=3,
+        client="user",
+    ),
+    Endpoint("users update form", "GET", "/users/~update/", budget=3, client="user"),
+    Endpoint(
+        "users update",
+        "POST",
+        "/users/~update/",
+        budget=5,
+        client="user",
+        data={"name": "Bench User"},
+        status=302,
+    ),
+]
+
+
+def create_fixtures():
+    from django.contrib.auth import get_user_model
+    from rest_framework.authtoken.models import Token
+
+    from home.models import CustomText, HomePage
+
+    User = get_user_model()
+    admin = User.objects.create_superuser("bench-admin", "admin@example.com", PASSWORD)
+    return {
+        "admin": admin,
+        "token": Token.objects.create(user=admin),
+        "user": User.objects.create_user("bench-user", "user@example.com", PASSWORD),
+        "customtext": CustomText.objects.first(),
+        "homepage": HomePage.objects.first(),
+    }
+
+
+def make_clients(fixtures):
+    from django.test import Client
+
+    user = Client()
+    user.force_login(fixtures["user"])
+    return {
+        "anonymous": Client(),
+        "admin": Client(HTTP_AUTHORIZATION="Token %s" % fixtures["token"].key),
+        "user": user,
+    }
+
+
+TRANSACTION_STATEMENTS = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE SAVEPOINT")
+
+
+def count_queries(endpoint, clients, fixtures):
+    """Queries run by one request, after a first request has warmed caches.
+
+    Transaction control statements are left out: they differ between
+    autocommit and the test suite's wrapping transaction.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    response = endpoint.request(clients, fixtures)
+    if response.status_code != endpoint.status:
+        raise AssertionError(
+            "%s returned %d, expected %d" % (endpoint.name, response.status_code, endpoint.status)
+        )
+    with CaptureQueriesContext(connection) as queries:
+        endpoint.request(clients, fixtures)
+    return sum(1 for query in queries if not query["sql"].startswith(TRANSACTION_STATEMENTS))
+
+
+def compare(results, previous):
+    print("Compared with %s" % previous["created"])
+    before = previous["endpoints"]
+    for name, result in results["endpoints"].items():
+        if name not in before:
+            continue
+        print(
+            "  {:<24} {:>+8.1f}% req/s  queries {} -> {}".format(
+                name,
+                (result["requests_per_sec"] / before[name]["requests_per_sec"] - 1) * 100,
+                before[name]["queries"],
+                result["queries"],
+            )
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("iterations", nargs="?", type=int, default=100)
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="JSON file from an earlier run to compare against.")
+    args = parser.parse_args(argv)
+
+    from benchmarks import measure, report, setup_django
+
+    setup_django()
+    fixtures = create_fixtures()
+    clients = make_clients(fixtures)
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "endpoints": {},
+    }
+    over_budget = []
+    for endpoint in ENDPOINTS:
+        queries = count_queries(endpoint, clients, fixtures)
+        result = measure(lambda: endpoint.request(clients, fixtures), args.iterations, warmup=5)
+        result.update(queries=queries, budget=endpoint.budget)
+        results["endpoints"][endpoint.name] = result
+        if queries > endpoint.budget:
+            over_budget.append(endpoint)
+
+    report("Endpoints (%d iterations)" % args.iterations, results["endpoints"])
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    for endpoint in over_budget:
+        print(
+            "Over budget: %s ran %d queries, budget is %d"
+            % (endpoint.name, results["endpoints"][endpoint.name]["queries"], endpoint.budget),
+            file=sys.stderr,
+        )
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
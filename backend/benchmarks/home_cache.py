@@ -0,0 +1,35 @@
+"""
+Requests/sec of `home.views.home` with and without the versioned page cache.
+
+    $ python -m benchmarks.home_cache [iterations]
+"""
+import sys
+
+from benchmarks import measure, report, setup_django
+
+
+def main(iterations=500):
+    setup_django()
+
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+
+    client = Client()
+
+    def get_home():
+        client.get("/")
+
+    with override_settings(HOME_CACHE_ENABLED=False):
+        before = measure(get_home, iterations)
+    cache.clear()
+    after = measure(get_home, iterations)
+
+    report(
+        "home.views.home (anonymous)",
+        {"uncached": before, "versioned cache": after},
+    )
+    print("  speedup: {:.1f}x".format(after["requests_per_sec"] / before["requests_per_sec"]))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,49 @@
+"""
+The database session engine against my_app_17226.sessions on the users views.
+
+    $ python -m benchmarks.sessions [iterations]
+"""
+import sys
+
+from benchmarks import measure, report, setup_django
+
+ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cache + write-behind": "my_app_17226.sessions",
+}
+
+
+def main(iterations=500):
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+
+    user = get_user_model().objects.create_user("bench", "bench@example.com", "bench")
+    views = {
+        "users detail": lambda client: client.get("/users/bench/"),
+        "users update form": lambda client: client.get("/users/~update/"),
+        "users update": lambda client: client.post("/users/~update/", {"name": "Bench"}),
+    }
+
+    for name, view in views.items():
+        rows = {}
+        for engine_name, engine in ENGINES.items():
+            with override_settings(SESSION_ENGINE=engine):
+                client = Client()
+                client.force_login(user)
+                view(client)
+                with CaptureQueriesContext(connection) as queries:
+                    view(client)
+                session_queries = sum("django_session" in query["sql"] for query in queries)
+                rows[engine_name] = measure(lambda: view(client), iterations)
+                rows[engine_name]["session_queries"] = session_queries
+        report(name, rows)
+        for engine_name, result in rows.items():
+            print("  {:<24} {} django_session queries per request".format(engine_name, result["session_queries"]))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
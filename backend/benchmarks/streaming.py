@@ -0,0 +1,71 @@
+"""
+Peak memory of listing a large table: regular DRF list vs ?stream=json/ndjson.
+
+The regular list is measured with pagination turned off, which is what an
+export had to do before streaming. Peak memory is traced with tracemalloc
+while the response is built and its body consumed.
+
+    $ python -m benchmarks.streaming [rows]
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmarks import setup_django
+
+
+def consume(response):
+    size = 0
+    if response.streaming:
+        for chunk in response.streaming_content:
+            size += len(chunk)
+    else:
+        size = len(response.content)
+    return size
+
+
+def run(client, url):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = consume(client.get(url))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_mb": round(peak / 1024 / 1024, 1), "seconds": round(elapsed, 2), "body_mb": round(size / 1024 / 1024, 1)}
+
+
+def main(rows=20000):
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from rest_framework.authtoken.models import Token
+
+    from home.api.v1.viewsets import HomePageViewSet
+    from home.models import HomePage
+
+    body = "<p>%s</p>" % ("Lorem ipsum dolor sit amet. " * 40)
+    HomePage.objects.bulk_create((HomePage(body=body) for _ in range(rows)), batch_size=200)
+    admin = get_user_model().objects.create_superuser("bench", "bench@example.com", "bench")
+    client = Client(HTTP_AUTHORIZATION="Token %s" % Token.objects.create(user=admin).key)
+
+    results = {}
+    HomePageViewSet.pagination_class = None
+    try:
+        results["list (unpaginated)"] = run(client, "/api/v1/homepage/")
+    finally:
+        del HomePageViewSet.pagination_class
+    results["?stream=json"] = run(client, "/api/v1/homepage/?stream=json")
+    results["?stream=ndjson"] = run(client, "/api/v1/homepage/?stream=ndjson")
+
+    print("GET /api/v1/homepage/ with %d rows" % rows)
+    for name, result in results.items():
+        print(
+            "  {:<20} peak {:>8} MB  body {:>6} MB  {:>6} s".format(
+                name, result["peak_mb"], result["body_mb"], result["seconds"]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,64 @@
+import os
+from contextlib import contextmanager
+
+import django
+import pytest
+
+
+def pytest_configure(config):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "my_app_17226.settings")
+    os.environ.setdefault("SECRET_KEY", "test")
+    # A second SQLite database standing in for a read replica. Routing to it
+    # is switched on by the tests that cover it, see _test_settings.
+    os.environ["DATABASE_REPLICA_URLS"] = "sqlite://:memory:"
+    django.setup()
+
+
+@pytest.fixture(autouse=True)
+def _test_settings(settings):
+    from django.core.cache import cache
+
+    # Manifest storage needs a collectstatic run to resolve {% static %}.
+    settings.STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+    settings.DATABASE_REPLICAS = []
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user():
+    from users.tests.factories import UserFactory
+
+    return UserFactory()
+
+
+@pytest.fixture
+def request_factory():
+    from django.test import RequestFactory
+
+    return RequestFactory()
+
+
+@pytest.fixture
+def on_commit_callbacks():
+    """Run the transaction.on_commit() callbacks registered in a block.
+
+    Tests run inside a transaction that is rolled back, so the callbacks
+    would otherwise never run:
+
+        with on_commit_callbacks():
+            obj.save()
+    """
+    from django.db import DEFAULT_DB_ALIAS, connections
+
+    @contextmanager
+    def run(using=DEFAULT_DB_ALIAS):
+        connection = connections[using]
+        start = len(connection.run_on_commit)
+        yield
+        while len(connection.run_on_commit) > start:
+            _sids, callback = connection.run_on_commit.pop(start)
+            callback()
+
+    return run
@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from home.models import QueuedEmail
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'from_email', 'recipients', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipients',)
+    readonly_fields = ('message', 'created_at', 'sent_at')
@@ -0,0 +1,248 @@
+import base64
+import copy
+import hashlib
+import hmac
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.crypto import salted_hmac
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from home.cache import LRUCache
+
+
+class TokenCache:
+    """Resolved token -> (user, token) pairs, kept per process.
+
+    When `TOKEN_AUTH_SHARED_CACHE` names a cache alias, misses fall back to
+    that cache before going to the database. Invalidation clears both tiers;
+    entries held by other processes expire after `TOKEN_AUTH_CACHE_TTL`.
+    """
+
+    def __init__(self):
+        self.local = LRUCache(settings.TOKEN_AUTH_CACHE_SIZE, settings.TOKEN_AUTH_CACHE_TTL)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def shared(self):
+        alias = settings.TOKEN_AUTH_SHARED_CACHE
+        return caches[alias] if alias else None
+
+    def make_key(self, key):
+        return "auth:token:%s" % hashlib.sha256(key.encode()).hexdigest()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        cache_key = self.make_key(key)
+        value = self.local.get(cache_key)
+        if value is not None:
+            self._count("hits")
+            return value
+        if self.shared is not None:
+            value = self.shared.get(cache_key)
+            if value is not None:
+                self._count("shared_hits")
+                self.local.set(cache_key, value)
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        cache_key = self.make_key(key)
+        self.local.set(cache_key, value)
+        if self.shared is not None:
+            self.shared.set(cache_key, value, settings.TOKEN_AUTH_SHARED_CACHE_TTL)
+
+    def invalidate(self, key):
+        cache_key = self.make_key(key)
+        self._count("invalidations")
+        self.local.delete(cache_key)
+        if self.shared is not None:
+            self.shared.delete(cache_key)
+
+    def invalidate_user(self, user_pk):
+        for key in Token.objects.filter(user_id=user_pk).values_list("key", flat=True):
+            self.invalidate(key)
+
+    def clear(self):
+        self.local.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size"] = len(self.local)
+        return stats
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that skips the Token -> User join on cache hits."""
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+        user, token = credentials
+        # Requests on other threads get the same cached instance, so each one
+        # gets its own copy to set attributes on.
+        return copy.copy(user), token
+
+
+# Signed access tokens
+#
+# With ACCESS_TOKENS_ENABLED, login also returns a short-lived access token,
+# "<user id>.<issued at, ms>.<expires at>.<key version>.<flags>.<signature>",
+# sent as "Authorization: Bearer <token>". Its HMAC-SHA256 signature,
+# expiry and the per-process revocation set are checked without touching
+# the database. The key version is derived from the password hash, so a
+# token stops working once the user row is read after a password change;
+# clients get a new token from api/v1/access-token/ with their Token key.
+
+STAFF = 1
+SUPERUSER = 2
+
+
+def key_version(user):
+    return salted_hmac("home.api.v1.access-token.version", user.password).hexdigest()[:8]
+
+
+def sign(payload):
+    key = hashlib.sha256(b"home.api.v1.access-token" + settings.SECRET_KEY.encode()).digest()
+    digest = hmac.new(key, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def issue_access_token(user):
+    """Return (token, lifetime in seconds) for `user`."""
+    now = time.time()
+    lifetime = settings.ACCESS_TOKEN_LIFETIME
+    flags = (STAFF if user.is_staff else 0) | (SUPERUSER if user.is_superuser else 0)
+    # Rounded up, so a revocation never covers a token issued after it.
+    issued_at = math.ceil(now * 1000)
+    payload = "%d.%d.%d.%s.%d" % (user.pk, issued_at, now + lifetime, key_version(user), flags)
+    return "%s.%s" % (payload, sign(payload)), lifetime
+
+
+class RevocationSet:
+    """user id -> time before which their access tokens are revoked.
+
+    Kept per process, so a revocation applies to the workers that saw it
+    (the Token and password signals run everywhere the change is made) and
+    lasts at most ACCESS_TOKEN_LIFETIME elsewhere. Entries are dropped
+    once every token they cover has expired.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked = {}
+
+    def revoke(self, user_id):
+        now = time.time()
+        with self._lock:
+            self._revoked[user_id] = now
+            horizon = now - settings.ACCESS_TOKEN_LIFETIME
+            for stale in [key for key, revoked_at in self._revoked.items() if revoked_at < horizon]:
+                del self._revoked[stale]
+
+    def is_revoked(self, user_id, issued_at):
+        revoked_at = self._revoked.get(user_id)
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def clear(self):
+        with self._lock:
+            self._revoked.clear()
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+revocations = RevocationSet()
+
+
+class TokenUser:
+    """The user of an access token, built from its claims.
+
+    `pk`, `id`, `is_staff`, `is_superuser` and `is_active` come from the
+    token. Any other attribute loads the user row once, and fails the
+    request if the password changed or the user was deactivated since the
+    token was issued.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, user_id, version, flags):
+        self.pk = self.id = user_id
+        self.key_version = version
+        self.is_staff = bool(flags & STAFF)
+        self.is_superuser = bool(flags & SUPERUSER)
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name == "_user":
+            raise AttributeError(name)
+        if "_user" not in self.__dict__:
+            user = get_user_model()._default_manager.filter(pk=self.pk).first()
+            if user is None or not user.is_active or key_version(user) != self.key_version:
+                raise AuthenticationFailed("Access token is no longer valid.")
+            self._user = user
+        return getattr(self._user, name)
+
+    def __eq__(self, other):
+        return getattr(other, "pk", None) == self.pk and getattr(other, "is_authenticated", False)
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return "user %d" % self.pk
+
+
+class AccessTokenAuthentication(BaseAuthentication):
+    """Authentication by "Bearer" access token, a no-op unless ACCESS_TOKENS_ENABLED."""
+
+    keyword = b"bearer"
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not settings.ACCESS_TOKENS_ENABLED or not auth or auth[0].lower() != self.keyword:
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed("Invalid access token header.")
+        token = auth[1].decode("latin-1")
+
+        payload, _, signature = token.rpartition(".")
+        # Bytes: compare_digest() refuses str with non-ASCII characters.
+        if not payload or not hmac.compare_digest(sign(payload).encode(), signature.encode("latin-1")):
+            raise AuthenticationFailed("Invalid access token.")
+        try:
+            user_id, issued_at, expires_at, version, flags = payload.split(".")
+            user_id, issued_at, expires_at, flags = int(user_id), int(issued_at) / 1000, int(expires_at), int(flags)
+        except ValueError:
+            # Signed, but not in the format issue_access_token() writes.
+            raise AuthenticationFailed("Invalid access token.")
+        if expires_at < time.time():
+            raise AuthenticationFailed("Access token expired.")
+        if revocations.is_revoked(user_id, issued_at):
+            raise AuthenticationFailed("Access token revoked.")
+        return TokenUser(user_id, version, flags), token
+
+    def authenticate_header(self, request):
+        return "Bearer"
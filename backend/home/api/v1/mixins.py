@@ -0,0 +1,266 @@
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from home.api.v1.renderers import NDJSONRenderer, stream_rows
+from home.cache import bump_content_version
+from home.models import VersionConflict
+from my_app_17226.metrics import timed
+from my_app_17226.page_cache import HOMEPAGE, purge_on_commit
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource has been modified since it was last fetched."
+    default_code = "precondition_failed"
+
+
+def serialize_rows(fast_serializer, rows):
+    """`rows` represented by a FastSerializer, timed once as serializer time."""
+    return [fast_serializer.to_representation(row) for row in rows]
+
+
+serialize_rows = timed("serialize", serialize_rows)
+
+
+def row_value(row, name):
+    """`name` of a model instance or of a `values()` dict."""
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+class ConditionalRequestMixin:
+    """ETag/Last-Modified support for viewsets over a `VersionedModel`.
+
+    GET requests answer `If-None-Match`/`If-Modified-Since` with a 304 before
+    the serializer runs. PUT/PATCH honor `If-Match`/`If-Unmodified-Since`, and
+    the write itself is conditional on the version the ETag was built from.
+    Lists are built with `fast_serializer_class` when the viewset sets one.
+    """
+
+    def get_etag(self, instance):
+        return '"%d-%d"' % (instance.pk, instance.version)
+
+    def get_list_etag(self, rows):
+        digest = hashlib.md5()
+        digest.update(self.request.accepted_renderer.format.encode())
+        for row in rows:
+            digest.update(b"%d-%d;" % (row_value(row, "id"), row_value(row, "version")))
+        if self.paginator is not None:
+            # Whether there is a next or previous page is part of the body too.
+            for link in (self.paginator.get_next_link(), self.paginator.get_previous_link()):
+                digest.update((link or "").encode() + b";")
+        return '"%s"' % digest.hexdigest()
+
+    def set_conditional_headers(self, response, etag, last_modified):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fast_serializer = getattr(self, "fast_serializer_class", None)
+        if fast_serializer is not None:
+            queryset = fast_serializer.values(queryset, "id", "version", "updated_at")
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        etag = self.get_list_etag(rows)
+        last_modified = max((row_value(row, "updated_at") for row in rows), default=None)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified and last_modified.timestamp()
+        )
+        if response is None:
+            if fast_serializer is not None:
+                data = serialize_rows(fast_serializer, rows)
+            else:
+                data = self.get_serializer(rows, many=True).data
+            if page is None:
+                response = Response(data)
+            else:
+                response = self.get_paginated_response(data)
+        return self.set_conditional_headers(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_etag(instance)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=instance.updated_at.timestamp()
+        )
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return self.set_conditional_headers(response, etag, instance.updated_at)
+
+    def get_object(self):
+        # retrieve() and update() already fetched the row for the precondition
+        # check, so hand the same instance to the DRF implementations.
+        if getattr(self, "_conditional_object", None) is None:
+            self._conditional_object = super().get_object()
+        return self._conditional_object
+
+    def update(self, request, *args, **kwargs):
+        instance = self.get_object()
+        response = get_conditional_response(
+            request,
+            etag=self.get_etag(instance),
+            last_modified=instance.updated_at.timestamp(),
+        )
+        if response is not None:
+            raise PreconditionFailed()
+        if_match = request.META.get("HTTP_IF_MATCH", "").strip()
+        if (if_match and if_match != "*") or "HTTP_IF_UNMODIFIED_SINCE" in request.META:
+            instance.expected_version = instance.version
+
+        response = super().update(request, *args, **kwargs)
+        return self.set_conditional_headers(
+            response, self.get_etag(instance), instance.updated_at
+        )
+
+    def perform_update(self, serializer):
+        try:
+            serializer.save()
+        except VersionConflict:
+            raise PreconditionFailed()
+
+
+class StreamingListMixin:
+    """Opt-in streaming of the whole, unpaginated list.
+
+    `?stream=json` streams a JSON array, `?stream=ndjson` or an
+    `Accept: application/x-ndjson` header streams NDJSON. Rows are read with
+    `iterator()` in batches of API_STREAM_CHUNK_SIZE (a server-side cursor on
+    Postgres) and serialized one at a time, so memory use doesn't grow with
+    the table. Unordered querysets are streamed in primary key order.
+    """
+
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [NDJSONRenderer]
+
+    def get_stream_format(self, request):
+        stream = request.query_params.get("stream")
+        if stream in ("json", "ndjson"):
+            return stream
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return NDJSONRenderer.format
+        return None
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format(request)
+        if stream_format is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if not queryset.ordered:
+            # Without an ORDER BY the database may return rows in any order,
+            # which can differ between the batches of a server-side cursor.
+            queryset = queryset.order_by("pk")
+        chunk_size = settings.API_STREAM_CHUNK_SIZE
+        fast_serializer = getattr(self, "fast_serializer_class", None)
+        if fast_serializer is not None:
+            rows = map(
+                fast_serializer.to_representation,
+                fast_serializer.values(queryset).iterator(chunk_size=chunk_size),
+            )
+        else:
+            serializer = self.get_serializer()
+            rows = map(serializer.to_representation, queryset.iterator(chunk_size=chunk_size))
+        ndjson = stream_format == NDJSONRenderer.format
+        return StreamingHttpResponse(
+            stream_rows(rows, ndjson=ndjson),
+            content_type=NDJSONRenderer.media_type if ndjson else "application/json",
+        )
+
+
+class BulkUpdateMixin:
+    """`PATCH <list url>bulk/` with a list of `{"id": ..., field: value}` items.
+
+    Items are validated with the viewset's serializer as partial updates. An
+    item may carry the `version` it was read at, in which case it is only
+    written if the row is still at that version. Either every item is
+    written, with one `bulk_update()` in one transaction, or none is and the
+    response is a 400 saying which items failed. At most
+    API_BULK_UPDATE_MAX_ITEMS items are accepted per request.
+    """
+
+    def get_bulk_items(self, data):
+        if not isinstance(data, list) or not data:
+            raise ValidationError("Expected a non-empty list of items.")
+        max_items = settings.API_BULK_UPDATE_MAX_ITEMS
+        if len(data) > max_items:
+            raise ValidationError("At most %d items can be updated at once." % max_items)
+        ids = []
+        for item in data:
+            if not isinstance(item, dict) or type(item.get("id")) is not int:
+                raise ValidationError("Every item must be an object with an integer id.")
+            ids.append(item["id"])
+        if len(set(ids)) != len(ids):
+            raise ValidationError("Every id may only appear once.")
+        return data
+
+    @action(detail=False, methods=["patch"], url_path="bulk")
+    def bulk_update(self, request):
+        items = self.get_bulk_items(request.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        with transaction.atomic():
+            instances = queryset.select_for_update().in_bulk([item["id"] for item in items])
+            results, valid, fields = [], [], set()
+            for item in items:
+                data = dict(item)
+                pk = data.pop("id")
+                expected_version = data.pop("version", None)
+                instance = instances.get(pk)
+                if instance is None:
+                    results.append({"id": pk, "status": "not_found"})
+                    continue
+                if expected_version is not None and expected_version != instance.version:
+                    results.append({"id": pk, "status": "conflict", "version": instance.version})
+                    continue
+                serializer = self.get_serializer(instance, data=data, partial=True)
+                if not serializer.is_valid():
+                    results.append({"id": pk, "status": "invalid", "errors": serializer.errors})
+                    continue
+                for field, value in serializer.validated_data.items():
+                    setattr(instance, field, value)
+                    fields.add(field)
+                results.append({"id": pk, "status": "valid"})
+                valid.append(instance)
+
+            if len(valid) < len(items):
+                return Response({"results": results}, status=status.HTTP_400_BAD_REQUEST)
+
+            # bulk_update() skips save(), so do what VersionedModel.save()
+            # and the post_save handlers would have done.
+            now = timezone.now()
+            for instance in valid:
+                instance.version = F("version") + 1
+                instance.updated_at = now
+            if fields:
+                queryset.model.objects.bulk_update(valid, fields | {"version", "updated_at"})
+        if fields:
+            transaction.on_commit(bump_content_version)
+            purge_on_commit(HOMEPAGE)
+
+        updated = queryset.filter(pk__in=[instance.pk for instance in valid])
+        fast_serializer = getattr(self, "fast_serializer_class", None)
+        if fast_serializer is not None:
+            rows = list(fast_serializer.values(updated))
+            data = {row["id"]: item for row, item in zip(rows, serialize_rows(fast_serializer, rows))}
+        else:
+            data = {instance.pk: self.get_serializer(instance).data for instance in updated}
+        return Response(
+            {
+                "results": [
+                    {"id": instance.pk, "status": "updated", "data": data[instance.pk]}
+                    for instance in valid
+                ]
+            }
+        )
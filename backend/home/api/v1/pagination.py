@@ -0,0 +1,20 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination on `id`, the default for the api/v1 list endpoints.
+
+    Each page is a single `WHERE id > <cursor> ORDER BY id LIMIT n + 1` query,
+    with no COUNT(*), and rows inserted while a client pages through the list
+    never shift or repeat items. Cursors are DRF's opaque base64 tokens. The
+    page size is REST_FRAMEWORK["PAGE_SIZE"], which clients can lower or raise
+    up to API_MAX_PAGE_SIZE with `?page_size=`.
+    """
+
+    ordering = "id"
+    page_size_query_param = "page_size"
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
@@ -0,0 +1,41 @@
+from rest_framework.renderers import JSONRenderer
+
+# Rows joined into one write of a streamed response.
+ROWS_PER_WRITE = 100
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Newline delimited JSON, one compact document per line.
+
+    A list renders as one line per item. List views stream their rows in
+    this format, see StreamingListMixin.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        return b"".join(super(NDJSONRenderer, self).render(row) + b"\n" for row in rows)
+
+
+def stream_rows(rows, ndjson=False):
+    """Encode an iterable of serialized rows as a JSON array or NDJSON, lazily."""
+    encode = JSONRenderer().render
+    if not ndjson:
+        yield b"["
+    buffer = []
+    for i, row in enumerate(rows):
+        if ndjson:
+            buffer.append(encode(row) + b"\n")
+        else:
+            buffer.append(encode(row) if i == 0 else b"," + encode(row))
+        if len(buffer) == ROWS_PER_WRITE:
+            yield b"".join(buffer)
+            buffer = []
+    if buffer:
+        yield b"".join(buffer)
+    if not ndjson:
+        yield b"]"
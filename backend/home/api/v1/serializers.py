@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
 from django.http import HttpRequest
 from django.utils.translation import ugettext_lazy as _
 from allauth.account import app_settings as allauth_settings
@@ -84,6 +85,88 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'name']
 
 
+class UserSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'name']
+
+
 class PasswordSerializer(PasswordResetSerializer):
     """Custom serializer for rest_auth to solve reset password error"""
     password_reset_form_class = ResetPasswordForm
+
+
+class FastSerializer:
+    """Read-only stand-in for a ModelSerializer, with the same output.
+
+    The fields of `serializer_class` are inspected once per class. Fields
+    whose `to_representation` returns database values as they are (integer
+    and char fields) are copied over, the rest keep their DRF conversion.
+    Rows come from `values()`, so only the serialized columns are fetched
+    and no model instances are built.
+    """
+
+    serializer_class = None
+
+    # to_representation methods that leave values from the database unchanged.
+    PLAIN = {serializers.CharField.to_representation, serializers.IntegerField.to_representation}
+
+    @classmethod
+    def get_fields(cls):
+        """(name, column, to_representation or None) for every readable field."""
+        if '_fields' not in cls.__dict__:
+            fields = []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                if not field.source or field.source == '*' or '.' in field.source:
+                    raise ImproperlyConfigured(
+                        "%s can't serialize %s.%s, only model columns are supported."
+                        % (cls.__name__, cls.serializer_class.__name__, name))
+                to_representation = field.to_representation
+                if to_representation.__func__ in cls.PLAIN:
+                    to_representation = None
+                fields.append((name, field.source, to_representation))
+            cls._fields = fields
+        return cls._fields
+
+    @classmethod
+    def values(cls, queryset, *extra):
+        """`queryset.values()` with the serialized columns plus `extra`."""
+        columns = [column for _, column, _ in cls.get_fields()]
+        return queryset.values(*dict.fromkeys(columns + list(extra)))
+
+    @classmethod
+    def to_representation(cls, row):
+        data = {}
+        for name, column, to_representation in cls.get_fields():
+            value = row[column]
+            if value is not None and to_representation is not None:
+                value = to_representation(value)
+            data[name] = value
+        return data
+
+    @classmethod
+    def from_instance(cls, instance):
+        return cls.to_representation(
+            {column: getattr(instance, column) for _, column, _ in cls.get_fields()})
+
+    @classmethod
+    def many(cls, queryset):
+        return [cls.to_representation(row) for row in cls.values(queryset)]
+
+
+class CustomTextFastSerializer(FastSerializer):
+    serializer_class = CustomTextSerializer
+
+
+class HomePageFastSerializer(FastSerializer):
+    serializer_class = HomePageSerializer
+
+
+class UserFastSerializer(FastSerializer):
+    serializer_class = UserSerializer
+
+
+class UserSearchFastSerializer(FastSerializer):
+    serializer_class = UserSearchSerializer
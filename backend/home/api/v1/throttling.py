@@ -0,0 +1,182 @@
+"""
+Throttling and load shedding for the endpoints that hash passwords.
+
+Login and signup run PBKDF2 on every call, so a burst of them can occupy
+every worker thread. Two defenses apply to api/v1/login, api/v1/signup and
+rest-auth/login:
+
+* Token buckets per client IP and per account (the submitted email or
+  username), with the rates of REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]
+  ("<n>/<period>": bursts of up to n requests, refilled at n per period).
+  The IP is read from X-Forwarded-For as REST_FRAMEWORK["NUM_PROXIES"]
+  says, so clients can't pick a fresh bucket by sending the header.
+  Buckets are kept in the THROTTLE_CACHE cache and updated atomically,
+  with a Lua script on Redis, so they hold across workers.
+* A gate of PASSWORD_HASHING_CONCURRENCY requests per process. A request
+  finding it full is answered right away instead of queueing for a
+  thread.
+
+Both answer 429 with a Retry-After header.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 60 * 60 * 24}
+
+# Generic cell rate algorithm: the bucket is stored as the time at which it
+# will be full again ("theoretical arrival time"). Returns 0 if the request
+# is allowed, or the seconds to wait.
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call("GET", KEYS[1]) or now), now)
+local wait = tat - burst - now
+if wait > 0 then
+    return tostring(wait)
+end
+redis.call("SET", KEYS[1], tostring(tat + interval), "PX", math.ceil((tat + interval - now) * 1000))
+return "0"
+"""
+
+
+def parse_rate(rate):
+    """"<n>/<period>" -> (n, seconds)"""
+    count, period = rate.split("/")
+    return int(count), PERIODS[period[0]]
+
+
+class TokenBuckets:
+    """Token buckets in a Django cache, keyed by name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._script = None
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    def take(self, key, capacity, period):
+        """Take a token from the bucket `key`. Returns 0, or the seconds until one is available."""
+        interval = period / capacity
+        burst = interval * (capacity - 1)
+        now = time.time()
+        cache = self.cache
+        client = getattr(cache, "client", None)
+        if hasattr(client, "get_client"):
+            # django-redis
+            if self._script is None:
+                self._script = client.get_client(write=True).register_script(GCRA_SCRIPT)
+            wait = self._script(keys=[cache.make_key(key)], args=[now, interval, burst],
+                                client=client.get_client(write=True))
+            return float(wait)
+
+        # In-process caches: the lock makes the read and write atomic.
+        with self._lock:
+            tat = max(cache.get(key) or now, now)
+            wait = tat - burst - now
+            if wait > 0:
+                return wait
+            cache.set(key, tat + interval, int(tat + interval - now) + 1)
+            return 0
+
+
+buckets = TokenBuckets()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base class, rate taken from DEFAULT_THROTTLE_RATES["<view.throttle_scope>_<kind>"]."""
+
+    kind = None
+
+    def get_ident_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_seconds = 0
+        if request.method != "POST":
+            return True
+        rate = settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"].get(
+            "%s_%s" % (view.throttle_scope, self.kind)
+        )
+        ident = self.get_ident_key(request)
+        if not rate or not ident:
+            return True
+        key = "throttle:%s:%s:%s" % (
+            view.throttle_scope, self.kind, hashlib.sha256(ident.encode()).hexdigest()
+        )
+        self.wait_seconds = buckets.take(key, *parse_rate(rate))
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPThrottle(TokenBucketThrottle):
+    kind = "ip"
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+
+class AccountThrottle(TokenBucketThrottle):
+    kind = "account"
+
+    def get_ident_key(self, request):
+        data = request.data
+        if not hasattr(data, "get"):
+            return None
+        account = data.get("email") or data.get("username")
+        if not isinstance(account, str):
+            return None
+        return account.strip().lower()
+
+
+class PasswordHashingGate:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def acquire(self):
+        with self._lock:
+            if self.active >= settings.PASSWORD_HASHING_CONCURRENCY:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+hashing_gate = PasswordHashingGate()
+
+
+class PasswordHashingMixin:
+    """Throttles POSTs per IP and account and passes them through `hashing_gate`."""
+
+    throttle_classes = [IPThrottle, AccountThrottle]
+    holds_hashing_gate = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method == "POST":
+            if not hashing_gate.acquire():
+                raise Throttled(
+                    wait=settings.PASSWORD_HASHING_RETRY_AFTER,
+                    detail="Too many concurrent sign-in requests, try again shortly.",
+                )
+            self.holds_hashing_gate = True
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.holds_hashing_gate:
+            self.holds_hashing_gate = False
+            hashing_gate.release()
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -4,15 +4,23 @@ from rest_framework.routers import DefaultRouter
 from home.api.v1.viewsets import (
     SignupViewSet,
     LoginViewSet,
+    AccessTokenViewSet,
     HomePageViewSet,
     CustomTextViewSet,
+    UserImportViewSet,
+    DatabasePoolViewSet,
+    UserSearchViewSet,
 )
 
 router = DefaultRouter()
 router.register("signup", SignupViewSet, basename="signup")
 router.register("login", LoginViewSet, basename="login")
+router.register("access-token", AccessTokenViewSet, basename="access-token")
 router.register("customtext", CustomTextViewSet)
 router.register("homepage", HomePageViewSet)
+router.register("import-users", UserImportViewSet, basename="import-users")
+router.register("db-pool", DatabasePoolViewSet, basename="db-pool")
+router.register("users/search", UserSearchViewSet, basename="user-search")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -1,28 +1,61 @@
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_auth.registration.views import RegisterView
+from rest_auth.views import LoginView
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.authtoken.serializers import AuthTokenSerializer
-from rest_framework.permissions import IsAdminUser
-from rest_framework.viewsets import ModelViewSet, ViewSet
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ParseError, PermissionDenied
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.viewsets import GenericViewSet, ModelViewSet, ViewSet
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 
+from home.api.v1.authentication import (
+    AccessTokenAuthentication,
+    CachedTokenAuthentication,
+    issue_access_token,
+    revocations,
+)
+from home.api.v1.mixins import (
+    BulkUpdateMixin,
+    ConditionalRequestMixin,
+    StreamingListMixin,
+    serialize_rows,
+)
 from home.api.v1.serializers import (
     SignupSerializer,
     CustomTextSerializer,
+    CustomTextFastSerializer,
     HomePageSerializer,
-    UserSerializer,
+    HomePageFastSerializer,
+    UserFastSerializer,
+    UserSearchSerializer,
+    UserSearchFastSerializer,
 )
+from home.api.v1.throttling import PasswordHashingMixin
 from home.models import CustomText, HomePage
+from home.user_import import FORMATS, UserImporter, read_rows
+from my_app_17226.db.pool import get_pool_stats
+from my_app_17226.db.routers import add_issued_credentials
+from users.search import search_users
+
+User = get_user_model()
 
 
-class SignupViewSet(ModelViewSet):
+class SignupViewSet(PasswordHashingMixin, ModelViewSet):
     serializer_class = SignupSerializer
     http_method_names = ["post"]
+    throttle_scope = "signup"
 
 
-class LoginViewSet(ViewSet):
+class LoginViewSet(PasswordHashingMixin, ViewSet):
     """Based on rest_framework.authtoken.views.ObtainAuthToken"""
 
     serializer_class = AuthTokenSerializer
+    throttle_scope = "login"
 
     def create(self, request):
         serializer = self.serializer_class(
@@ -31,21 +64,131 @@ class LoginViewSet(ViewSet):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data["user"]
         token, created = Token.objects.get_or_create(user=user)
-        user_serializer = UserSerializer(user)
-        return Response({"token": token.key, "user": user_serializer.data})
+        data = {"token": token.key, "user": UserFastSerializer.from_instance(user)}
+        add_issued_credentials(request, "Token %s" % token.key)
+        if settings.ACCESS_TOKENS_ENABLED:
+            data["access_token"], data["expires_in"] = issue_access_token(user)
+            add_issued_credentials(request, "Bearer %s" % data["access_token"])
+        return Response(data)
+
+
+class AccessTokenViewSet(ViewSet):
+    """Signed access tokens, see home.api.v1.authentication.
+
+    POST with "Authorization: Token <key>" returns a new access token.
+    POST revoke/ logs out: it revokes the user's access tokens and deletes
+    their Token.
+    """
+
+    authentication_classes = (AccessTokenAuthentication, CachedTokenAuthentication)
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request):
+        if not settings.ACCESS_TOKENS_ENABLED:
+            raise NotFound()
+        if not isinstance(request.auth, Token):
+            raise PermissionDenied("Access tokens are refreshed with a Token key.")
+        access_token, expires_in = issue_access_token(request.user)
+        add_issued_credentials(request, "Bearer %s" % access_token)
+        return Response({"access_token": access_token, "expires_in": expires_in})
 
+    @action(detail=False, methods=["post"])
+    def revoke(self, request):
+        revocations.revoke(request.user.pk)
+        Token.objects.filter(user_id=request.user.pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-class CustomTextViewSet(ModelViewSet):
+
+class RestAuthLoginView(PasswordHashingMixin, LoginView):
+    """rest-auth/login, sharing the login buckets of LoginViewSet."""
+
+    throttle_scope = "login"
+
+    def get_response(self):
+        add_issued_credentials(self.request, "Token %s" % self.token.key)
+        return super().get_response()
+
+
+class RestAuthRegisterView(RegisterView):
+    """rest-auth/registration, pinning the token it returns to the primary."""
+
+    def get_response_data(self, user):
+        data = super().get_response_data(user)
+        if "key" in data:
+            add_issued_credentials(self.request, "Token %s" % data["key"])
+        return data
+
+
+class CustomTextViewSet(
+    BulkUpdateMixin, StreamingListMixin, ConditionalRequestMixin, ModelViewSet
+):
     serializer_class = CustomTextSerializer
+    fast_serializer_class = CustomTextFastSerializer
     queryset = CustomText.objects.all()
-    authentication_classes = (SessionAuthentication, TokenAuthentication)
+    authentication_classes = (SessionAuthentication, AccessTokenAuthentication, CachedTokenAuthentication)
     permission_classes = [IsAdminUser]
     http_method_names = ["get", "put", "patch"]
 
 
-class HomePageViewSet(ModelViewSet):
+class HomePageViewSet(
+    BulkUpdateMixin, StreamingListMixin, ConditionalRequestMixin, ModelViewSet
+):
     serializer_class = HomePageSerializer
+    fast_serializer_class = HomePageFastSerializer
     queryset = HomePage.objects.all()
-    authentication_classes = (SessionAuthentication, TokenAuthentication)
+    authentication_classes = (SessionAuthentication, AccessTokenAuthentication, CachedTokenAuthentication)
     permission_classes = [IsAdminUser]
     http_method_names = ["get", "put", "patch"]
+
+
+class UserImportViewSet(ViewSet):
+    """Bulk user import from an uploaded CSV or JSONL `file`, see home.user_import."""
+
+    authentication_classes = (SessionAuthentication, AccessTokenAuthentication, CachedTokenAuthentication)
+    permission_classes = [IsAdminUser]
+    parser_classes = (MultiPartParser,)
+
+    def create(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ParseError("A CSV or JSONL file is required.")
+        input_format = request.data.get("input_format") or upload.name.rsplit(".", 1)[-1]
+        if input_format not in FORMATS:
+            raise ParseError("Unknown format, expected one of %s." % ", ".join(FORMATS))
+
+        # Passwords are hashed in this thread: a process pool would fork the
+        # web server. The import_users command uses one.
+        stats = UserImporter(workers=0, verified=request.data.get("verified") == "true").run(
+            read_rows(upload, input_format)
+        )
+        return Response(
+            stats, status=status.HTTP_201_CREATED if stats["created"] else status.HTTP_200_OK
+        )
+
+
+class DatabasePoolViewSet(ViewSet):
+    """Connection pool statistics of the worker serving the request."""
+
+    authentication_classes = (SessionAuthentication, AccessTokenAuthentication, CachedTokenAuthentication)
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        return Response(get_pool_stats())
+
+
+class UserSearchViewSet(GenericViewSet):
+    """Users whose name, email or username contain every word of `?q=`, see users.search."""
+
+    queryset = User.objects.all()
+    serializer_class = UserSearchSerializer
+    fast_serializer_class = UserSearchFastSerializer
+    authentication_classes = (SessionAuthentication, AccessTokenAuthentication, CachedTokenAuthentication)
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        term = request.query_params.get("q", "").strip()
+        if not term:
+            raise ParseError('The "q" parameter is required.')
+        queryset = self.fast_serializer_class.values(search_users(self.get_queryset(), term))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(serialize_rows(self.fast_serializer_class, page))
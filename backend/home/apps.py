@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class HomeConfig(AppConfig):
     name = 'home'
+
+    def ready(self):
+        import home.signals  # noqa F401
+        import my_app_17226.checks  # noqa F401
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from home.models import CustomText, HomePage
+
+CONTENT_VERSION_KEY = "home:content-version"
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with an optional per-entry TTL."""
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return default
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def get_content_version():
+    """Current version of the home page content.
+
+    The initial value is time based so that a version evicted from the cache
+    never comes back with a number that older entries are still keyed by.
+    """
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        cache.add(CONTENT_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CONTENT_VERSION_KEY)
+    return version
+
+
+def bump_content_version():
+    try:
+        return cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        return get_content_version()
+
+
+def get_home_content():
+    """Fragment cache for the CustomText/HomePage rows shown on the home page."""
+    key = "home:content:%s" % get_content_version()
+    content = cache.get(key) if settings.HOME_CACHE_ENABLED else None
+    if content is None:
+        # Filled right after a version bump, when a replica may still have
+        # the old rows.
+        using = "default" if settings.HOME_CACHE_ENABLED else None
+        content = {
+            "customtext": CustomText.objects.using(using).first(),
+            "homepage": HomePage.objects.using(using).first(),
+        }
+        if settings.HOME_CACHE_ENABLED:
+            cache.set(key, content, settings.HOME_CACHE_TIMEOUT)
+    return content
+
+
+def cache_home_page(view_func):
+    """Cache the rendered page for anonymous GET requests, keyed by content version.
+
+    Authenticated users see the login state and the inline editor, so they only
+    benefit from the fragment cache in `get_home_content`.
+    """
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if (
+            not settings.HOME_CACHE_ENABLED
+            or request.method not in ("GET", "HEAD")
+            or request.user.is_authenticated
+        ):
+            return view_func(request, *args, **kwargs)
+
+        key = "home:page:%s:%s" % (get_content_version(), request.build_absolute_uri())
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                cache.set(
+                    key,
+                    (response.content, response["Content-Type"]),
+                    settings.HOME_CACHE_TIMEOUT,
+                )
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+    return _wrapped_view
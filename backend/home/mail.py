@@ -0,0 +1,198 @@
+"""
+Outgoing email queue.
+
+QueuedEmailBackend is the EMAIL_BACKEND when EMAIL_QUEUE_ENABLED is set:
+sending a message only stores it in the QueuedEmail table, so signup,
+password reset and allauth confirmations don't wait for SMTP.
+EmailQueueWorker (the send_queued_email command) drains the table in
+batches over one SMTP connection, opened with EMAIL_QUEUE_TRANSPORT
+(Django's SMTP backend, so EMAIL_HOST, EMAIL_PORT, EMAIL_USE_TLS etc.
+apply) and kept open while there is work. Failed messages are retried with
+exponential backoff up to EMAIL_QUEUE_MAX_ATTEMPTS. Sent messages are
+deleted after EMAIL_QUEUE_RETENTION_DAYS.
+"""
+import logging
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from home.models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentFailure(Exception):
+    """The SMTP server rejected a message for good."""
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        rows = [
+            QueuedEmail(
+                from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+                recipients="\n".join(message.recipients()),
+                message=message.message().as_bytes(linesep="\r\n"),
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        try:
+            QueuedEmail.objects.bulk_create(rows)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(rows)
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt, after `attempts` failures."""
+    delay = settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1)
+    return min(delay, settings.EMAIL_QUEUE_MAX_RETRY_DELAY)
+
+
+class EmailQueueWorker:
+    """Sends due QueuedEmail rows. Several workers may run side by side."""
+
+    # Seconds between two deletions of the sent messages past retention.
+    purge_interval = 3600
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+        self.transport = None
+        self.purged_at = None
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "connections": 0}
+
+    def claim(self):
+        """Lease the next batch of due messages to this worker."""
+        now = timezone.now()
+        with transaction.atomic():
+            queryset = QueuedEmail.objects.filter(status=QueuedEmail.QUEUED, next_attempt_at__lte=now)
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            batch = list(queryset.order_by("next_attempt_at", "id")[: self.batch_size])
+            QueuedEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                attempts=F("attempts") + 1,
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_QUEUE_LEASE),
+            )
+        for email in batch:
+            email.attempts += 1
+        return batch
+
+    def open(self):
+        if self.transport is None or self.transport.connection is None:
+            self.transport = get_connection(settings.EMAIL_QUEUE_TRANSPORT)
+            self.transport.open()
+            self.stats["connections"] += 1
+        return self.transport.connection
+
+    def close(self):
+        if self.transport is not None:
+            try:
+                self.transport.close()
+            finally:
+                self.transport = None
+
+    def send(self, email, reconnect=True):
+        smtp = self.open()
+        try:
+            refused = smtp.sendmail(
+                email.from_email, email.recipients.split("\n"), bytes(email.message)
+            )
+        except smtplib.SMTPServerDisconnected:
+            self.transport.connection = None
+            if not reconnect:
+                raise
+            # The server dropped the idle connection, try once on a new one.
+            return self.send(email, reconnect=False)
+        except smtplib.SMTPRecipientsRefused as e:
+            if smtp.sock is None:
+                # smtplib hung up after a 421.
+                self.transport.connection = None
+            # Every recipient was refused. Retrying won't change a 5xx.
+            if all(code >= 500 for code, _ in e.recipients.values()):
+                raise PermanentFailure(str(e.recipients))
+            raise
+        if refused:
+            logger.warning("Email %d: some recipients were refused: %s", email.pk, refused)
+
+    def process(self, email):
+        try:
+            self.send(email)
+        except PermanentFailure as e:
+            self.fail(email, e)
+        except (smtplib.SMTPException, OSError) as e:
+            self.retry_or_fail(email, e)
+        except Exception as e:
+            # A bad row or a bug must not stop the worker, nor leave the
+            # message leased until it is retried forever.
+            logger.exception("Email %d: unexpected error while sending", email.pk)
+            self.retry_or_fail(email, e)
+        else:
+            self.stats["sent"] += 1
+            email.status = QueuedEmail.SENT
+            email.sent_at = timezone.now()
+            email.message = b""
+            email.save(update_fields=["status", "sent_at", "message"])
+
+    def retry_or_fail(self, email, error):
+        if email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+            self.fail(email, error)
+        else:
+            self.stats["retried"] += 1
+            email.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(email.attempts))
+            email.last_error = "%s: %s" % (error.__class__.__name__, error)
+            email.save(update_fields=["next_attempt_at", "last_error"])
+
+    def fail(self, email, error):
+        self.stats["failed"] += 1
+        logger.error("Giving up on email %d after %d attempts: %s", email.pk, email.attempts, error)
+        email.status = QueuedEmail.FAILED
+        email.last_error = "%s: %s" % (error.__class__.__name__, error)
+        email.save(update_fields=["status", "last_error"])
+
+    def drain(self):
+        """Send batches until no message is due. Returns the number processed."""
+        processed = 0
+        while True:
+            batch = self.claim()
+            if not batch:
+                return processed
+            for email in batch:
+                self.process(email)
+            processed += len(batch)
+
+    def purge(self):
+        """Delete the messages sent more than EMAIL_QUEUE_RETENTION_DAYS ago."""
+        self.purged_at = time.monotonic()
+        if not settings.EMAIL_QUEUE_RETENTION_DAYS:
+            return 0
+        cutoff = timezone.now() - timedelta(days=settings.EMAIL_QUEUE_RETENTION_DAYS)
+        deleted, _ = QueuedEmail.objects.filter(status=QueuedEmail.SENT, sent_at__lt=cutoff).delete()
+        if deleted:
+            logger.info("Deleted %d sent emails older than %d days", deleted, settings.EMAIL_QUEUE_RETENTION_DAYS)
+        return deleted
+
+    def run(self, poll_interval=None, once=False):
+        poll_interval = settings.EMAIL_QUEUE_POLL_INTERVAL if poll_interval is None else poll_interval
+        try:
+            while True:
+                try:
+                    self.drain()
+                finally:
+                    # Don't hold an idle connection the server will drop anyway.
+                    self.close()
+                if self.purged_at is None or time.monotonic() - self.purged_at >= self.purge_interval:
+                    self.purge()
+                if once:
+                    return self.stats
+                time.sleep(poll_interval)
+        finally:
+            self.close()
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from my_app_17226.api_schema import write_schema
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema served by /api-docs/ and write it to API_SCHEMA_FILE.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', dest='output', default=None,
+            help='Write the schema to this file instead of API_SCHEMA_FILE.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['output'] or settings.API_SCHEMA_FILE
+        size = write_schema(path)
+        self.stdout.write('Wrote the API schema to %s (%d bytes).' % (path, size))
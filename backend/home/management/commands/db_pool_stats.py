@@ -0,0 +1,36 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from my_app_17226.db.pool import get_pool_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Check every database through its connection pool and print the pool statistics. '
+        'Pools are per process: use api/v1/db-pool/ to see the figures of a running worker.'
+    )
+
+    def handle(self, *args, **options):
+        checks = {}
+        for alias in connections:
+            connection = connections[alias]
+            start = time.perf_counter()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                healthy = True
+            except DatabaseError:
+                healthy = False
+            checks[alias] = {
+                'healthy': healthy,
+                'check_ms': round((time.perf_counter() - start) * 1000, 3),
+                'pooled': connection.uses_pool() if hasattr(connection, 'uses_pool') else False,
+            }
+            connection.close()
+
+        for alias, stats in get_pool_stats().items():
+            checks.setdefault(alias, {})['pool'] = stats
+        self.stdout.write(json.dumps(checks))
@@ -1,19 +1,164 @@
 import json
-import subprocess
+import logging
+import time
+from contextlib import ExitStack, contextmanager
 
 import django
+from django.conf import settings
+from django.contrib.admindocs.views import simplify_regex
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ViewDoesNotExist
+from django.core.management import CommandError
 from django.core.management.base import BaseCommand
+from django.db import connections
+from django.template.base import Template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.renderers import BaseRenderer
+
+
+def extract_views(urlpatterns, base="", namespace=None):
+    """Walk the URL resolver, yielding (view, pattern, name) like show_urls."""
+    for p in urlpatterns:
+        if isinstance(p, URLPattern):
+            try:
+                callback = p.callback
+            except ViewDoesNotExist:
+                continue
+            name = "%s:%s" % (namespace, p.name) if namespace and p.name else p.name
+            yield callback, base + str(p.pattern), name
+        elif isinstance(p, URLResolver):
+            try:
+                patterns = p.url_patterns
+            except ImportError:
+                continue
+            if namespace and p.namespace:
+                _namespace = "%s:%s" % (namespace, p.namespace)
+            else:
+                _namespace = p.namespace or namespace
+            yield from extract_views(patterns, base + str(p.pattern), _namespace)
+
+
+# Decorators reported the way show_urls does with its default --decorator.
+DECORATORS = ["login_required"]
+
+
+def describe_view(func, pattern, name):
+    func_name = getattr(func, "__name__", "%s()" % func.__class__.__name__)
+    func_globals = getattr(func, "__globals__", {})
+    return {
+        "url": simplify_regex(pattern),
+        "module": "%s.%s" % (func.__module__, func_name),
+        "name": name or "",
+        "decorators": ", ".join(decorator for decorator in DECORATORS if decorator in func_globals),
+    }
+
+
+class RenderTimer:
+    """Time spent in template and DRF renderer calls, outermost call only."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self._depth = 0
+
+    def wrap(self, render):
+        timer = self
+
+        def timed_render(*args, **kwargs):
+            timer._depth += 1
+            start = time.perf_counter()
+            try:
+                return render(*args, **kwargs)
+            finally:
+                timer._depth -= 1
+                if not timer._depth:
+                    timer.elapsed += time.perf_counter() - start
+
+        return timed_render
+
+    @contextmanager
+    def patch(self):
+        renderers = [Template] + list(_all_subclasses(BaseRenderer))
+        originals = [(cls, cls.__dict__["render"]) for cls in renderers if "render" in cls.__dict__]
+        for cls, render in originals:
+            cls.render = self.wrap(render)
+        try:
+            yield self
+        finally:
+            for cls, render in originals:
+                cls.render = render
+
+
+def _all_subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _all_subclasses(subclass)
 
 
 class Command(BaseCommand):
     help = "Generate a json with all Models and URLs of the project."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile", action="store_true", dest="profile",
+            help=(
+                "GET every URL without parameters, except REPORT_PROFILE_EXCLUDED_PATHS, "
+                "and add query count, SQL time and render time."
+            ),
+        )
+        parser.add_argument(
+            "--profile-user", dest="profile_user", default=None,
+            help="Username to log in as while profiling. Requests are anonymous by default.",
+        )
+
+    def profile_url(self, client, url):
+        timer = RenderTimer()
+        with ExitStack() as stack:
+            # Every alias, reads may go to a replica.
+            captured = [stack.enter_context(CaptureQueriesContext(c)) for c in connections.all()]
+            stack.enter_context(timer.patch())
+            start = time.perf_counter()
+            try:
+                response = client.get(url)
+            except Exception as e:
+                return {"error": "%s: %s" % (e.__class__.__name__, e)}
+            total = time.perf_counter() - start
+        queries = [query for context in captured for query in context.captured_queries]
+        return {
+            "status": response.status_code,
+            "queries": len(queries),
+            "sql_ms": round(sum(float(q["time"]) for q in queries) * 1000, 3),
+            "render_ms": round(timer.elapsed * 1000, 3),
+            "total_ms": round(total * 1000, 3),
+        }
+
+    def profile(self, urls, username):
+        client = Client()
+        if username:
+            try:
+                client.force_login(get_user_model().objects.get(username=username))
+            except get_user_model().DoesNotExist:
+                raise CommandError("User not found with the given username.")
+        # Failures are reported in the JSON, don't log every 4xx/5xx as well.
+        request_logger = logging.getLogger("django.request")
+        disabled, request_logger.disabled = request_logger.disabled, True
+        try:
+            with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ["testserver"]):
+                for url in urls:
+                    path = url["url"]
+                    if "<" not in path and not path.startswith(tuple(settings.REPORT_PROFILE_EXCLUDED_PATHS)):
+                        url["profile"] = self.profile_url(client, path)
+        finally:
+            request_logger.disabled = disabled
+
     def handle(self, *args, **options):
         models = django.apps.apps.get_models(
             include_auto_created=True, include_swapped=True
         )
-        cmd = "python3 manage.py show_urls --format=json"
-        loc = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE)
+        urls = [describe_view(*view) for view in extract_views(get_resolver().url_patterns)]
+        if options["profile"]:
+            self.profile(urls, options["profile_user"])
         print(
             json.dumps(
                 {
@@ -21,7 +166,7 @@ class Command(BaseCommand):
                         str(model).split(".")[-1].replace("'", "").strip(">")
                         for model in models
                     ],
-                    "urls": json.loads(loc.stdout.decode().strip()),
+                    "urls": urls,
                 }
             )
         )
@@ -0,0 +1,61 @@
+import json
+import sys
+
+from django.core.management import CommandError
+from django.core.management.base import BaseCommand
+
+from home.user_import import FORMATS, UserImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Create users in bulk from a CSV or JSONL file with email, name and password columns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='File to import, or "-" to read from stdin.',
+        )
+        parser.add_argument(
+            '--format', dest='format', choices=FORMATS, default=None,
+            help='Input format. Guessed from the file extension by default.',
+        )
+        parser.add_argument(
+            '--chunk-size', dest='chunk_size', type=int, default=None,
+            help='Number of rows to create per batch.',
+        )
+        parser.add_argument(
+            '--workers', dest='workers', type=int, default=None,
+            help='Processes used for password hashing, 0 to hash in this process.',
+        )
+        parser.add_argument(
+            '--verified', dest='verified', action='store_true',
+            help='Mark the imported email addresses as verified.',
+        )
+
+    def progress(self, stats):
+        self.stderr.write(
+            '{processed} rows, {created} created, {skipped} skipped, {failed} failed '
+            '({rows_per_sec} rows/s)'.format(**stats)
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format']
+        if format is None:
+            format = 'csv' if path.endswith('.csv') else 'jsonl' if path.endswith('.jsonl') else None
+        if format is None:
+            raise CommandError('Unable to guess the input format, please pass --format.')
+
+        importer = UserImporter(
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            verified=options['verified'],
+            progress=self.progress,
+        )
+        # Read as bytes: lines that aren't UTF-8 are reported as failed rows.
+        if path == '-':
+            stats = importer.run(read_rows(sys.stdin.buffer, format))
+        else:
+            with open(path, 'rb') as f:
+                stats = importer.run(read_rows(f, format))
+        self.stdout.write(json.dumps(stats))
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management import CommandError
+from django.core.management.base import BaseCommand
+from fcm_django.models import FCMDevice
+
+from home.push import PushDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Send a push notification to the active FCM devices and print the delivery statistics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--title', dest='title', default=None)
+        parser.add_argument('--body', dest='body', default=None)
+        parser.add_argument(
+            '--data', dest='data', default=None,
+            help='Data message as a JSON object.',
+        )
+        parser.add_argument(
+            '--user', dest='users', type=int, action='append', default=[],
+            help='Only send to the devices of this user id. Can be repeated.',
+        )
+
+    def handle(self, *args, **options):
+        data = None
+        if options['data']:
+            try:
+                data = json.loads(options['data'])
+            except ValueError as e:
+                raise CommandError('--data is not valid JSON: %s' % e)
+        if not (options['title'] or options['body'] or data):
+            raise CommandError('Give a --title, --body or --data.')
+
+        devices = FCMDevice.objects.all()
+        if options['users']:
+            devices = devices.filter(user__in=options['users'])
+        stats = PushDispatcher().send(devices, title=options['title'], body=options['body'], data=data)
+        self.stdout.write(json.dumps(stats.as_dict()))
@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from home.mail import EmailQueueWorker
+
+
+class Command(BaseCommand):
+    help = (
+        'Send the email queued by QueuedEmailBackend over one SMTP connection, '
+        'retrying failed messages with backoff, and delete sent messages older than '
+        'EMAIL_QUEUE_RETENTION_DAYS. Runs until interrupted unless --once is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', dest='once', action='store_true',
+            help='Send what is due, print the statistics and exit.',
+        )
+        parser.add_argument(
+            '--batch-size', dest='batch_size', type=int, default=None,
+            help='Number of messages claimed per batch.',
+        )
+        parser.add_argument(
+            '--poll-interval', dest='poll_interval', type=float, default=None,
+            help='Seconds to wait between checks of an empty queue.',
+        )
+
+    def handle(self, *args, **options):
+        worker = EmailQueueWorker(batch_size=options['batch_size'])
+        try:
+            worker.run(poll_interval=options['poll_interval'], once=options['once'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(json.dumps(worker.stats))
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management import CommandError
+from django.core.management.base import BaseCommand
+
+from my_app_17226.startup import profile_startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Start Django in a fresh interpreter and print the time spent loading settings, '
+        'populating the apps (with the cost of each ready()) and loading the URLconf, '
+        'and the modules and packages that took longest to import.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', dest='limit', type=int, default=20,
+            help='Number of modules and packages to list.',
+        )
+        parser.add_argument(
+            '--env', dest='env', action='append', default=[],
+            help='NAME=VALUE environment variable for the profiled process, '
+                 'e.g. SETTINGS_PROFILE=development. Can be repeated.',
+        )
+        parser.add_argument(
+            '--no-urlconf', dest='urlconf', action='store_false',
+            help="Stop after the apps are ready, like a worker command that doesn't load the URLconf.",
+        )
+
+    def handle(self, *args, **options):
+        env = {}
+        for variable in options['env']:
+            name, sep, value = variable.partition('=')
+            if not sep:
+                raise CommandError('--env takes NAME=VALUE, got %r.' % variable)
+            env[name] = value
+        try:
+            profile = profile_startup(env=env, urlconf=options['urlconf'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        limit = options['limit']
+        modules = sorted(profile['modules'], key=lambda module: module['cumulative_ms'], reverse=True)
+        profile['modules'] = [
+            {'module': module['module'], 'self_ms': module['self_ms'], 'cumulative_ms': module['cumulative_ms']}
+            for module in modules[:limit]
+        ]
+        profile['packages'] = dict(
+            sorted(profile['packages'].items(), key=lambda item: item[1], reverse=True)[:limit]
+        )
+        profile['ready'] = dict(sorted(profile['ready'].items(), key=lambda item: item[1], reverse=True))
+        self.stdout.write(json.dumps(profile))
@@ -5,7 +5,7 @@ def create_customtext(apps, schema_editor):
     CustomText = apps.get_model("home", "CustomText")
     customtext_title = "My App"
 
-    CustomText.objects.create(title=customtext_title)
+    CustomText.objects.using(schema_editor.connection.alias).create(title=customtext_title)
 
 
 def create_homepage(apps, schema_editor):
@@ -17,7 +17,7 @@ def create_homepage(apps, schema_editor):
             You can view list of packages selected for this application below.
         </p>"""
 
-    HomePage.objects.create(body=homepage_body)
+    HomePage.objects.using(schema_editor.connection.alias).create(body=homepage_body)
 
 
 def create_site(apps, schema_editor):
@@ -30,7 +30,7 @@ def create_site(apps, schema_editor):
     if custom_domain:
         site_params["domain"] = custom_domain
 
-    Site.objects.update_or_create(defaults=site_params, id=1)
+    Site.objects.using(schema_editor.connection.alias).update_or_create(defaults=site_params, id=1)
 
 
 class Migration(migrations.Migration):
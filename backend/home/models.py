@@ -2,10 +2,90 @@ from django.db import models
 
 # Create your models here.
 
-from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+class VersionConflict(Exception):
+    """A conditional save found the row at a different version."""
+
+
+class VersionedModel(models.Model):
+    """Keeps a per-row version that is bumped by every save.
+
+    Set `expected_version` before calling `save()` to make the update
+    conditional: the row is only written if it is still at that version,
+    otherwise `VersionConflict` is raised. The check is part of the UPDATE
+    statement itself, so it needs no extra read.
+
+    After an unconditional save `version` is deferred, it is read from the
+    database the next time it is accessed.
+    """
+
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    expected_version = None
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'version', 'updated_at'}
+
+        # Not self.version, which would load a deferred version.
+        self._previous_version = self.__dict__.get('version')
+        self.version = F('version') + 1
+        self._version_conflict = False
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.restore_version()
+            raise
+        finally:
+            self.expected_version = None
 
+        if self._version_conflict:
+            # Raised here rather than from _do_update() so the failed write
+            # doesn't break an enclosing transaction. Receivers of post_save
+            # have to check _version_conflict.
+            self._version_conflict = False
+            raise VersionConflict()
 
-class CustomText(models.Model):
+    def restore_version(self):
+        if self._previous_version is None:
+            del self.__dict__['version']
+        else:
+            self.version = self._previous_version
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected_version = self.expected_version
+        if expected_version is None:
+            updated = super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+            if updated:
+                # Deferred rather than read back: the new version costs a
+                # query only if something uses it.
+                del self.__dict__['version']
+            return updated
+
+        base_qs = base_qs.filter(version=expected_version)
+        updated = super()._do_update(base_qs, using, pk_val, values, update_fields, True)
+        self._version_conflict = not updated
+        if updated:
+            self.version = expected_version + 1
+        else:
+            self.restore_version()
+        # Report a conflict as a successful update so save() doesn't fall
+        # back to an INSERT.
+        return True
+
+
+class CustomText(VersionedModel):
     title = models.CharField(max_length=150)
 
     def __str__(self):
@@ -20,7 +100,7 @@ class CustomText(models.Model):
         return 'title'
 
 
-class HomePage(models.Model):
+class HomePage(VersionedModel):
     body = models.TextField()
 
     @property
@@ -30,3 +110,33 @@ class HomePage(models.Model):
     @property
     def field(self):
         return 'body'
+
+
+class QueuedEmail(models.Model):
+    """An outgoing message stored by home.mail.QueuedEmailBackend.
+
+    `next_attempt_at` is when the worker (send_queued_email) may pick the
+    message up next; while a worker is sending it, it is pushed out by
+    EMAIL_QUEUE_LEASE so no other worker takes it.
+    """
+
+    QUEUED = 'queued'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = ((QUEUED, 'Queued'), (SENT, 'Sent'), (FAILED, 'Failed'))
+
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField(help_text='One address per line.')
+    message = models.BinaryField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return '%s to %s' % (self.status, self.recipients.replace('\n', ', '))
@@ -0,0 +1,229 @@
+"""
+Batched push notifications to fcm_django devices.
+
+FCMDevice.objects.send_message() posts every batch from the caller's thread,
+one after the other. PushDispatcher sends to any number of devices the way
+FCM's legacy HTTP API wants it:
+
+* active devices are read in chunks and grouped into batches of
+  PUSH_BATCH_SIZE registration ids (FCM accepts up to 1000 per request),
+* batches are posted by a pool of PUSH_WORKERS threads, each with its own
+  keep-alive requests.Session, and at most twice that many batches are in
+  memory at once,
+* tokens that failed with Unavailable or InternalServerError, and whole
+  batches that got a 5xx, 429 or network error, are retried up to
+  PUSH_MAX_RETRIES times in all with exponential backoff (or the Retry-After the
+  server asked for, capped at PUSH_MAX_RETRY_AFTER seconds),
+* tokens FCM reports as unknown are deactivated, or deleted when
+  FCM_DJANGO_SETTINGS["DELETE_INACTIVE_DEVICES"] is set, and canonical ids
+  replace the registration id they were returned for.
+
+Only the calling thread touches the database. send() returns a PushStats
+with the delivery figures, which are also logged.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from fcm_django.models import FCMDevice
+from fcm_django.settings import FCM_DJANGO_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Errors meaning the registration id will never work again.
+INVALID_TOKEN_ERRORS = {"MissingRegistration", "InvalidRegistration", "NotRegistered", "MismatchSenderId"}
+# Errors worth retrying for the same token.
+RETRY_ERRORS = {"Unavailable", "InternalServerError"}
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PushStats:
+    FIELDS = ("devices", "sent", "failed", "invalid", "canonical", "retried", "requests")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+        self.seconds = 0.0
+
+    def add(self, **counts):
+        with self._lock:
+            for field, count in counts.items():
+                setattr(self, field, getattr(self, field) + count)
+
+    def as_dict(self):
+        stats = {field: getattr(self, field) for field in self.FIELDS}
+        stats["seconds"] = round(self.seconds, 3)
+        return stats
+
+
+class BatchResult:
+    def __init__(self):
+        self.invalid = []
+        # (old registration id, canonical registration id)
+        self.canonical = []
+
+
+class PushDispatcher:
+    def __init__(self, server=None, api_key=None, batch_size=None, workers=None, max_retries=None,
+                 retry_delay=None, max_retry_after=None, timeout=None):
+        self.server = server or FCM_DJANGO_SETTINGS["FCM_SERVER"]
+        self.api_key = api_key or FCM_DJANGO_SETTINGS["FCM_SERVER_KEY"]
+        self.batch_size = batch_size or settings.PUSH_BATCH_SIZE
+        self.workers = workers or settings.PUSH_WORKERS
+        self.max_retries = settings.PUSH_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_delay = settings.PUSH_RETRY_DELAY if retry_delay is None else retry_delay
+        self.max_retry_after = settings.PUSH_MAX_RETRY_AFTER if max_retry_after is None else max_retry_after
+        self.timeout = timeout or settings.PUSH_TIMEOUT
+        self._local = threading.local()
+
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update({
+                "Authorization": "key=%s" % self.api_key,
+                "Content-Type": "application/json",
+            })
+        return session
+
+    def backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = (parsedate_to_datetime(retry_after) - timezone.now()).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                # A worker thread sleeps through it, don't let the server park it for hours.
+                return min(max(0.0, delay), self.max_retry_after)
+        return self.retry_delay * 2 ** attempt
+
+    def post(self, payload, stats):
+        """Post one batch once. Returns the response, or None, and the error worth retrying."""
+        stats.add(requests=1)
+        try:
+            response = self.session().post(self.server, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            return None, str(e)
+        if response.status_code in RETRY_STATUS_CODES:
+            return response, "HTTP %d" % response.status_code
+        return response, None
+
+    def send_batch(self, registration_ids, message, stats):
+        """Send one batch. Failed requests and tokens share the PUSH_MAX_RETRIES retries."""
+        result = BatchResult()
+        pending = registration_ids
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            response, error = self.post(dict(message, registration_ids=pending), stats)
+            if error is not None:
+                if last_attempt:
+                    logger.warning("Giving up on a push batch of %d: %s", len(pending), error)
+                    stats.add(failed=len(pending))
+                    return result
+                stats.add(retried=len(pending))
+                time.sleep(self.backoff(attempt, response))
+                continue
+            if response.status_code != 200:
+                # 400 (bad payload) and 401 (bad key) fail the same for every batch.
+                logger.error("FCM rejected a push batch: HTTP %d %s", response.status_code, response.text[:200])
+                stats.add(failed=len(pending))
+                return result
+
+            try:
+                results = response.json()["results"]
+            except (ValueError, KeyError, TypeError):
+                logger.error("FCM sent an unreadable response to a push batch: %s", response.text[:200])
+                stats.add(failed=len(pending))
+                return result
+            if len(results) != len(pending):
+                logger.error("FCM sent %d results for a push batch of %d", len(results), len(pending))
+                # Which token a result belongs to is only known by its position,
+                # count the tokens without one as failed.
+                stats.add(failed=max(0, len(pending) - len(results)))
+
+            retry = []
+            for registration_id, item in zip(pending, results):
+                error = item.get("error")
+                if error is None:
+                    stats.add(sent=1)
+                    if item.get("registration_id"):
+                        result.canonical.append((registration_id, item["registration_id"]))
+                elif error in INVALID_TOKEN_ERRORS:
+                    stats.add(failed=1, invalid=1)
+                    result.invalid.append(registration_id)
+                elif error in RETRY_ERRORS and not last_attempt:
+                    retry.append(registration_id)
+                else:
+                    stats.add(failed=1)
+            if not retry:
+                return result
+            stats.add(retried=len(retry))
+            time.sleep(self.backoff(attempt, response))
+            pending = retry
+        return result
+
+    def batches(self, devices):
+        batch = []
+        registration_ids = devices.filter(active=True).values_list("registration_id", flat=True)
+        for registration_id in registration_ids.iterator(chunk_size=self.batch_size):
+            batch.append(registration_id)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def prune(self, result, stats):
+        if result.invalid:
+            invalid = FCMDevice.objects.filter(registration_id__in=result.invalid)
+            if FCM_DJANGO_SETTINGS["DELETE_INACTIVE_DEVICES"]:
+                invalid.delete()
+            else:
+                invalid.update(active=False)
+        for old, new in result.canonical:
+            FCMDevice.objects.filter(registration_id=old).update(registration_id=new)
+        stats.add(canonical=len(result.canonical))
+
+    def send(self, devices=None, title=None, body=None, data=None, **notification):
+        """
+        Send a notification (title, body and any other FCM notification key)
+        and/or a data message to the active devices in `devices`, all active
+        devices by default.
+        """
+        message = {}
+        notification.update({key: value for key, value in (("title", title), ("body", body)) if value is not None})
+        if notification:
+            message["notification"] = notification
+        if data is not None:
+            message["data"] = data
+        devices = FCMDevice.objects.all() if devices is None else devices
+
+        stats = PushStats()
+        start = time.perf_counter()
+        in_flight = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="push") as executor:
+            for batch in self.batches(devices):
+                stats.add(devices=len(batch))
+                in_flight.append(executor.submit(self.send_batch, batch, message, stats))
+                if len(in_flight) >= self.workers * 2:
+                    self.prune(in_flight.pop(0).result(), stats)
+            for future in in_flight:
+                self.prune(future.result(), stats)
+        stats.seconds = time.perf_counter() - start
+        logger.info("Push sent: %s", stats.as_dict())
+        return stats
+
+
+def send_push(devices=None, **kwargs):
+    """Send to `devices` with a PushDispatcher using the PUSH_* settings."""
+    return PushDispatcher().send(devices, **kwargs)
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from home.api.v1.authentication import revocations, token_cache
+from home.cache import bump_content_version
+from home.models import CustomText, HomePage
+from my_app_17226.page_cache import HOMEPAGE, purge_on_commit, user_key
+
+
+@receiver(post_save, sender=CustomText)
+@receiver(post_delete, sender=CustomText)
+@receiver(post_save, sender=HomePage)
+@receiver(post_delete, sender=HomePage)
+def invalidate_home_content(sender, instance, **kwargs):
+    if getattr(instance, '_version_conflict', False):
+        # A conditional save that found another version wrote nothing.
+        return
+    # Once committed, so that a concurrent request can't cache the old rows
+    # under the new version.
+    transaction.on_commit(bump_content_version)
+    purge_on_commit(HOMEPAGE)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+    revocations.revoke(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # Covers password changes (customchangepassword, set_password + save) and
+    # is_active flips. Saves limited to other fields, like update_last_login,
+    # can't affect authentication.
+    if created:
+        return
+    if update_fields is not None and not {"password", "is_active"} & set(update_fields):
+        return
+    token_cache.invalidate_user(instance.pk)
+    revocations.revoke(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def purge_user_pages(sender, instance, **kwargs):
+    purge_on_commit(user_key(instance.pk))
@@ -0,0 +1,156 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from home.api.v1 import authentication
+from home.api.v1.authentication import issue_access_token, revocations
+
+pytestmark = pytest.mark.django_db
+
+PASSWORD = "Sup3r-secret-pass"
+
+
+@pytest.fixture(autouse=True)
+def access_tokens(settings):
+    settings.ACCESS_TOKENS_ENABLED = True
+    settings.ACCESS_TOKEN_LIFETIME = 300
+    revocations.clear()
+
+
+@pytest.fixture
+def staff(admin_user):
+    admin_user.set_password(PASSWORD)
+    admin_user.save()
+    return admin_user
+
+
+def bearer(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Bearer " + token)
+    return client
+
+
+def test_login_returns_an_access_token(staff):
+    response = APIClient().post("/api/v1/login/", {"username": staff.username, "password": PASSWORD})
+
+    assert response.status_code == 200
+    assert response.json()["expires_in"] == 300
+    assert response.json()["token"] == Token.objects.get(user=staff).key
+    assert bearer(response.json()["access_token"]).get("/api/v1/customtext/").status_code == 200
+
+
+def test_no_access_token_unless_enabled(staff, settings):
+    settings.ACCESS_TOKENS_ENABLED = False
+    response = APIClient().post("/api/v1/login/", {"username": staff.username, "password": PASSWORD})
+
+    assert "access_token" not in response.json()
+    token, _ = issue_access_token(staff)
+    assert bearer(token).get("/api/v1/customtext/").status_code == 403
+
+
+def test_verified_without_queries(staff, django_assert_num_queries):
+    client = bearer(issue_access_token(staff)[0])
+
+    # Only the page query.
+    with django_assert_num_queries(1):
+        assert client.get("/api/v1/customtext/").status_code == 200
+
+
+def test_staff_flag_comes_from_the_token(user):
+    assert bearer(issue_access_token(user)[0]).get("/api/v1/customtext/").status_code == 403
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: token[:-2] + ("AA" if not token.endswith("AA") else "BB"),
+    lambda token: token.replace(".0.", ".3.", 1),
+    lambda token: "1" + token,
+])
+def test_tampered_tokens_are_rejected(user, tamper):
+    token, _ = issue_access_token(user)
+
+    response = bearer(tamper(token)).post("/api/v1/access-token/revoke/")
+
+    assert response.status_code == 401
+    assert response["WWW-Authenticate"] == "Bearer"
+
+
+@pytest.mark.parametrize("token", [
+    "1.2.\xe9",
+    "1.2." + authentication.sign("1.2"),
+    "a.b.c.d.e." + authentication.sign("a.b.c.d.e"),
+])
+def test_malformed_tokens_are_rejected(token):
+    response = bearer(token).post("/api/v1/access-token/revoke/")
+
+    assert response.status_code == 401
+
+
+def test_expired_token(staff, monkeypatch):
+    token, _ = issue_access_token(staff)
+    now = authentication.time.time()
+    monkeypatch.setattr(authentication.time, "time", lambda: now + 301)
+
+    response = bearer(token).get("/api/v1/customtext/")
+
+    # 403 rather than 401 as SessionAuthentication comes first.
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Access token expired."
+
+
+def test_refresh_through_the_token_table(staff):
+    token = Token.objects.create(user=staff)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+
+    response = client.post("/api/v1/access-token/")
+
+    assert response.status_code == 200
+    assert bearer(response.json()["access_token"]).get("/api/v1/customtext/").status_code == 200
+    # An access token can't refresh itself.
+    assert bearer(response.json()["access_token"]).post("/api/v1/access-token/").status_code == 403
+
+
+def test_revoke_logs_out(staff):
+    Token.objects.create(user=staff)
+    token, _ = issue_access_token(staff)
+
+    assert bearer(token).post("/api/v1/access-token/revoke/").status_code == 204
+
+    assert not Token.objects.filter(user=staff).exists()
+    response = bearer(token).get("/api/v1/customtext/")
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Access token revoked."
+    # Tokens issued after the revocation work.
+    assert bearer(issue_access_token(staff)[0]).get("/api/v1/customtext/").status_code == 200
+
+
+def test_password_change_revokes(staff):
+    token, _ = issue_access_token(staff)
+
+    call_command("customchangepassword", username=staff.username, password="n3w-pa55")
+
+    assert bearer(token).get("/api/v1/customtext/").status_code == 403
+
+
+def test_key_version_is_checked_when_the_user_is_loaded(staff):
+    token, _ = issue_access_token(staff)
+    # A password change another process made, not seen by the revocation set.
+    type(staff).objects.filter(pk=staff.pk).update(password="changed")
+    user, _ = authentication.AccessTokenAuthentication().authenticate(
+        type("Request", (), {"META": {"HTTP_AUTHORIZATION": "Bearer " + token}})()
+    )
+
+    assert user.is_staff
+    with pytest.raises(authentication.AuthenticationFailed):
+        user.email
+
+
+def test_revocation_set_drops_expired_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(authentication.time, "time", lambda: now[0])
+    revocations.revoke(1)
+    now[0] += 301
+    revocations.revoke(2)
+
+    assert len(revocations) == 1
@@ -0,0 +1,67 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from home.api.v1.authentication import CachedTokenAuthentication, token_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(admin_user):
+    token_cache.clear()
+    token_cache.reset_stats()
+    token = Token.objects.create(user=admin_user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+    client.token = token
+    return client
+
+
+def test_token_is_resolved_once(api_client, django_assert_num_queries):
+    assert api_client.get("/api/v1/customtext/").status_code == 200
+    # Only the page query remains.
+    with django_assert_num_queries(1):
+        assert api_client.get("/api/v1/customtext/").status_code == 200
+    assert token_cache.stats()["hits"] == 1
+    assert token_cache.stats()["misses"] == 1
+
+
+def test_deleted_token_is_rejected(api_client):
+    api_client.get("/api/v1/customtext/")
+    api_client.token.delete()
+    assert api_client.get("/api/v1/customtext/").status_code == 403
+
+
+def test_password_change_invalidates(api_client, admin_user):
+    api_client.get("/api/v1/customtext/")
+    call_command("customchangepassword", username=admin_user.username, password="n3w-pa55")
+    api_client.get("/api/v1/customtext/")
+    assert token_cache.stats()["invalidations"] == 1
+    assert token_cache.stats()["misses"] == 2
+
+
+def test_deactivated_user_is_rejected(api_client, admin_user):
+    api_client.get("/api/v1/customtext/")
+    admin_user.is_active = False
+    admin_user.save()
+    assert api_client.get("/api/v1/customtext/").status_code == 403
+
+
+def test_last_login_update_keeps_cache(api_client, admin_user):
+    api_client.get("/api/v1/customtext/")
+    admin_user.save(update_fields=["last_login"])
+    assert token_cache.stats()["invalidations"] == 0
+
+
+def test_requests_get_their_own_user_instance(api_client):
+    authentication = CachedTokenAuthentication()
+    first, _ = authentication.authenticate_credentials(api_client.token.key)
+    second, _ = authentication.authenticate_credentials(api_client.token.key)
+
+    first.name = "Changed by one request"
+    first.request_only = True
+    assert second is not first
+    assert second.name != "Changed by one request"
+    assert not hasattr(second, "request_only")
@@ -0,0 +1,110 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from home.cache import get_content_version
+from home.models import CustomText, HomePage
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/v1/customtext/bulk/"
+
+
+@pytest.fixture
+def customtexts():
+    CustomText.objects.bulk_create(CustomText(title="Title %d" % i) for i in range(5))
+    return list(CustomText.objects.order_by("id"))
+
+
+def patch(client, url, data):
+    return client.patch(url, data, content_type="application/json")
+
+
+def test_updates_all_items_in_one_statement(admin_client, customtexts):
+    items = [{"id": c.pk, "title": "New %d" % c.pk} for c in customtexts]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = patch(admin_client, URL, items)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["id"] for r in results] == [c.pk for c in customtexts]
+    assert all(r["status"] == "updated" for r in results)
+    assert results[0]["data"]["title"] == "New %d" % customtexts[0].pk
+    assert results[0]["data"]["version"] == 2
+    assert sum(query["sql"].startswith("UPDATE") for query in queries) == 1
+    for customtext in customtexts:
+        customtext.refresh_from_db()
+        assert customtext.title == "New %d" % customtext.pk
+        assert customtext.version == 2
+
+
+def test_nothing_is_written_if_any_item_fails(admin_client, customtexts):
+    first, second, third = customtexts[:3]
+    items = [
+        {"id": first.pk, "title": "Fine"},
+        {"id": second.pk, "title": "x" * 151},
+        {"id": third.pk, "title": "Stale", "version": 7},
+        {"id": 999999, "title": "Missing"},
+    ]
+
+    response = patch(admin_client, URL, items)
+
+    assert response.status_code == 400
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["valid", "invalid", "conflict", "not_found"]
+    assert "title" in results[1]["errors"]
+    assert results[2]["version"] == 1
+    assert CustomText.objects.get(pk=first.pk).title == first.title
+
+
+def test_matching_version_is_written(admin_client, customtexts):
+    response = patch(admin_client, URL, [{"id": customtexts[0].pk, "title": "Mine", "version": 1}])
+
+    assert response.status_code == 200
+
+
+def test_bumps_home_content_version(admin_client, customtexts, on_commit_callbacks):
+    version = get_content_version()
+
+    with on_commit_callbacks():
+        patch(admin_client, URL, [{"id": customtexts[0].pk, "title": "Changed"}])
+        assert get_content_version() == version
+
+    assert get_content_version() > version
+
+
+def test_homepage_bulk_update(admin_client):
+    homepage = HomePage.objects.first()
+
+    response = patch(admin_client, "/api/v1/homepage/bulk/", [{"id": homepage.pk, "body": "<p>Bulk</p>"}])
+
+    assert response.status_code == 200
+    homepage.refresh_from_db()
+    assert homepage.body == "<p>Bulk</p>"
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"id": 1, "title": "Not a list"},
+    [{"title": "No id"}],
+    [{"id": "1", "title": "String id"}],
+    [{"id": 1, "title": "Twice"}, {"id": 1, "title": "Twice"}],
+])
+def test_rejects_malformed_payloads(admin_client, data):
+    assert patch(admin_client, URL, data).status_code == 400
+
+
+def test_payload_size_is_capped(admin_client, customtexts, settings):
+    settings.API_BULK_UPDATE_MAX_ITEMS = 2
+
+    response = patch(admin_client, URL, [{"id": c.pk, "title": "x"} for c in customtexts[:3]])
+
+    assert response.status_code == 400
+    assert "At most 2 items" in response.json()[0]
+
+
+def test_requires_staff(client, user, customtexts):
+    client.force_login(user)
+
+    assert patch(client, URL, [{"id": customtexts[0].pk, "title": "x"}]).status_code == 403
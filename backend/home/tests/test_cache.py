@@ -0,0 +1,52 @@
+import pytest
+from django.urls import reverse
+
+from home.cache import get_content_version
+from home.models import CustomText, HomePage
+
+pytestmark = pytest.mark.django_db
+
+
+def test_content_version_bumps_on_save_and_delete(on_commit_callbacks):
+    version = get_content_version()
+    with on_commit_callbacks():
+        customtext = CustomText.objects.create(title="Title")
+        assert get_content_version() == version
+    assert get_content_version() == version + 1
+    with on_commit_callbacks():
+        customtext.delete()
+    assert get_content_version() == version + 2
+
+
+def test_anonymous_home_page_is_served_from_cache(client, django_assert_num_queries):
+    first = client.get(reverse("home"))
+    assert first.status_code == 200
+
+    with django_assert_num_queries(0):
+        second = client.get(reverse("home"))
+    assert second.content == first.content
+    assert "Cookie" in second["Vary"]
+
+
+def test_home_page_reflects_api_edits(client, admin_client, on_commit_callbacks):
+    customtext = CustomText.objects.first()
+    homepage = HomePage.objects.first()
+    client.get(reverse("home"))
+
+    with on_commit_callbacks():
+        admin_client.patch(
+            customtext.api, {"title": "Fresh title"}, content_type="application/json"
+        )
+        admin_client.patch(
+            homepage.api, {"body": "<p>Fresh body</p>"}, content_type="application/json"
+        )
+
+    response = client.get(reverse("home"))
+    assert b"Fresh title" in response.content
+    assert b"<p>Fresh body</p>" in response.content
+
+
+def test_authenticated_users_skip_the_page_cache(admin_client):
+    admin_client.get(reverse("home"))
+    response = admin_client.get(reverse("home"))
+    assert b'id="editor"' in response.content
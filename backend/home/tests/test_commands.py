@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+pytestmark = pytest.mark.django_db
+
+
+def run_report(capsys, **options):
+    call_command("generate_project_report", **options)
+    return json.loads(capsys.readouterr().out)
+
+
+def test_report_lists_models_and_urls(capsys):
+    report = run_report(capsys)
+
+    assert "CustomText" in report["models"]
+    assert {
+        "url": "/users/<str:username>/",
+        "module": "users.views.UserDetailView",
+        "name": "users:detail",
+        "decorators": "",
+    } in report["urls"]
+    assert not any("profile" in url for url in report["urls"])
+
+
+def test_report_profile(capsys, admin_user):
+    report = run_report(capsys, profile=True, profile_user=admin_user.username)
+    urls = {url["url"]: url for url in report["urls"]}
+
+    home = urls["/"]["profile"]
+    assert home["status"] == 200
+    assert home["queries"] >= 1
+    assert home["render_ms"] > 0
+    assert urls["/api/v1/customtext/"]["profile"]["status"] == 200
+    assert "profile" not in urls["/users/<str:username>/"]
+    # Logging out is skipped, later URLs are still profiled as the user.
+    assert "profile" not in urls["/admin/logout/"]
+    assert urls["/admin/password_change/"]["profile"]["status"] == 200
+
+
+@pytest.mark.django_db(databases=["default", "replica_1"])
+def test_report_profile_counts_replica_queries(capsys, admin_user, settings):
+    settings.DATABASE_REPLICAS = ["replica_1"]
+    type(admin_user).objects.using("replica_1").bulk_create([admin_user])
+
+    report = run_report(capsys, profile=True, profile_user=admin_user.username)
+    profile = {url["url"]: url for url in report["urls"]}["/api/v1/customtext/"]["profile"]
+
+    assert profile["status"] == 200
+    assert profile["queries"] >= 2
+
+
+def test_startup_profile(capsys):
+    call_command("startup_profile", limit=3, urlconf=False)
+    profile = json.loads(capsys.readouterr().out)
+
+    assert set(profile["phases"]) == {"settings", "apps"}
+    assert len(profile["modules"]) == 3
+    assert len(profile["packages"]) == 3
+    assert "home" in profile["ready"]
@@ -0,0 +1,117 @@
+from unittest import mock
+
+import pytest
+from django.db.models.signals import post_save
+
+from home.cache import get_content_version
+from home.models import CustomText, HomePage, VersionConflict
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def customtext():
+    return CustomText.objects.first()
+
+
+def test_retrieve_sets_etag_and_last_modified(admin_client, customtext):
+    response = admin_client.get(customtext.api)
+    assert response["ETag"] == '"%d-1"' % customtext.pk
+    assert "Last-Modified" in response
+    assert response.json()["version"] == 1
+
+
+def test_retrieve_not_modified(admin_client, customtext):
+    etag = admin_client.get(customtext.api)["ETag"]
+    response = admin_client.get(customtext.api, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    assert response.content == b""
+
+
+def test_list_not_modified_until_a_row_changes(admin_client, customtext):
+    url = "/api/v1/customtext/"
+    etag = admin_client.get(url)["ETag"]
+    assert admin_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    customtext.title = "Changed"
+    customtext.save()
+    response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+def test_patch_bumps_version(admin_client, customtext):
+    etag = admin_client.get(customtext.api)["ETag"]
+    response = admin_client.patch(
+        customtext.api,
+        {"title": "New"},
+        content_type="application/json",
+        HTTP_IF_MATCH=etag,
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response["ETag"] == '"%d-2"' % customtext.pk
+
+
+def test_patch_with_stale_etag_is_rejected(admin_client, customtext):
+    etag = admin_client.get(customtext.api)["ETag"]
+    customtext.title = "Someone else"
+    customtext.save()
+
+    response = admin_client.patch(
+        customtext.api,
+        {"title": "Mine"},
+        content_type="application/json",
+        HTTP_IF_MATCH=etag,
+    )
+    assert response.status_code == 412
+    customtext.refresh_from_db()
+    assert customtext.title == "Someone else"
+
+
+def test_conditional_save_detects_concurrent_write():
+    homepage = HomePage.objects.first()
+    stale = HomePage.objects.get(pk=homepage.pk)
+    homepage.body = "First"
+    homepage.save()
+
+    stale.body = "Second"
+    stale.expected_version = stale.version
+    with pytest.raises(VersionConflict):
+        stale.save()
+    homepage.refresh_from_db()
+    assert homepage.body == "First"
+    assert homepage.version == 2
+
+
+def test_save_does_not_read_the_version_back(customtext, django_assert_num_queries):
+    customtext.title = "Saved"
+    with django_assert_num_queries(1):
+        customtext.save()
+
+    with django_assert_num_queries(1):
+        assert customtext.version == 2
+
+
+def test_conflicting_save_leaves_the_caches_alone(customtext, on_commit_callbacks):
+    stale = CustomText.objects.get(pk=customtext.pk)
+    customtext.save()
+    seen = []
+
+    def receiver(sender, instance, **kwargs):
+        seen.append(instance.version)
+
+    post_save.connect(receiver, sender=CustomText)
+    try:
+        stale.expected_version = stale.version
+        version = get_content_version()
+        with on_commit_callbacks(), mock.patch("home.signals.purge_on_commit") as purge_on_commit:
+            with pytest.raises(VersionConflict):
+                stale.save()
+    finally:
+        post_save.disconnect(receiver, sender=CustomText)
+
+    assert get_content_version() == version
+    purge_on_commit.assert_not_called()
+    assert seen == [1]
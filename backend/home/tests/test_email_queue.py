@@ -0,0 +1,225 @@
+import socketserver
+import threading
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from home.mail import EmailQueueWorker, retry_delay
+from home.models import QueuedEmail
+
+pytestmark = pytest.mark.django_db
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 stub ESMTP')
+        envelope = {}
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 stub')
+            elif verb == 'MAIL':
+                envelope = {'from': command[10:].strip('<>'), 'to': []}
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                if server.responses:
+                    response = server.responses.pop(0)
+                    if response.startswith('421'):
+                        self.reply(response)
+                        return
+                    self.reply(response)
+                    continue
+                envelope['to'].append(command[8:].strip('<>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for line in iter(self.rfile.readline, b'.\r\n'):
+                    lines.append(line)
+                envelope['data'] = b''.join(lines)
+                server.messages.append(envelope)
+                self.reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.messages = []
+    # Replies used instead of "250 OK" for the next RCPT commands.
+    server.responses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.EMAIL_BACKEND = 'home.mail.QueuedEmailBackend'
+    settings.EMAIL_HOST = '127.0.0.1'
+    settings.EMAIL_PORT = server.server_address[1]
+    settings.EMAIL_HOST_USER = ''
+    settings.EMAIL_HOST_PASSWORD = ''
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_TIMEOUT = 5
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_backend_only_queues(smtp_server):
+    sent = mail.send_mail('Welcome', 'Hello there', 'app@example.com', ['a@example.com', 'b@example.com'])
+
+    assert sent == 1
+    assert smtp_server.connections == 0
+    email = QueuedEmail.objects.get()
+    assert email.status == QueuedEmail.QUEUED
+    assert email.recipients == 'a@example.com\nb@example.com'
+    assert b'Subject: Welcome' in bytes(email.message)
+
+
+def test_worker_sends_batches_over_one_connection(smtp_server):
+    messages = [
+        mail.EmailMessage('Message %d' % i, 'Body', 'app@example.com', ['user%d@example.com' % i])
+        for i in range(7)
+    ]
+    mail.get_connection().send_messages(messages)
+
+    stats = EmailQueueWorker(batch_size=3).run(once=True)
+
+    assert stats == {'sent': 7, 'retried': 0, 'failed': 0, 'connections': 1}
+    assert smtp_server.connections == 1
+    assert [message['to'] for message in smtp_server.messages] == [['user%d@example.com' % i] for i in range(7)]
+    assert b'Subject: Message 6' in smtp_server.messages[-1]['data']
+    assert set(QueuedEmail.objects.values_list('status', flat=True)) == {QueuedEmail.SENT}
+
+
+def test_temporary_failure_is_retried_with_backoff(smtp_server, settings):
+    settings.EMAIL_QUEUE_RETRY_DELAY = 60
+    mail.send_mail('Retry', 'Body', 'app@example.com', ['a@example.com'])
+    smtp_server.responses = ['451 Try again later']
+
+    stats = EmailQueueWorker().run(once=True)
+
+    assert stats['retried'] == 1
+    email = QueuedEmail.objects.get()
+    assert email.status == QueuedEmail.QUEUED
+    assert email.attempts == 1
+    assert '451' in email.last_error
+    assert email.next_attempt_at > timezone.now() + timedelta(seconds=50)
+
+    # Not due yet.
+    assert EmailQueueWorker().run(once=True)['sent'] == 0
+    QueuedEmail.objects.update(next_attempt_at=timezone.now())
+    assert EmailQueueWorker().run(once=True)['sent'] == 1
+    assert QueuedEmail.objects.get().attempts == 2
+    assert len(smtp_server.messages) == 1
+
+
+def test_reconnects_when_server_drops_the_connection(smtp_server):
+    for i in range(2):
+        mail.send_mail('Message %d' % i, 'Body', 'app@example.com', ['a@example.com'])
+    smtp_server.responses = ['421 Closing connection']
+
+    worker = EmailQueueWorker()
+    worker.run(once=True)
+    QueuedEmail.objects.update(next_attempt_at=timezone.now())
+    worker.run(once=True)
+
+    assert worker.stats == {'sent': 2, 'retried': 1, 'failed': 0, 'connections': 3}
+    assert QueuedEmail.objects.filter(status=QueuedEmail.SENT).count() == 2
+
+
+def test_gives_up_after_max_attempts(smtp_server, settings):
+    settings.EMAIL_QUEUE_MAX_ATTEMPTS = 2
+    mail.send_mail('Fail', 'Body', 'app@example.com', ['a@example.com'])
+    smtp_server.responses = ['451 Try again later', '451 Try again later']
+
+    EmailQueueWorker().run(once=True)
+    QueuedEmail.objects.update(next_attempt_at=timezone.now())
+    stats = EmailQueueWorker().run(once=True)
+
+    assert stats['failed'] == 1
+    email = QueuedEmail.objects.get()
+    assert email.status == QueuedEmail.FAILED
+    assert email.attempts == 2
+
+
+def test_rejected_recipient_fails_immediately(smtp_server):
+    mail.send_mail('Bounce', 'Body', 'app@example.com', ['nobody@example.com'])
+    smtp_server.responses = ['550 No such user']
+
+    stats = EmailQueueWorker().run(once=True)
+
+    assert stats['failed'] == 1
+    assert QueuedEmail.objects.get().status == QueuedEmail.FAILED
+
+
+def test_unexpected_error_is_retried_then_fails(smtp_server, settings):
+    settings.EMAIL_QUEUE_MAX_ATTEMPTS = 2
+    mail.send_mail('Broken', 'Body', 'app@example.com', ['a@example.com'])
+    mail.send_mail('Fine', 'Body', 'app@example.com', ['b@example.com'])
+    send = EmailQueueWorker.send
+
+    def broken_send(worker, email, **kwargs):
+        if email.recipients == 'a@example.com':
+            raise ValueError('Bad message')
+        return send(worker, email, **kwargs)
+
+    with mock.patch.object(EmailQueueWorker, 'send', broken_send):
+        assert EmailQueueWorker().run(once=True) == {'sent': 1, 'retried': 1, 'failed': 0, 'connections': 1}
+        email = QueuedEmail.objects.get(recipients='a@example.com')
+        assert email.status == QueuedEmail.QUEUED
+        assert email.last_error == 'ValueError: Bad message'
+
+        QueuedEmail.objects.update(next_attempt_at=timezone.now())
+        assert EmailQueueWorker().run(once=True)['failed'] == 1
+
+    assert QueuedEmail.objects.get(recipients='a@example.com').status == QueuedEmail.FAILED
+
+
+def test_retry_delay_is_capped(settings):
+    settings.EMAIL_QUEUE_RETRY_DELAY = 60
+    settings.EMAIL_QUEUE_MAX_RETRY_DELAY = 300
+
+    assert [retry_delay(attempts) for attempts in range(1, 6)] == [60, 120, 240, 300, 300]
+
+
+def test_command(smtp_server, capsys):
+    mail.send_mail('Command', 'Body', 'app@example.com', ['a@example.com'])
+
+    call_command('send_queued_email', '--once')
+
+    assert '"sent": 1' in capsys.readouterr().out
+    assert len(smtp_server.messages) == 1
+
+
+def test_run_deletes_sent_messages_past_retention(smtp_server, settings):
+    settings.EMAIL_QUEUE_RETENTION_DAYS = 7
+    now = timezone.now()
+    QueuedEmail.objects.create(status=QueuedEmail.SENT, sent_at=now - timedelta(days=8))
+    recent = QueuedEmail.objects.create(status=QueuedEmail.SENT, sent_at=now - timedelta(days=6))
+    failed = QueuedEmail.objects.create(status=QueuedEmail.FAILED, next_attempt_at=now - timedelta(days=8))
+
+    EmailQueueWorker().run(once=True)
+
+    assert set(QueuedEmail.objects.values_list('pk', flat=True)) == {recent.pk, failed.pk}
+
+    settings.EMAIL_QUEUE_RETENTION_DAYS = 0
+    assert EmailQueueWorker().purge() == 0
@@ -0,0 +1,73 @@
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+
+from home.api.v1.serializers import (
+    CustomTextFastSerializer,
+    CustomTextSerializer,
+    HomePageFastSerializer,
+    HomePageSerializer,
+    UserFastSerializer,
+    UserSerializer,
+)
+from home.api.v1.viewsets import CustomTextViewSet
+from home.models import CustomText, HomePage
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+TEXTS = ["", "plain", "Ünïcødé ✓ 🚀", '<p class="x">"quoted" & \\ escaped</p>', "line\nbreak sep", "x" * 150]
+
+
+@pytest.fixture
+def rows():
+    for i, text in enumerate(TEXTS):
+        CustomText.objects.create(title=text)
+        HomePage.objects.create(body=text)
+        User.objects.create(username="user%d" % i, email="user%d@example.com" % i, name=text or None)
+    # Updated rows have a version above 1 and a later updated_at.
+    customtext = CustomText.objects.first()
+    customtext.title = "Edited"
+    customtext.save()
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.parametrize("fast, serializer, model", [
+    (CustomTextFastSerializer, CustomTextSerializer, CustomText),
+    (HomePageFastSerializer, HomePageSerializer, HomePage),
+    (UserFastSerializer, UserSerializer, User),
+])
+def test_output_is_byte_identical(rows, fast, serializer, model):
+    queryset = model.objects.order_by("pk")
+
+    assert render(fast.many(queryset)) == render(serializer(queryset, many=True).data)
+    for instance in queryset:
+        assert render(fast.from_instance(instance)) == render(serializer(instance).data)
+
+
+def test_fetches_only_serialized_columns():
+    sql = str(UserFastSerializer.values(User.objects.all()).query)
+
+    assert '"password"' not in sql
+    assert '"email"' in sql
+
+
+def test_list_endpoint_matches_model_serializer(admin_client, rows, monkeypatch):
+    fast = admin_client.get("/api/v1/customtext/").content
+    monkeypatch.setattr(CustomTextViewSet, "fast_serializer_class", None)
+
+    assert admin_client.get("/api/v1/customtext/").content == fast
+
+
+def test_login_user_payload(client, user):
+    user.set_password("pa55-w0rd")
+    user.save()
+
+    response = client.post("/api/v1/login/", {"username": user.username, "password": "pa55-w0rd"})
+
+    assert response.status_code == 200
+    assert render(response.json()["user"]) == render(UserSerializer(user).data)
@@ -0,0 +1,64 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from home.models import CustomText
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/v1/customtext/"
+
+
+@pytest.fixture
+def customtexts():
+    CustomText.objects.bulk_create(CustomText(title="Title %d" % i) for i in range(9))
+    return list(CustomText.objects.order_by("id").values_list("id", flat=True))
+
+
+def walk(client, url):
+    ids = []
+    while url:
+        data = client.get(url).json()
+        ids += [row["id"] for row in data["results"]]
+        url = data["next"]
+    return ids
+
+
+def test_pages_through_all_rows_in_id_order(admin_client, customtexts):
+    assert walk(admin_client, URL + "?page_size=3") == customtexts
+
+
+def test_first_page(admin_client, customtexts):
+    data = admin_client.get(URL + "?page_size=4").json()
+
+    assert set(data) == {"next", "previous", "results"}
+    assert [row["id"] for row in data["results"]] == customtexts[:4]
+    assert data["previous"] is None
+    assert "cursor=" in data["next"]
+
+
+def test_no_count_query(admin_client, customtexts):
+    with CaptureQueriesContext(connection) as queries:
+        admin_client.get(URL + "?page_size=3")
+
+    assert not any("COUNT(" in query["sql"].upper() for query in queries)
+
+
+def test_stable_under_concurrent_inserts(admin_client, customtexts):
+    first = admin_client.get(URL + "?page_size=4").json()
+    CustomText.objects.create(title="Inserted while paging")
+
+    ids = [row["id"] for row in first["results"]] + walk(admin_client, first["next"])
+
+    assert ids[: len(customtexts)] == customtexts
+    assert len(ids) == len(set(ids)) == len(customtexts) + 1
+
+
+def test_page_size_is_capped(admin_client, customtexts, settings):
+    settings.API_MAX_PAGE_SIZE = 2
+
+    assert len(admin_client.get(URL + "?page_size=50").json()["results"]) == 2
+
+
+def test_invalid_cursor(admin_client):
+    assert admin_client.get(URL + "?cursor=bogus").status_code == 404
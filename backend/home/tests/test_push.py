@@ -0,0 +1,228 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from django.core.management import call_command
+from fcm_django.models import FCMDevice
+from fcm_django.settings import FCM_DJANGO_SETTINGS
+
+from home.push import PushDispatcher
+
+pytestmark = pytest.mark.django_db
+
+
+class FakeFCMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def respond(self, status, body=None, headers=()):
+        content = json.dumps(body or {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.requests.append(payload)
+            status = server.statuses.pop(0) if server.statuses else 200
+        if self.headers['Authorization'] != 'key=test-key':
+            return self.respond(401)
+        if status != 200:
+            return self.respond(status, headers=[('Retry-After', '0')])
+        if server.html:
+            content = b'<html>Bad gateway</html>'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            return self.wfile.write(content)
+
+        results = []
+        for token in payload['registration_ids']:
+            with server.lock:
+                seen = server.seen.get(token, 0)
+                server.seen[token] = seen + 1
+            if token.startswith('invalid'):
+                results.append({'error': 'NotRegistered'})
+            elif token.startswith('unavailable') and not seen:
+                results.append({'error': 'Unavailable'})
+            elif token.startswith('old'):
+                results.append({'message_id': '1', 'registration_id': 'new' + token[3:]})
+            else:
+                results.append({'message_id': '1'})
+        self.respond(200, {'results': results[:len(results) - server.missing_results]})
+
+
+@pytest.fixture
+def fcm_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeFCMHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = []
+    server.seen = {}
+    # HTTP status codes returned, in order, instead of 200.
+    server.statuses = []
+    # Answer 200 with an HTML page, as a misbehaving proxy would.
+    server.html = False
+    # Leave out the results of the last tokens of a batch.
+    server.missing_results = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = 'http://127.0.0.1:%d/fcm/send' % server.server_address[1]
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dispatcher(fcm_server):
+    return PushDispatcher(server=fcm_server.url, api_key='test-key', batch_size=3, workers=2, retry_delay=0)
+
+
+def create_devices(*tokens):
+    FCMDevice.objects.bulk_create(FCMDevice(registration_id=token, type='android') for token in tokens)
+
+
+def test_sends_batches_over_reused_connections(dispatcher, fcm_server):
+    create_devices(*('token-%d' % i for i in range(10)))
+    FCMDevice.objects.create(registration_id='inactive', type='ios', active=False)
+
+    stats = dispatcher.send(title='Hello', body='World', data={'id': 1})
+
+    assert stats.as_dict()['sent'] == 10
+    assert stats.requests == 4
+    assert sorted(len(request['registration_ids']) for request in fcm_server.requests) == [1, 3, 3, 3]
+    assert fcm_server.requests[0]['notification'] == {'title': 'Hello', 'body': 'World'}
+    assert fcm_server.requests[0]['data'] == {'id': 1}
+    assert 'inactive' not in fcm_server.seen
+    # One keep-alive connection per worker thread at most.
+    assert fcm_server.connections <= 2
+
+
+def test_prunes_invalid_tokens_and_applies_canonical_ids(dispatcher):
+    create_devices('good', 'invalid-1', 'invalid-2', 'old-1')
+
+    stats = dispatcher.send(title='Hello')
+
+    assert (stats.sent, stats.failed, stats.invalid, stats.canonical) == (2, 2, 2, 1)
+    assert set(FCMDevice.objects.filter(active=False).values_list('registration_id', flat=True)) == {
+        'invalid-1', 'invalid-2',
+    }
+    assert FCMDevice.objects.filter(registration_id='new-1').exists()
+
+
+def test_deletes_invalid_tokens_when_configured(dispatcher, monkeypatch):
+    monkeypatch.setitem(FCM_DJANGO_SETTINGS, 'DELETE_INACTIVE_DEVICES', True)
+    create_devices('good', 'invalid-1')
+
+    dispatcher.send(title='Hello')
+
+    assert list(FCMDevice.objects.values_list('registration_id', flat=True)) == ['good']
+
+
+def test_retries_unavailable_tokens_only(dispatcher, fcm_server):
+    create_devices('good', 'unavailable-1')
+
+    stats = dispatcher.send(title='Hello')
+
+    assert (stats.sent, stats.failed, stats.retried) == (2, 0, 1)
+    assert [request['registration_ids'] for request in fcm_server.requests] == [['good', 'unavailable-1'], ['unavailable-1']]
+
+
+def test_retries_batches_after_server_errors(dispatcher, fcm_server):
+    create_devices('a', 'b')
+    fcm_server.statuses = [503, 429]
+
+    stats = dispatcher.send(title='Hello')
+
+    assert (stats.sent, stats.retried, stats.requests) == (2, 4, 3)
+
+
+def test_gives_up_after_max_retries(fcm_server):
+    create_devices('a', 'b')
+    fcm_server.statuses = [500] * 3
+    dispatcher = PushDispatcher(server=fcm_server.url, api_key='test-key', max_retries=2, retry_delay=0)
+
+    stats = dispatcher.send(title='Hello')
+
+    assert (stats.sent, stats.failed, stats.requests) == (0, 2, 3)
+    assert FCMDevice.objects.filter(active=True).count() == 2
+
+
+def test_batch_and_token_retries_share_one_budget(fcm_server):
+    create_devices('unavailable-1')
+    fcm_server.statuses = [500, 500]
+    dispatcher = PushDispatcher(server=fcm_server.url, api_key='test-key', max_retries=2, retry_delay=0)
+
+    stats = dispatcher.send(title='Hello')
+
+    assert (stats.sent, stats.failed, stats.requests) == (0, 1, 3)
+
+
+def test_tokens_without_a_result_count_as_failed(dispatcher, fcm_server):
+    create_devices('a', 'b', 'c')
+    fcm_server.missing_results = 1
+
+    stats = dispatcher.send(title='Hello')
+
+    assert (stats.devices, stats.sent, stats.failed) == (3, 2, 1)
+
+
+def test_authentication_error_fails_without_retry(fcm_server):
+    create_devices('a')
+
+    stats = PushDispatcher(server=fcm_server.url, api_key='wrong', retry_delay=0).send(title='Hello')
+
+    assert (stats.failed, stats.requests) == (1, 1)
+
+
+def test_non_json_response_fails_the_batch(dispatcher, fcm_server):
+    create_devices('a', 'b')
+    fcm_server.html = True
+
+    stats = dispatcher.send(title='Hello')
+
+    assert (stats.sent, stats.failed, stats.requests) == (0, 2, 1)
+
+
+def test_retry_after_is_capped(settings):
+    settings.PUSH_MAX_RETRY_AFTER = 30
+    dispatcher = PushDispatcher(server='http://fcm.invalid/', api_key='test-key', retry_delay=1)
+    response = requests.Response()
+
+    response.headers['Retry-After'] = '5'
+    assert dispatcher.backoff(0, response) == 5
+    response.headers['Retry-After'] = '86400'
+    assert dispatcher.backoff(0, response) == 30
+    response.headers['Retry-After'] = 'Fri, 01 Jan 2100 00:00:00 GMT'
+    assert dispatcher.backoff(0, response) == 30
+    response.headers['Retry-After'] = 'soon'
+    assert dispatcher.backoff(2, response) == 4
+
+
+def test_command(fcm_server, settings, monkeypatch, capsys, user):
+    monkeypatch.setitem(FCM_DJANGO_SETTINGS, 'FCM_SERVER', fcm_server.url)
+    monkeypatch.setitem(FCM_DJANGO_SETTINGS, 'FCM_SERVER_KEY', 'test-key')
+    create_devices('a')
+    FCMDevice.objects.create(registration_id='b', type='ios', user=user)
+
+    call_command('send_push', '--data', '{"kind": "ping"}', '--user', str(user.pk))
+
+    assert json.loads(capsys.readouterr().out)['sent'] == 1
+    assert fcm_server.requests == [{'data': {'kind': 'ping'}, 'registration_ids': ['b']}]
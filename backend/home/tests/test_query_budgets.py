@@ -0,0 +1,21 @@
+import pytest
+
+from benchmarks.endpoints import ENDPOINTS, count_queries, create_fixtures, make_clients
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def fixtures():
+    return create_fixtures()
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS, ids=[endpoint.name for endpoint in ENDPOINTS])
+def test_endpoint_stays_within_query_budget(endpoint, fixtures):
+    queries = count_queries(endpoint, make_clients(fixtures), fixtures)
+
+    assert queries <= endpoint.budget, "%s ran %d queries, budget is %d" % (
+        endpoint.name,
+        queries,
+        endpoint.budget,
+    )
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from django.http import StreamingHttpResponse
+
+from home.api.v1.serializers import CustomTextSerializer
+from home.api.v1.viewsets import CustomTextViewSet
+from home.models import CustomText
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/v1/customtext/"
+
+
+@pytest.fixture
+def customtexts():
+    CustomText.objects.bulk_create(CustomText(title="Títle %d" % i) for i in range(250))
+    return CustomTextSerializer(CustomText.objects.order_by("id"), many=True).data
+
+
+def body(response):
+    assert isinstance(response, StreamingHttpResponse)
+    return b"".join(response.streaming_content)
+
+
+def test_streams_json_array(admin_client, customtexts):
+    response = admin_client.get(URL + "?stream=json")
+
+    assert response["Content-Type"] == "application/json"
+    assert json.loads(body(response)) == customtexts
+
+
+@pytest.mark.parametrize("params, headers", [
+    ("?stream=ndjson", {}),
+    ("?format=ndjson", {}),
+    ("", {"HTTP_ACCEPT": "application/x-ndjson"}),
+])
+def test_streams_ndjson(admin_client, customtexts, params, headers):
+    response = admin_client.get(URL + params, **headers)
+
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = body(response).decode().splitlines()
+    assert [json.loads(line) for line in lines] == customtexts
+
+
+def test_empty_list(admin_client):
+    CustomText.objects.all().delete()
+
+    assert body(admin_client.get(URL + "?stream=json")) == b"[]"
+    assert body(admin_client.get(URL + "?stream=ndjson")) == b""
+
+
+def test_matches_regular_rendering(admin_client, customtexts, settings):
+    settings.API_MAX_PAGE_SIZE = 1000
+    regular = admin_client.get(URL + "?page_size=1000").json()["results"]
+
+    assert json.loads(body(admin_client.get(URL + "?stream=json"))) == regular
+
+
+def test_reads_rows_in_chunks(admin_client, customtexts, settings, monkeypatch):
+    settings.API_STREAM_CHUNK_SIZE = 50
+    chunk_sizes = []
+    iterator = CustomText.objects.all().iterator.__func__
+
+    def spy(queryset, chunk_size=2000):
+        chunk_sizes.append(chunk_size)
+        return iterator(queryset, chunk_size=chunk_size)
+
+    monkeypatch.setattr(type(CustomText.objects.all()), "iterator", spy)
+    body(admin_client.get(URL + "?stream=json"))
+
+    assert chunk_sizes == [50]
+
+
+@pytest.mark.parametrize("ordering, expected", [
+    (None, ("pk",)),
+    ("-title", ("-title",)),
+])
+def test_streams_in_a_stable_order(admin_client, customtexts, monkeypatch, ordering, expected):
+    order_by = []
+    iterator = CustomText.objects.all().iterator.__func__
+
+    def spy(queryset, chunk_size=2000):
+        order_by.append(queryset.query.order_by)
+        return iterator(queryset, chunk_size=chunk_size)
+
+    monkeypatch.setattr(type(CustomText.objects.all()), "iterator", spy)
+    if ordering is not None:
+        get_queryset = CustomTextViewSet.get_queryset
+        monkeypatch.setattr(
+            CustomTextViewSet, "get_queryset", lambda self: get_queryset(self).order_by(ordering)
+        )
+    rows = json.loads(body(admin_client.get(URL + "?stream=json")))
+
+    assert order_by == [expected]
+    if ordering is None:
+        assert rows == customtexts
+
+
+def test_retrieve_as_ndjson(admin_client, customtexts):
+    response = admin_client.get(URL + "%d/?format=ndjson" % customtexts[0]["id"])
+
+    assert response.content.count(b"\n") == 1
+    assert json.loads(response.content) == customtexts[0]
@@ -0,0 +1,92 @@
+import pytest
+
+from home.api.v1 import throttling
+from home.api.v1.throttling import TokenBuckets, hashing_gate
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)
+
+    return set_rates
+
+
+def login(client, username, url="/api/v1/login/", **extra):
+    return client.post(url, {"username": username, "password": "wrong"}, **extra)
+
+
+def test_account_bucket(client, rates):
+    rates(login_account="2/minute")
+
+    assert login(client, "alice@example.com").status_code == 400
+    assert login(client, "ALICE@example.com ").status_code == 400
+    response = login(client, "alice@example.com")
+
+    assert response.status_code == 429
+    assert 0 < int(response["Retry-After"]) <= 30
+    assert login(client, "bob@example.com").status_code == 400
+
+
+def test_ip_bucket(client, rates):
+    rates(login_ip="2/minute")
+
+    assert login(client, "a@example.com").status_code == 400
+    assert login(client, "b@example.com").status_code == 400
+    assert login(client, "c@example.com").status_code == 429
+    assert login(client, "d@example.com", REMOTE_ADDR="10.0.0.2").status_code == 400
+
+
+def test_spoofed_forwarded_for_keeps_the_ip_bucket(client, rates):
+    rates(login_ip="2/minute")
+
+    # The router appends the address it saw to what the client sent.
+    for i, status_code in enumerate([400, 400, 429, 429]):
+        forwarded_for = "10.0.0.%d, 203.0.113.7" % i
+        assert login(client, "user%d@example.com" % i, HTTP_X_FORWARDED_FOR=forwarded_for).status_code == status_code
+    assert login(client, "other@example.com", HTTP_X_FORWARDED_FOR="203.0.113.8").status_code == 400
+
+
+def test_rest_auth_login_shares_the_login_buckets(client, rates):
+    rates(login_account="1/minute")
+
+    assert login(client, "alice@example.com").status_code == 400
+    response = client.post("/rest-auth/login/", {"email": "alice@example.com", "password": "wrong"})
+
+    assert response.status_code == 429
+
+
+def test_signup_bucket(client, rates):
+    rates(signup_ip="1/hour")
+    data = {"email": "new@example.com", "password": "Sup3r-secret-pass"}
+
+    assert client.post("/api/v1/signup/", data).status_code == 201
+    assert client.post("/api/v1/signup/", dict(data, email="other@example.com")).status_code == 429
+
+
+def test_buckets_refill(monkeypatch, settings):
+    now = [1000.0]
+    monkeypatch.setattr(throttling.time, "time", lambda: now[0])
+    buckets = TokenBuckets()
+
+    assert [buckets.take("bucket", 2, 10) for _ in range(3)] == [0, 0, 5]
+    now[0] += 5
+    assert buckets.take("bucket", 2, 10) == 0
+    assert buckets.take("bucket", 2, 10) == 5
+
+
+def test_sheds_load_when_the_hashing_gate_is_full(client, settings):
+    settings.PASSWORD_HASHING_CONCURRENCY = 1
+    settings.PASSWORD_HASHING_RETRY_AFTER = 2
+    assert hashing_gate.acquire()
+    try:
+        response = login(client, "alice@example.com")
+    finally:
+        hashing_gate.release()
+
+    assert response.status_code == 429
+    assert response["Retry-After"] == "2"
+    assert login(client, "alice@example.com").status_code == 400
+    assert hashing_gate.active == 0
@@ -0,0 +1,140 @@
+import io
+import json
+from unittest import mock
+
+import pytest
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from home.user_import import UserImporter, read_rows
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+CSV = """email,name,password
+ada@example.com,Ada Lovelace,s3cret-pass
+grace@example.com,Grace Hopper,
+ADA@example.com,Ada Again,other
+not-an-email,Nobody,x
+"""
+
+
+def test_import_creates_users_and_email_addresses():
+    stats = UserImporter(workers=0).run(read_rows(io.StringIO(CSV), "csv"))
+
+    assert stats["created"] == 2
+    assert stats["skipped"] == 1
+    assert stats["failed"] == 1
+    assert stats["errors"][0]["line"] == 5
+
+    ada = User.objects.get(email="ada@example.com")
+    assert ada.name == "Ada Lovelace"
+    assert ada.check_password("s3cret-pass")
+    assert not User.objects.get(email="grace@example.com").has_usable_password()
+    assert EmailAddress.objects.get(user=ada).primary
+
+
+def test_import_skips_registered_emails_and_allocates_unique_usernames(user):
+    rows = [
+        (1, {"email": user.email.upper(), "name": "Existing"}),
+        (2, {"email": "one@example.com", "name": user.username}),
+        (3, {"email": "two@example.com", "name": user.username}),
+    ]
+    stats = UserImporter(workers=0, chunk_size=2).run(rows)
+
+    assert stats["created"] == 2
+    assert stats["skipped"] == 1
+    usernames = set(User.objects.values_list("username", flat=True))
+    assert len(usernames) == 3
+
+
+def test_usernames_go_through_the_adapter(settings):
+    # Every base is rejected, down to the "user" fallback.
+    settings.ACCOUNT_USERNAME_BLACKLIST = ["admin", "one", "user"]
+    rows = [(1, {"email": "one@example.com", "name": "Admin"})]
+
+    UserImporter(workers=0).run(rows)
+
+    username = User.objects.get(email="one@example.com").username
+    assert username.startswith("user") and username != "user"
+
+
+def test_rows_registered_during_the_import_fail_alone(user):
+    rows = [
+        (1, {"email": "one@example.com", "name": user.username}),
+        (2, {"email": "two@example.com", "name": "Two"}),
+    ]
+    importer = UserImporter(workers=0)
+    # As if `user` signed up between the username lookup and the insert.
+    with mock.patch.object(UserImporter, "taken_usernames", lambda self, candidates: set()):
+        stats = importer.run(rows)
+
+    assert stats["created"] == 1
+    assert stats["failed"] == 1
+    assert stats["errors"][0]["line"] == 1
+    assert User.objects.filter(email="two@example.com").exists()
+    assert not User.objects.filter(email="one@example.com").exists()
+
+
+def test_import_query_count_is_independent_of_chunk_size(django_assert_max_num_queries):
+    rows = [(i, {"email": "user%d@example.com" % i, "name": "User %d" % i}) for i in range(200)]
+    with django_assert_max_num_queries(12):
+        stats = UserImporter(workers=0, chunk_size=200).run(rows)
+    assert stats["created"] == 200
+
+
+def test_import_users_command(tmp_path, capsys):
+    path = tmp_path / "users.jsonl"
+    path.write_text(
+        '{"email": "a@example.com", "name": "A"}\n{"email": "b@example.com", "name": "B"}\n'
+    )
+    call_command("import_users", str(path), workers=0)
+    stats = json.loads(capsys.readouterr().out)
+    assert stats["created"] == 2
+
+
+def test_import_endpoint_is_admin_only(client, admin_client):
+    upload = io.BytesIO(CSV.encode())
+    upload.name = "users.csv"
+    assert client.post("/api/v1/import-users/", {"file": upload}).status_code == 403
+
+    upload.seek(0)
+    response = admin_client.post("/api/v1/import-users/", {"file": upload})
+    assert response.status_code == 201
+    assert response.json()["created"] == 2
+
+
+def test_unreadable_rows_are_reported_as_errors(tmp_path, capsys):
+    path = tmp_path / "users.jsonl"
+    path.write_bytes(
+        b'{"email": "ok@example.com"}\n'
+        b'{"email": \n'
+        b'["not", "an", "object"]\n'
+        b'{"email": "caf\xe9@example.com"}\n'
+        b'{"email": 42}\n'
+    )
+    call_command("import_users", str(path), workers=0)
+    stats = json.loads(capsys.readouterr().out)
+
+    assert stats["created"] == 1
+    assert stats["failed"] == 4
+    errors = {error["line"]: error["error"] for error in stats["errors"]}
+    assert errors[2].startswith("Not valid JSON")
+    assert errors[3] == "Expected a JSON object."
+    assert errors[4] == "Not valid UTF-8."
+    assert errors[5] == "email, name and password must be strings."
+
+
+def test_import_endpoint_reports_bad_rows_in_process(admin_client):
+    upload = io.BytesIO(b"email,name\nada@example.com,Ada\nb\xffd@example.com,Bad\n")
+    upload.name = "users.csv"
+
+    with mock.patch("home.user_import.ProcessPoolExecutor") as pool:
+        response = admin_client.post("/api/v1/import-users/", {"file": upload})
+
+    assert response.status_code == 201
+    assert response.json()["created"] == 1
+    assert response.json()["errors"] == [{"line": 3, "email": "", "error": "Not valid UTF-8."}]
+    pool.assert_not_called()
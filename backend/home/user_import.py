@@ -0,0 +1,299 @@
+"""
+Bulk user import.
+
+Rows are read lazily from CSV or JSONL and processed in chunks. Each chunk
+costs a fixed number of queries no matter how many rows it holds: one to find
+emails that are already registered, one or two to allocate usernames, and the
+bulk inserts for users and their allauth EmailAddress rows.
+"""
+import csv
+import itertools
+import json
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from allauth.account import app_settings as allauth_settings
+from allauth.account.adapter import get_adapter
+from allauth.account.models import EmailAddress
+from allauth.utils import generate_username_candidates
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+User = get_user_model()
+
+FORMATS = ("csv", "jsonl")
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError:
+    """A row that couldn't be read, reported as a failed row."""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def decode_lines(lines, bad_lines):
+    """Text lines from text or UTF-8 lines. Undecodable line numbers are appended to `bad_lines`."""
+    for line_num, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            try:
+                line = line.decode("utf-8")
+            except UnicodeDecodeError:
+                bad_lines.append(line_num)
+                line = line.decode("utf-8", "replace")
+        yield line
+
+
+def read_rows(lines, format):
+    """Yield (line number, row dict or RowError) pairs from an iterable of text or UTF-8 lines."""
+    if format not in FORMATS:
+        raise ValueError("Unknown format %r, expected one of %s" % (format, ", ".join(FORMATS)))
+    bad_lines = []
+    lines = decode_lines(lines, bad_lines)
+    if format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            if bad_lines:
+                bad_lines.clear()
+                yield reader.line_num, RowError("Not valid UTF-8.")
+            else:
+                yield reader.line_num, row
+        return
+
+    for line_num, line in enumerate(lines, 1):
+        if bad_lines:
+            bad_lines.clear()
+            yield line_num, RowError("Not valid UTF-8.")
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_num, RowError("Not valid JSON: %s" % e)
+            continue
+        if isinstance(row, dict):
+            yield line_num, row
+        else:
+            yield line_num, RowError("Expected a JSON object.")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _setup_worker():
+    django.setup()
+
+
+class UserImporter:
+    """Create users in bulk.
+
+    `workers` is the size of the process pool used for password hashing;
+    0 hashes in the calling process. `progress`, if given, is called with
+    the running totals after every chunk.
+    """
+
+    def __init__(self, chunk_size=None, workers=None, verified=False, progress=None):
+        self.chunk_size = chunk_size or settings.USER_IMPORT_CHUNK_SIZE
+        self.workers = settings.USER_IMPORT_WORKERS if workers is None else workers
+        self.verified = verified
+        self.progress = progress
+        self.adapter = get_adapter()
+
+    def run(self, rows):
+        self.seen_emails = set()
+        self.seen_usernames = set()
+        self.stats = {"processed": 0, "created": 0, "skipped": 0, "failed": 0, "errors": []}
+        started = time.monotonic()
+
+        executor = None
+        if self.workers:
+            executor = ProcessPoolExecutor(self.workers, initializer=_setup_worker)
+        try:
+            for chunk in chunked(rows, self.chunk_size):
+                self.import_chunk(chunk, executor)
+                self.stats["elapsed"] = round(time.monotonic() - started, 3)
+                self.stats["rows_per_sec"] = round(
+                    self.stats["processed"] / max(self.stats["elapsed"], 1e-6), 1
+                )
+                if self.progress is not None:
+                    self.progress(self.stats)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stats.setdefault("elapsed", 0)
+        self.stats.setdefault("rows_per_sec", 0)
+        return self.stats
+
+    def error(self, line_num, email, message):
+        self.stats["failed"] += 1
+        if len(self.stats["errors"]) < MAX_REPORTED_ERRORS:
+            self.stats["errors"].append({"line": line_num, "email": email, "error": message})
+
+    def clean_chunk(self, chunk):
+        """Validate rows and drop emails already seen earlier in the input."""
+        cleaned = []
+        for line_num, row in chunk:
+            self.stats["processed"] += 1
+            if isinstance(row, RowError):
+                self.error(line_num, "", row.message)
+                continue
+            values = [row.get(field) or "" for field in ("email", "name", "password")]
+            if not all(isinstance(value, str) for value in values):
+                self.error(line_num, "", "email, name and password must be strings.")
+                continue
+            email = values[0].strip()
+            try:
+                validate_email(email)
+                email = self.adapter.clean_email(email)
+            except ValidationError as e:
+                self.error(line_num, email, " ".join(e.messages))
+                continue
+            if email.lower() in self.seen_emails:
+                self.stats["skipped"] += 1
+                continue
+            self.seen_emails.add(email.lower())
+            cleaned.append((line_num, email, values[1], values[2] or None))
+        return cleaned
+
+    def existing_emails(self, emails):
+        lowered = [email.lower() for email in emails]
+        addresses = (
+            EmailAddress.objects.annotate(lower_email=Lower("email"))
+            .filter(lower_email__in=lowered)
+            .values_list("lower_email", flat=True)
+        )
+        users = (
+            User.objects.annotate(lower_email=Lower("email"))
+            .filter(lower_email__in=lowered)
+            .values_list("lower_email", flat=True)
+        )
+        return set(addresses.union(users))
+
+    def taken_usernames(self, candidates):
+        return set(
+            User.objects.annotate(lower_username=Lower("username"))
+            .filter(lower_username__in={c.lower() for c in candidates})
+            .values_list("lower_username", flat=True)
+        ) | self.seen_usernames
+
+    def clean_username(self, username):
+        """`username` if the adapter accepts it, else None."""
+        try:
+            return self.adapter.clean_username(username, shallow=True)
+        except ValidationError:
+            return None
+
+    def username_base(self, texts):
+        """The base username allauth's generate_unique_username() derives from `texts`."""
+        for text in texts:
+            if not text:
+                continue
+            username = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+            # Only the part before the "@" of an email address.
+            username = re.sub(r"[^\w\s@+.-]", "", username).lower().split("@")[0].strip()
+            username = self.clean_username(re.sub(r"\s+", "_", username))
+            if username:
+                return username
+        return "user"
+
+    def allocate_usernames(self, rows):
+        """Same choices as allauth's generate_unique_username, in bulk."""
+        bases = [self.username_base([name, email, "user"]) for _, email, name, _ in rows]
+        taken = self.taken_usernames(bases)
+
+        usernames = [None] * len(rows)
+        collided = []
+        for i, base in enumerate(bases):
+            if (len(base) >= allauth_settings.USERNAME_MIN_LENGTH and base.lower() not in taken
+                    and self.clean_username(base)):
+                usernames[i] = base
+                taken.add(base.lower())
+            else:
+                collided.append(i)
+
+        if collided:
+            candidates = {i: generate_username_candidates(bases[i]) for i in collided}
+            taken |= self.taken_usernames(itertools.chain(*candidates.values()))
+            for i in collided:
+                for candidate in candidates[i]:
+                    if candidate.lower() in taken:
+                        continue
+                    usernames[i] = self.clean_username(candidate)
+                    if usernames[i]:
+                        taken.add(candidate.lower())
+                        break
+        self.seen_usernames |= {username.lower() for username in usernames if username}
+        return usernames
+
+    def hash_passwords(self, passwords, executor):
+        if executor is None:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+    def import_chunk(self, chunk, executor=None):
+        rows = self.clean_chunk(chunk)
+        if not rows:
+            return
+        existing = self.existing_emails([email for _, email, _, _ in rows])
+        new_rows = [row for row in rows if row[1].lower() not in existing]
+        self.stats["skipped"] += len(rows) - len(new_rows)
+        if not new_rows:
+            return
+
+        usernames = self.allocate_usernames(new_rows)
+        passwords = self.hash_passwords([row[3] for row in new_rows], executor)
+        users = []
+        line_nums = []
+        for (line_num, email, name, _), username, password in zip(new_rows, usernames, passwords):
+            if username is None:
+                self.error(line_num, email, "Unable to find a unique username.")
+                continue
+            users.append(User(email=email, name=name, username=username, password=password))
+            line_nums.append(line_num)
+
+        try:
+            self.insert(users)
+        except IntegrityError:
+            # A signup took one of the emails or usernames after they were
+            # checked. Find out which row by inserting them one at a time.
+            for line_num, user in zip(line_nums, users):
+                user.pk = None
+                try:
+                    self.insert([user])
+                except IntegrityError:
+                    self.error(line_num, user.email, "The email or username was registered during the import.")
+
+    def insert(self, users):
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            if any(user.pk is None for user in users):
+                # Only some backends (Postgres) return primary keys from bulk_create.
+                pks = dict(
+                    User.objects.filter(username__in=[user.username for user in users])
+                    .values_list("username", "pk")
+                )
+                for user in users:
+                    user.pk = pks[user.username]
+            EmailAddress.objects.bulk_create(
+                EmailAddress(user_id=user.pk, email=user.email, primary=True, verified=self.verified)
+                for user in users
+            )
+        self.stats["created"] += len(users)
@@ -0,0 +1,29 @@
+"""
+drf_yasg views of /api-docs/. Importing drf_yasg's generator is slow, so this
+module is only imported by the requests and commands that need it, see
+my_app_17226/api_schema.py.
+"""
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+info = openapi.Info(
+    title="My App API",
+    default_version="v1",
+    description="API documentation for My App App",
+)
+
+schema_view = get_schema_view(
+    info,
+    public=True,
+    permission_classes=(permissions.IsAuthenticated,),
+)
+
+swagger_view = schema_view.with_ui("swagger", cache_timeout=0)
+
+
+def generate_schema():
+    """The full OpenAPI schema as JSON. It has no `host`, so clients use the one serving it."""
+    schema = schema_view.generator_class(info).get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
@@ -0,0 +1,117 @@
+"""
+Prebuilt OpenAPI schema for /api-docs/.
+
+drf_yasg builds the schema by introspecting every viewset and serializer,
+which costs hundreds of milliseconds per request. `manage.py
+build_api_schema`, run in the Dockerfile next to collectstatic, writes it to
+API_SCHEMA_FILE instead, and requests for the schema (`?format=openapi`, or
+`Accept: application/openapi+json`) are answered from that file with an
+ETag. The file is read once per process; if it is missing, the schema is
+generated once and kept in memory.
+
+With API_DOCS_LIVE, the default when DEBUG is on, the schema is generated on
+every request so that it follows code changes. The Swagger UI page itself
+is always rendered by drf_yasg, which doesn't need the schema for it.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import permissions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_MEDIA_TYPE = "application/openapi+json"
+
+
+def write_schema(path):
+    """Generate the schema and write it to `path` atomically. Returns its size."""
+    from my_app_17226.api_docs import generate_schema
+
+    content = generate_schema()
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=".api-schema.", delete=False) as f:
+        f.write(content)
+    os.chmod(f.name, 0o644)
+    os.replace(f.name, path)
+    return len(content)
+
+
+class SchemaCache:
+    """Schema file contents and ETags, by path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schemas = {}
+
+    def get(self, path):
+        with self._lock:
+            if path not in self._schemas:
+                try:
+                    with open(path, "rb") as f:
+                        content = f.read()
+                except FileNotFoundError:
+                    logger.warning(
+                        "%s is missing, generating the API schema. Run `manage.py build_api_schema` "
+                        "when building the image.", path,
+                    )
+                    from my_app_17226.api_docs import generate_schema
+
+                    content = generate_schema()
+                self._schemas[path] = (content, '"%s"' % hashlib.md5(content).hexdigest())
+            return self._schemas[path]
+
+    def clear(self):
+        with self._lock:
+            self._schemas.clear()
+
+
+schemas = SchemaCache()
+
+
+class OpenAPIRenderer(JSONRenderer):
+    # Matches ?format=openapi like drf_yasg's renderer, and renders errors.
+    media_type = SCHEMA_MEDIA_TYPE
+    format = "openapi"
+
+
+class SchemaFileView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    renderer_classes = (OpenAPIRenderer,)
+
+    def get(self, request, *args, **kwargs):
+        content, etag = schemas.get(settings.API_SCHEMA_FILE)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type=SCHEMA_MEDIA_TYPE)
+        response["ETag"] = etag
+        # Authenticated content: browsers may keep it but must revalidate.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+schema_file_view = SchemaFileView.as_view()
+
+
+def wants_schema(request):
+    return (
+        request.GET.get("format") == "openapi"
+        or SCHEMA_MEDIA_TYPE in request.META.get("HTTP_ACCEPT", "")
+    )
+
+
+@csrf_exempt
+def api_docs(request, *args, **kwargs):
+    if wants_schema(request) and not settings.API_DOCS_LIVE:
+        return schema_file_view(request, *args, **kwargs)
+    from my_app_17226.api_docs import swagger_view
+
+    return swagger_view(request, *args, **kwargs)
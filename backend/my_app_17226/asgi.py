@@ -0,0 +1,21 @@
+"""
+ASGI config for my_app_17226 project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 only speaks WSGI, so the Django application is served through
+my_app_17226.asgi_handler.ASGIHandler.
+
+Run it locally with:
+
+    $ uvicorn my_app_17226.asgi:application --port 8000
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from my_app_17226.asgi_handler import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'my_app_17226.settings')
+
+application = ASGIHandler(get_wsgi_application())
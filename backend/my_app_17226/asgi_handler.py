@@ -0,0 +1,154 @@
+"""
+ASGI front end for the Django WSGI application.
+
+Django 2.2 has no ASGI support or async views of its own. This handler does
+the network side of each request on the event loop: the request body is read
+before any thread is involved and buffered responses are written back after
+the thread has been released, so slow clients cost a coroutine instead of a
+worker thread. The Django side (middleware, views, ORM) runs in a bounded
+thread pool, and a request's whole Django lifetime, including the
+request_finished signal that releases its database connection, stays on one
+thread.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class RequestAborted(Exception):
+    """The client disconnected before sending the whole body."""
+
+
+class ASGIHandler:
+    def __init__(self, wsgi_application, max_workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.ASGI_THREADS,
+            thread_name_prefix="django",
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            raise ValueError("Unsupported ASGI scope type %r" % scope["type"])
+
+        try:
+            body = await self.read_body(receive)
+        except RequestAborted:
+            return
+        loop = asyncio.get_event_loop()
+        try:
+            response = await loop.run_in_executor(
+                self.executor, self.run_wsgi, scope, body, send, loop
+            )
+        finally:
+            body.close()
+        if response is not None:
+            status, headers, content = response
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": content})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                raise RequestAborted()
+            body.write(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body.seek(0)
+        return body
+
+    def get_environ(self, scope, body):
+        server_name, server_port = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server_name,
+            "SERVER_PORT": str(server_port),
+            "SERVER_PROTOCOL": "HTTP/%s" % scope.get("http_version", "1.1"),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        if scope.get("client"):
+            environ["REMOTE_ADDR"] = scope["client"][0]
+            environ["REMOTE_PORT"] = str(scope["client"][1])
+        # The body is already buffered, so its length is known even for
+        # chunked requests.
+        body.seek(0, 2)
+        environ["CONTENT_LENGTH"] = str(body.tell())
+        body.seek(0)
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            if name == "CONTENT_LENGTH":
+                continue
+            if name != "CONTENT_TYPE":
+                name = "HTTP_" + name
+            value = value.decode("latin-1")
+            if name in environ:
+                value = environ[name] + "," + value
+            environ[name] = value
+        return environ
+
+    def run_wsgi(self, scope, body, send, loop):
+        """Run the WSGI application in a worker thread.
+
+        Buffered responses are returned for the event loop to send. Streaming
+        responses are sent chunk by chunk from this thread, waiting for each
+        send to finish so memory stays bounded by one chunk.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+            ]
+
+        result = self.wsgi_application(self.get_environ(scope, body), start_response)
+        try:
+            if not getattr(result, "streaming", False):
+                return started["status"], started["headers"], b"".join(result)
+
+            def send_sync(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            send_sync(
+                {
+                    "type": "http.response.start",
+                    "status": started["status"],
+                    "headers": started["headers"],
+                }
+            )
+            for chunk in result:
+                if chunk:
+                    send_sync({"type": "http.response.body", "body": chunk, "more_body": True})
+            send_sync({"type": "http.response.body", "body": b""})
+            return None
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
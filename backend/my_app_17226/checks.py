@@ -0,0 +1,51 @@
+"""
+System checks for features that need a cache shared between worker
+processes.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends whose entries are only visible to the process that set them.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_shared_cache(alias):
+    return settings.CACHES[alias]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    alias = settings.SESSION_CACHE_ALIAS
+    if settings.SESSION_ENGINE != "my_app_17226.sessions" or is_shared_cache(alias):
+        return []
+    return [
+        Warning(
+            "SESSION_ENGINE is my_app_17226.sessions but the %r cache is local to each process." % alias,
+            hint=(
+                "Sessions are only copied to the database on login, logout and every "
+                "SESSION_DB_SYNC_INTERVAL seconds, so workers don't see each other's changes. "
+                "Set CACHE_URL to Redis or use django.contrib.sessions.backends.cached_db."
+            ),
+            id="my_app_17226.W001",
+        )
+    ]
+
+
+@register(Tags.caches)
+def check_page_cache(app_configs, **kwargs):
+    if not settings.PAGE_CACHE_ENABLED or is_shared_cache(settings.PAGE_CACHE):
+        return []
+    return [
+        Warning(
+            "PAGE_CACHE_ENABLED is on but the %r cache is local to each process." % settings.PAGE_CACHE,
+            hint=(
+                "A purge only drops the pages of the worker that ran it, the others keep serving "
+                "their copy for up to PAGE_CACHE_TIMEOUT seconds. Set CACHE_URL to Redis or run a "
+                "single worker process."
+            ),
+            id="my_app_17226.W002",
+        )
+    ]
@@ -0,0 +1,12 @@
+from django.db.backends.postgresql import base
+
+from my_app_17226.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        # The stock backend records this while opening the connection, which
+        # only happens on the wrapper that first created a pooled connection.
+        self.isolation_level = connection.isolation_level
+        return connection
@@ -0,0 +1,9 @@
+from django.db.backends.sqlite3 import base
+
+from my_app_17226.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def uses_pool(self):
+        # Closing an in-memory database destroys it, Django keeps those open.
+        return super().uses_pool() and not self.is_in_memory_db()
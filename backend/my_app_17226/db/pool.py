@@ -0,0 +1,291 @@
+"""
+Process-wide database connection pool.
+
+Django opens a connection per thread and, with CONN_MAX_AGE = 0, closes it at
+the end of every request. The backends in my_app_17226.db.backends hand those
+connections back to a pool shared by all threads instead, so requests reuse
+already authenticated connections. Configure with the POOL dict of a
+DATABASES entry, see DATABASE_POOL in settings.
+"""
+import functools
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+DEFAULTS = {
+    "ENABLED": True,
+    "MIN_SIZE": 0,
+    "MAX_SIZE": 10,
+    "IDLE_TIMEOUT": 300,
+    "MAX_USES": 0,
+    "TIMEOUT": 30,
+    "PRE_PING": True,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    """No connection became available within the pool timeout."""
+
+
+def params_key(conn_params):
+    """Hashable form of the connection parameters a pool was built for."""
+    return tuple(sorted((name, repr(value)) for name, value in conn_params.items()))
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        connect,
+        min_size=0,
+        max_size=10,
+        idle_timeout=300,
+        max_uses=0,
+        timeout=30,
+        pre_ping=True,
+        params_key=None,
+    ):
+        self.connect = connect
+        self.params_key = params_key
+        # Set once the alias was reconfigured: connections still in use are
+        # closed when released.
+        self.retired = False
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition()
+        # (connection, released at, uses), most recently released last.
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._waiting = 0
+        self._stats = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "acquired": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "max_wait_time_ms": 0.0,
+            "timeouts": 0,
+            "failed_pings": 0,
+            "recycled": 0,
+        }
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["connections_created"] += 1
+        return connection
+
+    def _discard(self, connection, keep_slot=False):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats["connections_closed"] += 1
+            if not keep_slot:
+                self._size -= 1
+                self._cond.notify()
+
+    def _ping(self, connection):
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _expired(self):
+        """Pop idle connections past the idle timeout, keeping MIN_SIZE open."""
+        expired = []
+        if self.idle_timeout:
+            deadline = time.monotonic() - self.idle_timeout
+            while self._idle and self._idle[0][1] < deadline and self._size - len(expired) > self.min_size:
+                expired.append(self._idle.popleft()[0])
+        return expired
+
+    def acquire(self):
+        start = time.monotonic()
+        with self._cond:
+            expired = self._expired()
+            waited = False
+            while True:
+                if self._idle:
+                    connection, _, uses = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    connection, uses = None, 0
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        "No database connection available after %ss (max size %d)"
+                        % (self.timeout, self.max_size)
+                    )
+                waited = True
+                self._waiting += 1
+                self._cond.wait(remaining)
+                self._waiting -= 1
+            if waited:
+                wait_ms = (time.monotonic() - start) * 1000
+                self._stats["waits"] += 1
+                self._stats["wait_time_ms"] += wait_ms
+                self._stats["max_wait_time_ms"] = max(self._stats["max_wait_time_ms"], wait_ms)
+
+        for stale in expired:
+            self._discard(stale)
+
+        if connection is not None and self.pre_ping and not self._ping(connection):
+            with self._cond:
+                self._stats["failed_pings"] += 1
+            self._discard(connection, keep_slot=True)
+            connection, uses = None, 0
+        if connection is None:
+            connection = self._open()
+
+        with self._cond:
+            self._in_use[id(connection)] = uses + 1
+            self._stats["acquired"] += 1
+        return connection
+
+    def release(self, connection, discard=False):
+        with self._cond:
+            uses = self._in_use.pop(id(connection), 0)
+        if not discard:
+            try:
+                # Don't hand an open transaction to the next user.
+                connection.rollback()
+            except Exception:
+                discard = True
+        if not discard and self.retired:
+            discard = True
+        if not discard and self.max_uses and uses >= self.max_uses:
+            with self._cond:
+                self._stats["recycled"] += 1
+            discard = True
+
+        if discard:
+            self._discard(connection)
+        else:
+            with self._cond:
+                self._idle.append((connection, time.monotonic(), uses))
+                self._cond.notify()
+
+    def fill(self):
+        """Open connections up to MIN_SIZE."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            connection = self._open()
+            with self._cond:
+                self._idle.append((connection, time.monotonic(), 0))
+                self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def retire(self):
+        self.retired = True
+        self.close_all()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                size=self._size,
+                in_use=len(self._in_use),
+                idle=len(self._idle),
+                waiting=self._waiting,
+                max_size=self.max_size,
+                min_size=self.min_size,
+            )
+        stats["wait_time_ms"] = round(stats["wait_time_ms"], 3)
+        stats["max_wait_time_ms"] = round(stats["max_wait_time_ms"], 3)
+        return stats
+
+
+def get_pool(alias, conn_params, connect, options):
+    """The pool of `alias`, replaced by a new one if `conn_params` changed."""
+    key = params_key(conn_params)
+    retired = None
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is not None and pool.params_key != key:
+            # e.g. the test runner switching NAME to the test database.
+            retired, pool = pool, None
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(
+                connect,
+                min_size=options["MIN_SIZE"],
+                max_size=options["MAX_SIZE"],
+                idle_timeout=options["IDLE_TIMEOUT"],
+                max_uses=options["MAX_USES"],
+                timeout=options["TIMEOUT"],
+                pre_ping=options["PRE_PING"],
+                params_key=key,
+            )
+            created = True
+        else:
+            created = False
+    if retired is not None:
+        retired.retire()
+    if created:
+        pool.fill()
+    return pool
+
+
+def get_pool_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """Takes connections from and returns them to the alias' ConnectionPool."""
+
+    # The pool the current connection came from.
+    pool = None
+
+    @property
+    def pool_options(self):
+        return dict(DEFAULTS, **self.settings_dict.get("POOL", {}))
+
+    def uses_pool(self):
+        return self.pool_options["ENABLED"]
+
+    def get_new_connection(self, conn_params):
+        if not self.uses_pool():
+            return super().get_new_connection(conn_params)
+        connect = functools.partial(super().get_new_connection, conn_params)
+        self.pool = get_pool(self.alias, conn_params, connect, self.pool_options)
+        return self.pool.acquire()
+
+    def _close(self):
+        pool, self.pool = self.pool, None
+        if self.connection is None or pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.release(self.connection, discard=self.errors_occurred and not self.is_usable())
@@ -0,0 +1,116 @@
+"""
+Read replica routing with read-your-writes.
+
+ReplicaRouter sends writes to `default` and reads to `default` too, except
+during a request marked by ReplicaRoutingMiddleware, where reads go to one
+of DATABASE_REPLICAS (picked at random, then kept for the whole request).
+A request is marked when:
+
+* its method is safe (GET, HEAD, OPTIONS, TRACE), and
+* the client hasn't written anything in the last
+  DATABASE_PRIMARY_PIN_SECONDS.
+
+Clients are recognised by the credentials they send, the session cookie or
+the Authorization header, so no query is needed to tell whether a client is
+pinned to the primary. Any unsafe request from an authenticated user pins
+the credentials it used, and the session cookie it got back, for the
+window. Views that hand out new credentials (a token at login or signup)
+pin them too with add_issued_credentials(). Pins are kept in the default cache, which must be shared by all
+workers (CACHE_URL) for them to hold across processes.
+
+Management commands, workers and anything else outside a request always
+read from `default`, and so does code inside read_from_primary(): caches
+filled from a replica that hasn't caught up would keep its stale rows for
+their whole timeout.
+"""
+import hashlib
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+PIN_KEY_PREFIX = "my_app_17226.db.primary."
+
+_local = threading.local()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = getattr(_local, "replica", None)
+        if replica is None and getattr(_local, "replica_reads", False):
+            replica = _local.replica = random.choice(settings.DATABASE_REPLICAS)
+        return replica or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+@contextmanager
+def read_from_primary():
+    """Send the reads made in the block to `default`."""
+    saved = getattr(_local, "replica_reads", False), getattr(_local, "replica", None)
+    _local.replica_reads, _local.replica = False, None
+    try:
+        yield
+    finally:
+        _local.replica_reads, _local.replica = saved
+
+
+def pin_keys(request, response=None):
+    credentials = [
+        request.META.get("HTTP_AUTHORIZATION"),
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+    ]
+    if response is not None and settings.SESSION_COOKIE_NAME in response.cookies:
+        credentials.append(response.cookies[settings.SESSION_COOKIE_NAME].value)
+    credentials.extend(getattr(request, "issued_credentials", ()))
+    return [
+        PIN_KEY_PREFIX + hashlib.sha1(credential.encode()).hexdigest()
+        for credential in credentials if credential
+    ]
+
+
+def add_issued_credentials(request, *credentials):
+    """Pin the Authorization header values handed out in the response to `request`."""
+    # DRF's Request proxies attribute reads, not writes, to the HttpRequest.
+    request = getattr(request, "_request", request)
+    request.issued_credentials = getattr(request, "issued_credentials", ()) + credentials
+
+
+def is_pinned(request):
+    keys = pin_keys(request)
+    return bool(keys) and bool(cache.get_many(keys))
+
+
+def pin(request, response):
+    keys = pin_keys(request, response)
+    if keys:
+        cache.set_many(dict.fromkeys(keys, True), settings.DATABASE_PRIMARY_PIN_SECONDS)
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        _local.replica_reads = bool(settings.DATABASE_REPLICAS) and safe and not is_pinned(request)
+        _local.replica = None
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.replica_reads = False
+            _local.replica = None
+
+        user = getattr(request, "user", None)
+        authenticated = user is not None and user.is_authenticated
+        if not safe and settings.DATABASE_REPLICAS and (authenticated or hasattr(request, "issued_credentials")):
+            pin(request, response)
+        return response
@@ -0,0 +1,221 @@
+"""
+Per-request timing: query count, SQL time, serializer and render time.
+
+RequestMetricsMiddleware collects the figures for a sample of requests
+(METRICS_SAMPLE_RATE), returns them in a Server-Timing header and adds them
+to histograms labelled with the resolved view name. `metrics` serves the
+histograms in the Prometheus text format, along with the hit and miss
+counters of the token authentication cache. They are kept per process, so
+Prometheus should scrape every worker process.
+
+SQL is timed with a connection execute_wrapper for the duration of the
+request. Serializer and render time come from wrappers installed once on
+BaseSerializer.data, Template.render and the DRF renderers; views that
+build their data with a FastSerializer wrap the whole list with `timed`.
+Outside a sampled request they cost a thread-local lookup. Nested calls are
+only counted once, by the outermost call.
+"""
+import functools
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.base import Template
+from django.utils.crypto import constant_time_compare
+from rest_framework.renderers import BaseRenderer
+from rest_framework.serializers import BaseSerializer
+
+from home.api.v1.authentication import token_cache
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_local = threading.local()
+
+
+class Histogram:
+    """A Prometheus histogram with a `view` label."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # view -> ([count per bucket, last one is +Inf], sum)
+        self._values = {}
+
+    def observe(self, view, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(view) or ([0] * (len(self.buckets) + 1), 0)
+            counts[index] += 1
+            self._values[view] = (counts, total + value)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def expose(self):
+        lines = ["# HELP %s %s" % (self.name, self.documentation), "# TYPE %s histogram" % self.name]
+        with self._lock:
+            values = sorted((view, list(counts), total) for view, (counts, total) in self._values.items())
+        for view, counts, total in values:
+            label = view.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append('%s_bucket{view="%s",le="%s"} %d' % (self.name, label, bound, cumulative))
+            lines.append('%s_sum{view="%s"} %s' % (self.name, label, round(total, 6)))
+            lines.append('%s_count{view="%s"} %d' % (self.name, label, cumulative))
+        return "\n".join(lines)
+
+
+HISTOGRAMS = {
+    "total": Histogram(
+        "django_request_duration_seconds", "Time spent in the Django middleware and view.", DURATION_BUCKETS
+    ),
+    "sql": Histogram("django_request_sql_duration_seconds", "Time spent running SQL.", DURATION_BUCKETS),
+    "queries": Histogram("django_request_queries", "Number of SQL queries.", QUERY_BUCKETS),
+    "serialize": Histogram(
+        "django_request_serialize_duration_seconds", "Time spent in DRF serializers.", DURATION_BUCKETS
+    ),
+    "render": Histogram(
+        "django_request_render_duration_seconds", "Time spent rendering templates and DRF responses.",
+        DURATION_BUCKETS,
+    ),
+}
+
+
+def expose_token_cache():
+    """TokenCache.stats() of this process: event counters and the local cache size."""
+    stats = token_cache.stats()
+    name = "django_token_auth_cache_events_total"
+    lines = [
+        "# HELP %s Token authentication cache lookups and invalidations." % name,
+        "# TYPE %s counter" % name,
+    ]
+    for event in ("hits", "shared_hits", "misses", "invalidations"):
+        lines.append('%s{event="%s"} %d' % (name, event, stats[event]))
+    lines += [
+        "# HELP django_token_auth_cache_size Tokens held in the per-process cache.",
+        "# TYPE django_token_auth_cache_size gauge",
+        "django_token_auth_cache_size %d" % stats["size"],
+    ]
+    return "\n".join(lines)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self, total):
+        return 'sql;dur=%.3f;desc="%d queries", serialize;dur=%.3f, render;dur=%.3f, total;dur=%.3f' % (
+            self.sql * 1000, self.queries, self.serialize * 1000, self.render * 1000, total * 1000,
+        )
+
+
+def timed(category, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = getattr(_local, "timings", None)
+        if timings is None or timings.depth:
+            return func(*args, **kwargs)
+        timings.depth += 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.depth -= 1
+            setattr(timings, category, getattr(timings, category) + time.perf_counter() - start)
+
+    wrapper.metrics_category = category
+    return wrapper
+
+
+def _all_subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _all_subclasses(subclass)
+
+
+_install_lock = threading.Lock()
+
+
+def install():
+    """Wrap serializer and renderer methods, once per process."""
+    with _install_lock:
+        data = BaseSerializer.data
+        if not hasattr(data.fget, "metrics_category"):
+            BaseSerializer.data = property(timed("serialize", data.fget))
+        for cls in [Template] + list(_all_subclasses(BaseRenderer)):
+            render = cls.__dict__.get("render")
+            if render is not None and not hasattr(render, "metrics_category"):
+                cls.render = timed("render", render)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+
+        timings = _local.timings = RequestTimings()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        if match is not None and match.func is not metrics:
+            view = match.view_name or match._func_path
+            HISTOGRAMS["total"].observe(view, total)
+            HISTOGRAMS["sql"].observe(view, timings.sql)
+            HISTOGRAMS["queries"].observe(view, timings.queries)
+            HISTOGRAMS["serialize"].observe(view, timings.serialize)
+            HISTOGRAMS["render"].observe(view, timings.render)
+        response["Server-Timing"] = timings.server_timing(total)
+        return response
+
+
+def metrics(request):
+    """The request histograms of this process in the Prometheus text format.
+
+    Readable with `Authorization: Bearer <METRICS_TOKEN>` or by staff users.
+    """
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    has_token = bool(settings.METRICS_TOKEN) and constant_time_compare(
+        authorization, "Bearer %s" % settings.METRICS_TOKEN
+    )
+    if not has_token and not request.user.is_staff:
+        return HttpResponseForbidden()
+    sections = [histogram.expose() for histogram in HISTOGRAMS.values()] + [expose_token_cache()]
+    body = "\n".join(sections) + "\n"
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,212 @@
+"""
+Full-page cache for HTML pages, purged by surrogate key.
+
+PageCacheMiddleware stores the rendered response of GET requests in the
+PAGE_CACHE cache for PAGE_CACHE_TIMEOUT seconds, keyed by URL and by who is
+asking: anonymous visitors share one copy, every authenticated user gets
+their own. A response is only stored if it is a 200 text/html page that:
+
+* didn't use the CSRF token (a form with {% csrf_token %}, whose token is
+  tied to the visitor's cookie),
+* sets no cookie and didn't modify the session,
+* isn't marked no-cache, no-store or max-age=0,
+* isn't under one of PAGE_CACHE_EXCLUDED_PATHS.
+
+Every stored page is tagged with surrogate keys: "pages", "user:<id>" of the
+viewer, and whatever the view added with add_surrogate_keys() or the
+surrogate_keys() decorator, e.g. "homepage" or "user:<id>" of a profile
+shown. purge(*keys) drops all pages tagged with any of the keys. Each key
+has a version in the cache, stored pages remember the versions they were
+rendered at, and purging bumps the versions, so it costs one write per key
+whatever the number of pages. Versions are read when a key is tagged,
+before the data it covers is, so a purge during the render leaves the page
+stale rather than unnoticed. Model changes purge with purge_on_commit(),
+once the new rows are visible to other requests.
+
+Pages are only as shared as the PAGE_CACHE cache: with a per-process cache,
+a purge in one worker leaves the pages of the others in place, which is
+why PAGE_CACHE_ENABLED defaults to off unless CACHE_URL is shared. Misses
+are rendered from the primary database, never from a read replica.
+
+Pages are also sent with a Surrogate-Key header. When PAGE_CACHE_CDN_PURGE_URL
+is set, anonymous pages get `Surrogate-Control: max-age=PAGE_CACHE_TIMEOUT`
+so a CDN (Fastly-style surrogate keys) can keep them, pages of authenticated
+users get `Cache-Control: private`, and purge() also POSTs the keys to the
+CDN, from a background thread.
+"""
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_max_age, patch_cache_control
+
+from my_app_17226.db.routers import read_from_primary
+
+logger = logging.getLogger(__name__)
+
+ALL_PAGES = "pages"
+HOMEPAGE = "homepage"
+KEY_VERSION_PREFIX = "page-cache:key:"
+PAGE_PREFIX = "page-cache:page:"
+# Headers that describe one response rather than the page.
+UNCACHED_HEADERS = {"set-cookie", "date", "server-timing"}
+
+_cdn_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-cache-purge")
+
+
+def user_key(user_id):
+    return "user:%s" % user_id
+
+
+def get_cache():
+    return caches[settings.PAGE_CACHE]
+
+
+def add_surrogate_keys(request, *keys):
+    """Tag the page being rendered for `request` with `keys`, at their current versions."""
+    if not settings.PAGE_CACHE_ENABLED:
+        return
+    tagged = request.surrogate_keys = getattr(request, "surrogate_keys", {})
+    new = [key for key in keys if key not in tagged]
+    if new:
+        # None: the version couldn't be read, the page won't be stored.
+        tagged.update(dict.fromkeys(new))
+        tagged.update(get_key_versions(new, create=True))
+
+
+def surrogate_keys(*keys):
+    """View decorator tagging the page with `keys`, including when an inner cache answers."""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            add_surrogate_keys(request, *keys)
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    return decorator
+
+
+def get_key_versions(keys, create=False):
+    """Current version of each surrogate key, starting the missing ones when `create`."""
+    cache = get_cache()
+    version_keys = {KEY_VERSION_PREFIX + key: key for key in keys}
+    versions = cache.get_many(list(version_keys))
+    missing = [version_key for version_key in version_keys if version_key not in versions]
+    if create and missing:
+        # Time based like home.cache.get_content_version, so that a purged
+        # key evicted from the cache doesn't restart at a version that stored
+        # pages still remember.
+        for version_key in missing:
+            cache.add(version_key, int(time.time() * 1000), timeout=None)
+        versions.update(cache.get_many(missing))
+    return {version_keys[version_key]: version for version_key, version in versions.items()}
+
+
+def purge(*keys):
+    """Drop the pages tagged with any of `keys`, here and at the CDN."""
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(KEY_VERSION_PREFIX + key)
+        except ValueError:
+            # No version means no page was stored with the key since it was evicted.
+            pass
+    if settings.PAGE_CACHE_CDN_PURGE_URL and keys:
+        _cdn_executor.submit(purge_cdn, keys)
+
+
+def purge_on_commit(*keys):
+    """purge(*keys) once the current transaction commits, when the new rows can be read."""
+    transaction.on_commit(lambda: purge(*keys))
+
+
+def purge_cdn(keys):
+    try:
+        response = requests.post(
+            settings.PAGE_CACHE_CDN_PURGE_URL,
+            headers={"Fastly-Key": settings.PAGE_CACHE_CDN_TOKEN, "Surrogate-Key": " ".join(sorted(keys))},
+            timeout=settings.PAGE_CACHE_CDN_TIMEOUT,
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logger.warning("CDN purge of %s failed: %s", " ".join(sorted(keys)), e)
+
+
+def page_key(request):
+    user = request.user
+    variant = user_key(user.pk) if user.is_authenticated else "anonymous"
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return "%s%s:%s" % (PAGE_PREFIX, variant, url)
+
+
+def is_cacheable(request, response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    if not response.get("Content-Type", "").startswith("text/html"):
+        return False
+    if request.META.get("CSRF_COOKIE_USED"):
+        return False
+    session = getattr(request, "session", None)
+    if session is not None and session.modified:
+        return False
+    cache_control = response.get("Cache-Control", "")
+    return not ("no-cache" in cache_control or "no-store" in cache_control or get_max_age(response) == 0)
+
+
+class PageCacheMiddleware:
+    def __init__(self, get_response):
+        if not settings.PAGE_CACHE_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method != "GET" or request.path.startswith(tuple(settings.PAGE_CACHE_EXCLUDED_PATHS)):
+            return self.get_response(request)
+
+        key = page_key(request)
+        cached = get_cache().get(key)
+        if cached is not None:
+            content, headers, versions = cached
+            if get_key_versions(versions) == versions:
+                response = HttpResponse(content)
+                for header, value in headers:
+                    response[header] = value
+                return response
+
+        add_surrogate_keys(request, ALL_PAGES)
+        if request.user.is_authenticated:
+            add_surrogate_keys(request, user_key(request.user.pk))
+        # A page rendered from a lagging replica would be stored as current.
+        with read_from_primary():
+            response = self.get_response(request)
+        if not is_cacheable(request, response):
+            return response
+
+        versions = request.surrogate_keys
+        self.set_cdn_headers(request, response, set(versions))
+        if None in versions.values():
+            return response
+        headers = [
+            (header, value) for header, value in response.items() if header.lower() not in UNCACHED_HEADERS
+        ]
+        get_cache().set(key, (response.content, headers, versions), settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+    def set_cdn_headers(self, request, response, keys):
+        response["Surrogate-Key"] = " ".join(sorted(keys))
+        if not settings.PAGE_CACHE_CDN_PURGE_URL:
+            return
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True)
+        else:
+            response["Surrogate-Control"] = "max-age=%d" % settings.PAGE_CACHE_TIMEOUT
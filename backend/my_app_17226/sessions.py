@@ -0,0 +1,151 @@
+"""
+Cache-first session engine with write-behind to the database.
+
+Sessions are read from and written to the SESSION_CACHE_ALIAS cache, an
+in-process cache on a single node or Redis when shared between workers (see
+CACHE_URL). The django_session table is a backup copy and is only written
+when it matters:
+
+* when the authentication keys change (login, logout, password change), so
+  a user stays logged in if the cache entry is lost,
+* when the database copy is older than SESSION_DB_SYNC_INTERVAL seconds,
+  which also keeps its expiry date current for `clearsessions`,
+* on delete and flush.
+
+Any other change reaches the database with the next save after the
+interval, so at most SESSION_DB_SYNC_INTERVAL seconds of non-authentication
+session data can be lost if the cache drops an entry. A save that doesn't
+change the session data is skipped entirely, and reads never touch the
+database while the session is cached.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.base import CreateError, UpdateError
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+
+KEY_PREFIX = "my_app_17226.sessions."
+
+# Keys that must never exist only in the cache.
+DURABLE_KEYS = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY)
+
+
+class SessionStore(DBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        # When the database copy was written (None: no row is known to
+        # exist), the durable keys it holds and the serialized data as last
+        # loaded or saved.
+        self._synced_at = None
+        self._synced_keys = None
+        self._snapshot = None
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def durable_keys(self, data):
+        return tuple(data.get(key) for key in DURABLE_KEYS)
+
+    def serialize(self, data):
+        return self.serializer().dumps(data)
+
+    def load(self):
+        cache_key = self.cache_key
+        try:
+            entry = self._cache.get(cache_key)
+        except Exception:
+            # Some backends raise on invalid keys, treat it like a miss.
+            entry = None
+
+        if entry is not None:
+            data, self._synced_at, self._synced_keys = entry
+        else:
+            s = self._get_session_from_db()
+            if s:
+                data = self.decode(s.session_data)
+                self._synced_at = time.time()
+                self._synced_keys = self.durable_keys(data)
+                self._cache.set(cache_key, self.cache_entry(data), self.get_expiry_age(expiry=s.expire_date))
+            else:
+                data = {}
+        self._snapshot = self.serialize(data)
+        return data
+
+    def cache_entry(self, data):
+        return (data, self._synced_at, self._synced_keys)
+
+    def exists(self, session_key):
+        # New keys are 32 random characters, checked for uniqueness by the
+        # cache.add() and database INSERT in save(must_create=True).
+        return (self.cache_key_prefix + session_key) in self._cache
+
+    def needs_db_write(self, data):
+        if self._synced_at is None:
+            return any(self.durable_keys(data))
+        return (
+            self.durable_keys(data) != self._synced_keys
+            or time.time() - self._synced_at >= settings.SESSION_DB_SYNC_INTERVAL
+        )
+
+    def write_db(self, data, must_create=False):
+        # DBStore.save() serializes self._session, which is `data`.
+        if must_create:
+            super().save(must_create=True)
+        else:
+            try:
+                super().save(must_create=self._synced_at is None)
+            except CreateError:
+                super().save(must_create=False)
+            except UpdateError:
+                # The row expired or was cleared out from under the cache.
+                super().save(must_create=True)
+        self._synced_at = time.time()
+        self._synced_keys = self.durable_keys(data)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        serialized = self.serialize(data)
+        if not must_create and serialized == self._snapshot:
+            return
+
+        if must_create:
+            if not self._cache.add(self.cache_key, self.cache_entry(data), self.get_expiry_age()):
+                raise CreateError
+            if any(self.durable_keys(data)):
+                try:
+                    self.write_db(data, must_create=True)
+                except CreateError:
+                    self._cache.delete(self.cache_key)
+                    raise
+        elif self.needs_db_write(data):
+            self.write_db(data)
+        self._cache.set(self.cache_key, self.cache_entry(data), self.get_expiry_age())
+        self._snapshot = serialized
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+
+    def flush(self):
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+        self._synced_at = self._synced_keys = self._snapshot = None
+
+    def cycle_key(self):
+        self._get_session()
+        # The new key has no database row yet.
+        self._synced_at = self._synced_keys = None
+        super().cycle_key()
@@ -47,7 +47,7 @@ INSTALLED_APPS = [
     'django.contrib.sites'
 ]
 LOCAL_APPS = [
-    'home',
+    'home.apps.HomeConfig',
     'users.apps.UsersConfig',
 ]
 THIRD_PARTY_APPS = [
@@ -60,8 +60,6 @@ THIRD_PARTY_APPS = [
     'allauth.account',
     'allauth.socialaccount',
     'allauth.socialaccount.providers.google',
-    'django_extensions',
-    'drf_yasg',
 
     # start fcm_django push notifications
     'fcm_django',
@@ -70,6 +68,26 @@ THIRD_PARTY_APPS = [
 ]
 INSTALLED_APPS += LOCAL_APPS + THIRD_PARTY_APPS
 
+# The "production" profile, the default unless DEBUG is on, leaves out the
+# apps only used in development so that workers and the release step don't
+# import them. `python manage.py startup_profile` shows what startup costs.
+SETTINGS_PROFILE = env.str("SETTINGS_PROFILE", default="development" if DEBUG else "production")
+DEV_APPS = [
+    'django_extensions',
+]
+if SETTINGS_PROFILE == "development":
+    INSTALLED_APPS += DEV_APPS
+# drf_yasg provides the templates and static files of /api-docs/. Its schema
+# generator is only imported by the first request for the docs.
+API_DOCS_ENABLED = env.bool("API_DOCS_ENABLED", default=True)
+if API_DOCS_ENABLED:
+    INSTALLED_APPS += ['drf_yasg']
+# The schema loaded by /api-docs/ is written to API_SCHEMA_FILE by the
+# build_api_schema command (run in the Dockerfile) and served from there.
+# With API_DOCS_LIVE it is generated on every request instead.
+API_SCHEMA_FILE = env.str("API_SCHEMA_FILE", default=os.path.join(BASE_DIR, 'api-schema.json'))
+API_DOCS_LIVE = env.bool("API_DOCS_LIVE", default=DEBUG)
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -100,6 +118,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'my_app_17226.wsgi.application'
 
+# Size of the thread pool my_app_17226.asgi runs Django in
+ASGI_THREADS = env.int("ASGI_THREADS", default=8)
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -116,6 +137,99 @@ if env.str("DATABASE_URL", default=None):
         'default': env.db()
     }
 
+# Read replicas, comma separated database URLs. Safe requests read from them
+# unless the client wrote something in the last DATABASE_PRIMARY_PIN_SECONDS,
+# see my_app_17226/db/routers.py.
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[]), 1):
+    DATABASES['replica_%d' % index] = env.db_url_config(url)
+    DATABASE_REPLICAS.append('replica_%d' % index)
+DATABASE_ROUTERS = ['my_app_17226.db.routers.ReplicaRouter']
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware'),
+    'my_app_17226.db.routers.ReplicaRoutingMiddleware',
+)
+DATABASE_PRIMARY_PIN_SECONDS = env.int("DATABASE_PRIMARY_PIN_SECONDS", default=15)
+
+# Connection pool shared by all threads of a worker, see my_app_17226/db/pool.py
+DATABASE_POOL = {
+    'ENABLED': env.bool("DB_POOL_ENABLED", default=True),
+    'MIN_SIZE': env.int("DB_POOL_MIN_SIZE", default=0),
+    'MAX_SIZE': env.int("DB_POOL_MAX_SIZE", default=10),
+    'IDLE_TIMEOUT': env.int("DB_POOL_IDLE_TIMEOUT", default=300),
+    'MAX_USES': env.int("DB_POOL_MAX_USES", default=1000),
+    'TIMEOUT': env.int("DB_POOL_TIMEOUT", default=30),
+    'PRE_PING': env.bool("DB_POOL_PRE_PING", default=True),
+}
+POOLED_ENGINES = {
+    'django.db.backends.postgresql': 'my_app_17226.db.backends.postgresql',
+    'django.db.backends.postgresql_psycopg2': 'my_app_17226.db.backends.postgresql',
+    'django.db.backends.sqlite3': 'my_app_17226.db.backends.sqlite3',
+}
+for database in DATABASES.values():
+    database['ENGINE'] = POOLED_ENGINES.get(database['ENGINE'], database['ENGINE'])
+    database['POOL'] = DATABASE_POOL
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# Defaults to an in-process LRU cache. Set CACHE_URL=rediscache://redis:6379/1
+# to share the cache between workers through the redis service.
+
+CACHES = {
+    'default': env.cache("CACHE_URL", default="locmemcache://"),
+}
+# Whether CACHE_URL is shared between worker processes. Features that need
+# every worker to see the same entries are only on by default when it is,
+# see my_app_17226/checks.py.
+SHARED_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Versioned page and fragment cache for home.views.home
+HOME_CACHE_ENABLED = env.bool("HOME_CACHE_ENABLED", default=True)
+HOME_CACHE_TIMEOUT = env.int("HOME_CACHE_TIMEOUT", default=60 * 60 * 24)
+
+# Full-page cache of HTML pages, per user, purged by surrogate key on model
+# saves, see my_app_17226/page_cache.py. PAGE_CACHE is the cache alias used.
+# A purge only reaches the pages of other workers through a shared cache, so
+# it is off by default unless CACHE_URL is one (Redis). With
+# PAGE_CACHE_CDN_PURGE_URL set, anonymous pages are also cached by the CDN
+# and purged there through its surrogate key API.
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+    'my_app_17226.page_cache.PageCacheMiddleware',
+)
+PAGE_CACHE_ENABLED = env.bool("PAGE_CACHE_ENABLED", default=SHARED_CACHE)
+PAGE_CACHE = env.str("PAGE_CACHE", default="default")
+PAGE_CACHE_TIMEOUT = env.int("PAGE_CACHE_TIMEOUT", default=300)
+PAGE_CACHE_EXCLUDED_PATHS = env.list(
+    "PAGE_CACHE_EXCLUDED_PATHS", default=['/admin/', '/api/', '/api-docs/', '/rest-auth/', '/metrics']
+)
+# Paths `generate_project_report --profile` doesn't GET: logging out would end
+# the --profile-user session for the URLs after it, and the others change
+# data or the session on a GET.
+REPORT_PROFILE_EXCLUDED_PATHS = env.list(
+    "REPORT_PROFILE_EXCLUDED_PATHS",
+    default=['/admin/logout/', '/accounts/logout/', '/rest-auth/logout/', '/accounts/google/login/'],
+)
+PAGE_CACHE_CDN_PURGE_URL = env.str("PAGE_CACHE_CDN_PURGE_URL", default="")
+PAGE_CACHE_CDN_TOKEN = env.str("PAGE_CACHE_CDN_TOKEN", default="")
+PAGE_CACHE_CDN_TIMEOUT = env.float("PAGE_CACHE_CDN_TIMEOUT", default=5)
+
+# Token -> user cache used by home.api.v1.authentication.CachedTokenAuthentication.
+# Set TOKEN_AUTH_SHARED_CACHE to a cache alias (e.g. "default") to add a shared tier.
+TOKEN_AUTH_CACHE_SIZE = env.int("TOKEN_AUTH_CACHE_SIZE", default=10000)
+TOKEN_AUTH_CACHE_TTL = env.int("TOKEN_AUTH_CACHE_TTL", default=60)
+TOKEN_AUTH_SHARED_CACHE = env.str("TOKEN_AUTH_SHARED_CACHE", default=None)
+TOKEN_AUTH_SHARED_CACHE_TTL = env.int("TOKEN_AUTH_SHARED_CACHE_TTL", default=60 * 5)
+
+# Short-lived signed access tokens (home.api.v1.authentication), returned by
+# api/v1/login and api/v1/access-token next to the Token key.
+ACCESS_TOKENS_ENABLED = env.bool("ACCESS_TOKENS_ENABLED", default=False)
+ACCESS_TOKEN_LIFETIME = env.int("ACCESS_TOKEN_LIFETIME", default=300)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -151,7 +265,28 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
-MIDDLEWARE += ['whitenoise.middleware.WhiteNoiseMiddleware']
+# Static files are answered right after SecurityMiddleware, before sessions,
+# auth and the rest of the stack run. Hashed names are served with a far
+# future immutable Cache-Control, the .br/.gz variants written by
+# collectstatic are picked by Accept-Encoding, and files up to
+# WHITENOISE_MEMORY_MAX_SIZE bytes are kept in memory.
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+    'my_app_17226.static.StaticFilesMiddleware',
+)
+WHITENOISE_MEMORY_MAX_SIZE = env.int("WHITENOISE_MEMORY_MAX_SIZE", default=256 * 1024)
+
+# Request metrics: query count, SQL, serializer and render time of a sample
+# of requests, sent as a Server-Timing header and served as Prometheus
+# histograms at /metrics, readable by staff users and with
+# "Authorization: Bearer <METRICS_TOKEN>".
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('my_app_17226.static.StaticFilesMiddleware') + 1,
+    'my_app_17226.metrics.RequestMetricsMiddleware',
+)
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=True)
+METRICS_SAMPLE_RATE = env.float("METRICS_SAMPLE_RATE", default=1.0)
+METRICS_TOKEN = env.str("METRICS_TOKEN", default="")
 
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
@@ -164,6 +299,49 @@ STATICFILES_DIRS = [
 ]
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Django REST Framework
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'home.api.v1.pagination.IdCursorPagination',
+    'PAGE_SIZE': env.int("API_PAGE_SIZE", default=100),
+}
+API_MAX_PAGE_SIZE = env.int("API_MAX_PAGE_SIZE", default=1000)
+# Rows fetched per round trip when a list is streamed (?stream=json|ndjson).
+API_STREAM_CHUNK_SIZE = env.int("API_STREAM_CHUNK_SIZE", default=500)
+# Largest list accepted by the CustomText/HomePage bulk PATCH.
+API_BULK_UPDATE_MAX_ITEMS = env.int("API_BULK_UPDATE_MAX_ITEMS", default=500)
+
+# Token buckets of home.api.v1.throttling for login and signup, per client IP
+# and per account. An empty value turns a bucket off.
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {
+    'login_ip': env.str("THROTTLE_LOGIN_IP", default="20/minute") or None,
+    'login_account': env.str("THROTTLE_LOGIN_ACCOUNT", default="5/minute") or None,
+    'signup_ip': env.str("THROTTLE_SIGNUP_IP", default="20/hour") or None,
+    'signup_account': env.str("THROTTLE_SIGNUP_ACCOUNT", default="5/hour") or None,
+}
+# Proxies in front of the app, each appending to X-Forwarded-For: the client
+# IP is the address the outermost one saw, not whatever the client sent. 1 for
+# the Heroku router, 0 to use REMOTE_ADDR when clients connect directly.
+REST_FRAMEWORK['NUM_PROXIES'] = env.int("NUM_PROXIES", default=1)
+# Cache holding the throttle buckets. Use Redis (CACHE_URL) to share them
+# between workers.
+THROTTLE_CACHE = env.str("THROTTLE_CACHE", default="default")
+# Login/signup requests hashing passwords at once per worker process, the
+# rest get a 429 with Retry-After: PASSWORD_HASHING_RETRY_AFTER.
+PASSWORD_HASHING_CONCURRENCY = env.int("PASSWORD_HASHING_CONCURRENCY", default=2)
+PASSWORD_HASHING_RETRY_AFTER = env.int("PASSWORD_HASHING_RETRY_AFTER", default=1)
+
+# Sessions are kept in the SESSION_CACHE_ALIAS cache and copied to the
+# database on login/logout and at most every SESSION_DB_SYNC_INTERVAL seconds
+# otherwise, see my_app_17226/sessions.py. Sessions that exist only in a
+# per-process cache are lost between workers, so without a shared cache
+# (CACHE_URL) the default is Django's cached_db engine, which writes every
+# change to the database.
+SESSION_ENGINE = env.str(
+    "SESSION_ENGINE",
+    default='my_app_17226.sessions' if SHARED_CACHE else 'django.contrib.sessions.backends.cached_db',
+)
+SESSION_DB_SYNC_INTERVAL = env.int("SESSION_DB_SYNC_INTERVAL", default=60)
+
 # allauth / users
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_AUTHENTICATION_METHOD = 'email'
@@ -191,17 +369,55 @@ REST_AUTH_REGISTER_SERIALIZERS = {
 # Custom user model
 AUTH_USER_MODEL = "users.User"
 
+# Admin changelists using my_app_17226.db.paginator.EstimatedCountPaginator
+# count exactly when the planner estimates fewer rows than this.
+ESTIMATED_COUNT_THRESHOLD = env.int("ESTIMATED_COUNT_THRESHOLD", default=10000)
+# Largest user changelist with a "Show all" link, 0 to never show it.
+USER_ADMIN_MAX_SHOW_ALL = env.int("USER_ADMIN_MAX_SHOW_ALL", default=200)
+
+# Bulk user import (import_users command and api/v1/import-users)
+USER_IMPORT_CHUNK_SIZE = env.int("USER_IMPORT_CHUNK_SIZE", default=500)
+USER_IMPORT_WORKERS = env.int("USER_IMPORT_WORKERS", default=os.cpu_count() or 1)
+
 EMAIL_HOST = env.str("EMAIL_HOST", "smtp.sendgrid.net")
 EMAIL_HOST_USER = env.str("SENDGRID_USERNAME", "")
 EMAIL_HOST_PASSWORD = env.str("SENDGRID_PASSWORD", "")
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 
+# With EMAIL_QUEUE_ENABLED outgoing email is stored in home.QueuedEmail and
+# sent by the send_queued_email command, over EMAIL_QUEUE_TRANSPORT. Only turn
+# it on where that command runs (`heroku ps:scale worker=1` on Heroku), or
+# the mail is never sent.
+EMAIL_QUEUE_ENABLED = env.bool("EMAIL_QUEUE_ENABLED", default=False)
+EMAIL_BACKEND = env.str(
+    "EMAIL_BACKEND",
+    default="home.mail.QueuedEmailBackend" if EMAIL_QUEUE_ENABLED else "django.core.mail.backends.smtp.EmailBackend",
+)
+EMAIL_QUEUE_TRANSPORT = env.str("EMAIL_QUEUE_TRANSPORT", default="django.core.mail.backends.smtp.EmailBackend")
+EMAIL_QUEUE_BATCH_SIZE = env.int("EMAIL_QUEUE_BATCH_SIZE", default=50)
+EMAIL_QUEUE_MAX_ATTEMPTS = env.int("EMAIL_QUEUE_MAX_ATTEMPTS", default=5)
+EMAIL_QUEUE_RETRY_DELAY = env.int("EMAIL_QUEUE_RETRY_DELAY", default=60)
+EMAIL_QUEUE_MAX_RETRY_DELAY = env.int("EMAIL_QUEUE_MAX_RETRY_DELAY", default=3600)
+# How long a claimed message is hidden from other workers.
+EMAIL_QUEUE_LEASE = env.int("EMAIL_QUEUE_LEASE", default=300)
+EMAIL_QUEUE_POLL_INTERVAL = env.float("EMAIL_QUEUE_POLL_INTERVAL", default=5)
+# Days sent messages are kept before the worker deletes them, 0 keeps them.
+EMAIL_QUEUE_RETENTION_DAYS = env.int("EMAIL_QUEUE_RETENTION_DAYS", default=7)
+
 
 # start fcm_django push notifications
 FCM_DJANGO_SETTINGS = {
     "FCM_SERVER_KEY": env.str("FCM_SERVER_KEY", "")
 }
+# home.push.PushDispatcher
+PUSH_BATCH_SIZE = env.int("PUSH_BATCH_SIZE", default=1000)
+PUSH_WORKERS = env.int("PUSH_WORKERS", default=4)
+PUSH_MAX_RETRIES = env.int("PUSH_MAX_RETRIES", default=3)
+PUSH_RETRY_DELAY = env.float("PUSH_RETRY_DELAY", default=1.0)
+# Longest Retry-After from FCM that is honoured, in seconds.
+PUSH_MAX_RETRY_AFTER = env.float("PUSH_MAX_RETRY_AFTER", default=60)
+PUSH_TIMEOUT = env.float("PUSH_TIMEOUT", default=10)
 # end fcm_django push notifications
 
 
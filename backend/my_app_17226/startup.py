@@ -0,0 +1,116 @@
+"""
+Startup time of a worker process.
+
+profile_startup() starts a fresh interpreter with `python -X importtime`,
+imports Django and loads the settings, populates the app registry and loads the URLconf, which
+is what a worker does before its first request and what `manage.py migrate`
+does before migrating. It returns:
+
+* the wall time of each of those phases,
+* the time spent in each app's ready(),
+* the import time of each module, on its own ("self") and with everything
+  it imported ("cumulative"), and the self time summed per top-level
+  package.
+
+The child gets the environment of the caller, so settings can be compared
+by passing variables in `env`.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+
+SCRIPT = """
+import json
+import sys
+import time
+
+phases = {}
+start = time.perf_counter()
+from django.apps.config import AppConfig  # noqa E402
+
+ready = {}
+create = AppConfig.create.__func__
+
+
+def timed_create(cls, entry):
+    app_config = create(cls, entry)
+    app_ready = app_config.ready
+
+    def timed_ready():
+        start = time.perf_counter()
+        app_ready()
+        ready[app_config.label] = time.perf_counter() - start
+
+    app_config.ready = timed_ready
+    return app_config
+
+
+AppConfig.create = classmethod(timed_create)
+
+import django  # noqa E402
+from django.conf import settings  # noqa E402
+
+settings.INSTALLED_APPS
+phases["settings"] = time.perf_counter() - start
+start = time.perf_counter()
+django.setup()
+phases["apps"] = time.perf_counter() - start
+if json.loads(sys.argv[1])["urlconf"]:
+    from django.urls import get_resolver
+
+    start = time.perf_counter()
+    get_resolver().url_patterns
+    phases["urls"] = time.perf_counter() - start
+print(json.dumps({"phases": phases, "ready": ready}))
+"""
+
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def parse_import_times(output):
+    """`-X importtime` lines -> [{"module", "self_ms", "cumulative_ms", "depth"}] in import order."""
+    modules = []
+    for line in output.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            modules.append({
+                "module": match.group(4),
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+                "depth": len(match.group(3)) // 2,
+            })
+    return modules
+
+
+def profile_startup(env=None, urlconf=True):
+    environment = dict(os.environ, **(env or {}))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT, json.dumps({"urlconf": urlconf})],
+        cwd=settings.BASE_DIR, env=environment, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if process.returncode:
+        errors = [line for line in process.stderr.splitlines() if not IMPORT_TIME.match(line)]
+        raise RuntimeError("Django failed to start:\n" + "\n".join(errors[-20:]))
+
+    result = json.loads(process.stdout.splitlines()[-1])
+    modules = parse_import_times(process.stderr)
+    packages = {}
+    for module in modules:
+        package = module["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + module["self_ms"]
+    return {
+        "total_ms": ms(sum(result["phases"].values())),
+        "phases": {phase: ms(seconds) for phase, seconds in result["phases"].items()},
+        "ready": {label: ms(seconds) for label, seconds in result["ready"].items()},
+        "modules": modules,
+        "packages": {package: round(total, 3) for package, total in packages.items()},
+    }
@@ -0,0 +1,84 @@
+"""
+Static file serving in front of the Django middleware stack.
+
+StaticFilesMiddleware is WhiteNoise's middleware with small files held in
+memory. WhiteNoise already builds its URL index with one directory scan at
+startup (outside DEBUG), picks the smallest encoding the client accepts out
+of the .br/.gz variants collectstatic wrote and marks hashed names immutable;
+this also saves the open() and read() per request for everything under
+WHITENOISE_MEMORY_MAX_SIZE bytes, which in practice is every asset we ship.
+"""
+import io
+import os
+from http import HTTPStatus
+from wsgiref.headers import Headers
+
+from whitenoise.base import MissingFileError
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import NOT_ALLOWED_RESPONSE, Response, StaticFile
+
+
+class MemoryStaticFile(StaticFile):
+    """StaticFile with every encoding no larger than `max_size` preloaded."""
+
+    def __init__(self, path, headers, encodings=None, stat_cache=None, max_size=0):
+        super().__init__(path, headers, encodings=encodings, stat_cache=stat_cache)
+        self.contents = {}
+        for _, alt_path, alt_headers in self.alternatives:
+            if int(dict(alt_headers)["Content-Length"]) <= max_size:
+                with open(alt_path, "rb") as f:
+                    self.contents[alt_path] = f.read()
+
+    def open(self, path):
+        content = self.contents.get(path)
+        if content is None:
+            return open(path, "rb")
+        return io.BytesIO(content)
+
+    def get_response(self, method, request_headers):
+        if method not in ("GET", "HEAD"):
+            return NOT_ALLOWED_RESPONSE
+        if self.is_not_modified(request_headers):
+            return self.not_modified_response
+        path, headers = self.get_path_and_headers(request_headers)
+        file_handle = self.open(path) if method != "HEAD" else None
+        range_header = request_headers.get("HTTP_RANGE")
+        if range_header:
+            try:
+                return self.get_range_response(range_header, headers, file_handle)
+            except ValueError:
+                pass
+        return Response(HTTPStatus.OK, headers, file_handle)
+
+    def get_range_response(self, range_header, base_headers, file_handle):
+        response = super().get_range_response(range_header, base_headers, file_handle)
+        # WhiteNoise leaves cutting the body at Content-Length to the server,
+        # in memory the exact slice is free.
+        if response.status == HTTPStatus.PARTIAL_CONTENT and isinstance(file_handle, io.BytesIO):
+            length = int(dict(response.headers)["Content-Length"])
+            response = response._replace(file=io.BytesIO(file_handle.read(length)))
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    config_attrs = WhiteNoiseMiddleware.config_attrs + ("memory_max_size",)
+    memory_max_size = 256 * 1024
+
+    def get_static_file(self, path, url, stat_cache=None):
+        if stat_cache is None and not os.path.exists(path):
+            raise MissingFileError(path)
+        headers = Headers([])
+        self.add_mime_headers(headers, path, url)
+        self.add_cache_headers(headers, path, url)
+        if self.allow_all_origins:
+            headers["Access-Control-Allow-Origin"] = "*"
+        if self.add_headers_function:
+            self.add_headers_function(headers, path, url)
+        return MemoryStaticFile(
+            path,
+            headers.items(),
+            stat_cache=stat_cache,
+            encodings={"gzip": path + ".gz", "br": path + ".br"},
+            # Files are re-read on every request while autorefreshing (DEBUG).
+            max_size=0 if self.autorefresh else int(self.memory_max_size),
+        )
@@ -0,0 +1,86 @@
+import json
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+
+from my_app_17226 import api_docs
+from my_app_17226.api_schema import schemas
+
+pytestmark = pytest.mark.django_db
+
+SCHEMA_URL = "/api-docs/?format=openapi"
+
+
+@pytest.fixture
+def schema_file(settings, tmp_path):
+    settings.API_DOCS_LIVE = False
+    settings.API_SCHEMA_FILE = str(tmp_path / "api-schema.json")
+    schemas.clear()
+    yield settings.API_SCHEMA_FILE
+    schemas.clear()
+
+
+def test_build_writes_the_schema(schema_file, capsys):
+    call_command("build_api_schema")
+
+    with open(schema_file) as f:
+        schema = json.load(f)
+    assert schema["info"]["title"] == "My App API"
+    assert "/api/v1/customtext/" in schema["paths"]
+    assert "host" not in schema
+    assert schema_file in capsys.readouterr().out
+
+
+def test_schema_is_served_from_the_file(schema_file, admin_client):
+    with open(schema_file, "w") as f:
+        f.write('{"swagger": "2.0", "paths": {}}')
+
+    with mock.patch.object(api_docs, "generate_schema") as generate:
+        response = admin_client.get(SCHEMA_URL)
+        not_modified = admin_client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=response["ETag"])
+        by_accept = admin_client.get("/api-docs/", HTTP_ACCEPT="application/openapi+json")
+
+    assert response.status_code == 200
+    assert response.content == b'{"swagger": "2.0", "paths": {}}'
+    assert response["Content-Type"] == "application/openapi+json"
+    assert "no-cache" in response["Cache-Control"]
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert by_accept.content == response.content
+    generate.assert_not_called()
+
+
+def test_schema_requires_authentication(schema_file, client):
+    call_command("build_api_schema", verbosity=0)
+
+    assert client.get(SCHEMA_URL).status_code == 403
+
+
+def test_missing_file_is_generated_once(schema_file, admin_client):
+    with mock.patch.object(api_docs, "generate_schema", return_value=b'{"paths": {}}') as generate:
+        first = admin_client.get(SCHEMA_URL)
+        second = admin_client.get(SCHEMA_URL)
+
+    assert first.content == second.content == b'{"paths": {}}'
+    assert first["ETag"] == second["ETag"]
+    assert generate.call_count == 1
+
+
+def test_live_schema(schema_file, settings, admin_client):
+    settings.API_DOCS_LIVE = True
+
+    response = admin_client.get(SCHEMA_URL)
+
+    assert response.status_code == 200
+    assert json.loads(response.content)["host"] == "testserver"
+    assert not schemas._schemas
+
+
+def test_ui_page_is_rendered_without_the_schema(schema_file, admin_client):
+    with mock.patch.object(api_docs, "generate_schema") as generate:
+        response = admin_client.get("/api-docs/")
+
+    assert response.status_code == 200
+    assert b"swagger-ui" in response.content
+    generate.assert_not_called()
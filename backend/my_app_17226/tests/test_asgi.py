@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from django.core.wsgi import get_wsgi_application
+from django.http import StreamingHttpResponse
+
+from my_app_17226.asgi_handler import ASGIHandler
+
+
+def call(application, path, method="GET", body=b"", headers=()):
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")] + list(headers),
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 12345),
+    }
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+@pytest.fixture
+def application():
+    handler = ASGIHandler(get_wsgi_application(), max_workers=2)
+    yield handler
+    handler.executor.shutdown()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_home_page(application):
+    start, body = call(application, "/")
+    assert start["status"] == 200
+    assert (b"content-type", b"text/html; charset=utf-8") in start["headers"]
+    assert b"My App" in body["body"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_request_body_and_headers_reach_django(application):
+    start, body = call(
+        application,
+        "/api/v1/login/",
+        method="POST",
+        body=b'{"username": "nobody", "password": "wrong"}',
+        headers=[(b"content-type", b"application/json")],
+    )
+    assert start["status"] == 400
+    assert b"non_field_errors" in body["body"]
+
+
+def test_streaming_responses_are_sent_in_chunks(application):
+    def wsgi_application(environ, start_response):
+        response = StreamingHttpResponse(iter([b"a", b"b", b"c"]))
+        start_response("200 OK", list(response.items()))
+        return response
+
+    application.wsgi_application = wsgi_application
+    messages = call(application, "/")
+    assert [m.get("body") for m in messages[1:]] == [b"a", b"b", b"c", b""]
@@ -0,0 +1,109 @@
+import re
+
+import pytest
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from home.api.v1.authentication import token_cache
+from my_app_17226.metrics import HISTOGRAMS, Histogram
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_histograms():
+    for histogram in HISTOGRAMS.values():
+        histogram.clear()
+
+
+def server_timing(response):
+    return {
+        match.group(1): float(match.group(2))
+        for match in re.finditer(r"(\w+);dur=([\d.]+)", response["Server-Timing"])
+    }
+
+
+def test_server_timing_header(client):
+    response = client.get(reverse("home"))
+
+    timing = server_timing(response)
+    assert set(timing) == {"sql", "serialize", "render", "total"}
+    assert timing["render"] > 0
+    assert timing["total"] >= timing["render"]
+
+
+@pytest.mark.parametrize("url", ["/api/v1/customtext/", "/api/v1/users/search/?q=admin"])
+def test_counts_queries_and_serializer_time(admin_client, url):
+    response = admin_client.get(url)
+
+    assert re.search(r'sql;dur=[\d.]+;desc="\d+ queries"', response["Server-Timing"])
+    timing = server_timing(response)
+    assert timing["serialize"] > 0
+    assert timing["render"] > 0
+
+
+def test_metrics_endpoint_exposes_histograms(admin_client):
+    admin_client.get("/api/v1/customtext/")
+    admin_client.get("/api/v1/customtext/")
+
+    response = admin_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.content.decode()
+    assert "# TYPE django_request_duration_seconds histogram" in body
+    assert 'django_request_duration_seconds_count{view="customtext-list"} 2' in body
+    assert 'django_request_queries_bucket{view="customtext-list",le="+Inf"} 2' in body
+    # Scrapes are not recorded themselves.
+    assert 'view="metrics"' not in body
+
+
+def test_metrics_endpoint_exposes_token_cache_stats(admin_client, admin_user):
+    token_cache.reset_stats()
+    token = Token.objects.create(user=admin_user)
+    for _ in range(2):
+        APIClient().get("/api/v1/customtext/", HTTP_AUTHORIZATION="Token %s" % token.key)
+
+    body = admin_client.get("/metrics").content.decode()
+
+    assert "# TYPE django_token_auth_cache_events_total counter" in body
+    assert 'django_token_auth_cache_events_total{event="misses"} 1' in body
+    assert 'django_token_auth_cache_events_total{event="hits"} 1' in body
+    assert re.search(r"^django_token_auth_cache_size \d+$", body, re.M)
+
+
+def test_unsampled_requests_are_not_recorded(admin_client, settings):
+    settings.METRICS_SAMPLE_RATE = 0
+
+    response = admin_client.get("/api/v1/customtext/")
+
+    assert "Server-Timing" not in response
+    assert "customtext-list" not in HISTOGRAMS["total"].expose()
+
+
+def test_metrics_require_staff_or_token(client, user, settings):
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer ").status_code == 403
+    client.force_login(user)
+    assert client.get("/metrics").status_code == 403
+    client.logout()
+
+    settings.METRICS_TOKEN = "secret"
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").status_code == 200
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", (0.1, 1))
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.observe('say "hi"', value)
+
+    assert histogram.expose().splitlines()[2:] == [
+        'test_seconds_bucket{view="say \\"hi\\"",le="0.1"} 2',
+        'test_seconds_bucket{view="say \\"hi\\"",le="1"} 3',
+        'test_seconds_bucket{view="say \\"hi\\"",le="+Inf"} 4',
+        'test_seconds_sum{view="say \\"hi\\""} 5.65',
+        'test_seconds_count{view="say \\"hi\\""} 4',
+    ]
@@ -0,0 +1,161 @@
+import json
+from unittest import mock
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from home.models import CustomText
+from my_app_17226 import page_cache
+from my_app_17226.checks import check_page_cache
+from users.tests.factories import UserFactory
+from users.views import UserDetailView
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def enabled(settings):
+    # Off by default without a shared CACHE_URL.
+    settings.PAGE_CACHE_ENABLED = True
+
+
+def logged_in(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def wait_for_cdn_purges():
+    page_cache._cdn_executor.submit(lambda: None).result()
+
+
+def test_anonymous_pages_are_cached_and_tagged(client, django_assert_num_queries):
+    first = client.get(reverse("home"))
+
+    with django_assert_num_queries(0):
+        second = client.get(reverse("home"))
+    assert second.content == first.content
+    assert second["Surrogate-Key"] == "homepage pages"
+    assert second["X-Frame-Options"] == first["X-Frame-Options"]
+
+
+def test_homepage_is_purged_on_save_and_bulk_update(client, admin_client, on_commit_callbacks):
+    customtext = CustomText.objects.first()
+    client.get(reverse("home"))
+
+    customtext.title = "Saved title"
+    with on_commit_callbacks():
+        customtext.save()
+    assert b"Saved title" in client.get(reverse("home")).content
+
+    with on_commit_callbacks():
+        response = admin_client.patch(
+            "/api/v1/customtext/bulk/",
+            json.dumps([{"id": customtext.pk, "title": "Bulk title"}]),
+            content_type="application/json",
+        )
+    assert response.status_code == 200
+    assert b"Bulk title" in client.get(reverse("home")).content
+
+
+def test_pages_vary_on_the_user():
+    owner, visitor = UserFactory(), UserFactory()
+    url = reverse("users:detail", kwargs={"username": owner.username})
+    owner_client, visitor_client = logged_in(owner), logged_in(visitor)
+
+    owner_page = owner_client.get(url)
+    visitor_page = visitor_client.get(url)
+    assert b"My Info" in owner_page.content
+    assert b"My Info" not in visitor_page.content
+    assert owner_client.get(url).content == owner_page.content
+    assert visitor_client.get(url).content == visitor_page.content
+    assert visitor_page["Surrogate-Key"] == "pages user:%d user:%d" % tuple(sorted((owner.pk, visitor.pk)))
+
+
+def test_user_pages_are_purged_when_the_user_changes(on_commit_callbacks):
+    owner, visitor = UserFactory(name="Old name"), UserFactory()
+    url = reverse("users:detail", kwargs={"username": owner.username})
+    client = logged_in(visitor)
+    client.get(url)
+
+    with on_commit_callbacks():
+        owner.name = "New name"
+        owner.save()
+        # Not purged before the commit, a render now would read the old row.
+        assert b"Old name" in client.get(url).content
+
+    response = client.get(url)
+    assert b"New name" in response.content
+
+
+def test_purge_during_the_render_is_not_missed(user):
+    client = logged_in(user)
+    url = reverse("users:detail", kwargs={"username": user.username})
+    get_context_data = UserDetailView.get_context_data
+
+    def purged_while_rendering(view, **kwargs):
+        page_cache.purge(page_cache.user_key(user.pk))
+        return get_context_data(view, **kwargs)
+
+    with mock.patch.object(UserDetailView, "get_context_data", autospec=True,
+                           side_effect=purged_while_rendering) as mocked:
+        client.get(url)
+        client.get(url)
+    assert mocked.call_count == 2
+
+
+def test_csrf_forms_are_not_cached(client):
+    first = client.get(reverse("account_login"))
+    second = client.get(reverse("account_login"))
+
+    assert first.status_code == second.status_code == 200
+    assert "Surrogate-Key" not in second
+    assert first.cookies["csrftoken"].value
+    assert second.cookies["csrftoken"].value
+
+
+def test_excluded_and_non_html_responses_are_not_cached(admin_client):
+    assert "Surrogate-Key" not in admin_client.get("/admin/")
+    assert "Surrogate-Key" not in admin_client.get("/api/v1/customtext/")
+
+
+def test_evicted_key_versions_are_misses(user):
+    client = logged_in(user)
+    url = reverse("users:detail", kwargs={"username": user.username})
+    client.get(url)
+
+    with mock.patch.object(UserDetailView, "get_object", autospec=True,
+                           side_effect=UserDetailView.get_object) as get_object:
+        client.get(url)
+        assert get_object.call_count == 0
+        page_cache.get_cache().delete(page_cache.KEY_VERSION_PREFIX + page_cache.ALL_PAGES)
+        client.get(url)
+        assert get_object.call_count == 1
+
+
+def test_cdn_headers_and_purge(settings, client, user):
+    settings.PAGE_CACHE_CDN_PURGE_URL = "https://api.fastly.example/service/abc/purge"
+    settings.PAGE_CACHE_CDN_TOKEN = "secret"
+
+    anonymous = client.get(reverse("home"))
+    assert anonymous["Surrogate-Control"] == "max-age=%d" % settings.PAGE_CACHE_TIMEOUT
+    authenticated = logged_in(user).get(reverse("home"))
+    assert "private" in authenticated["Cache-Control"]
+    assert "Surrogate-Control" not in authenticated
+
+    with mock.patch.object(page_cache.requests, "post") as post:
+        page_cache.purge(page_cache.HOMEPAGE, page_cache.user_key(user.pk))
+        wait_for_cdn_purges()
+    post.assert_called_once_with(
+        settings.PAGE_CACHE_CDN_PURGE_URL,
+        headers={"Fastly-Key": "secret", "Surrogate-Key": "homepage user:%d" % user.pk},
+        timeout=settings.PAGE_CACHE_CDN_TIMEOUT,
+    )
+
+
+def test_check_warns_about_a_per_process_cache(settings):
+    assert [warning.id for warning in check_page_cache(None)] == ["my_app_17226.W002"]
+
+    settings.PAGE_CACHE_ENABLED = False
+    assert check_page_cache(None) == []
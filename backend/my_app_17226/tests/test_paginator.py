@@ -0,0 +1,56 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from home.models import CustomText
+from my_app_17226.db import paginator
+from my_app_17226.db.paginator import EstimatedCountPaginator, estimate_count
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def rows():
+    CustomText.objects.bulk_create(CustomText(title="Text %d" % i) for i in range(25))
+    return CustomText.objects.order_by("id")
+
+
+def test_sqlite_counts_exactly(rows):
+    assert estimate_count(rows) is None
+
+    pages = EstimatedCountPaginator(rows, 10)
+
+    assert pages.count == rows.count()
+    assert not pages.estimated
+
+
+def test_uses_estimate_above_threshold(rows, monkeypatch, settings):
+    settings.ESTIMATED_COUNT_THRESHOLD = 100
+    monkeypatch.setattr(paginator, "estimate_count", lambda queryset: 1000)
+
+    pages = EstimatedCountPaginator(rows, 10)
+    with CaptureQueriesContext(connection) as queries:
+        assert pages.count == 1000
+    assert pages.estimated
+    assert len(queries) == 0
+    assert pages.num_pages == 100
+
+
+def test_counts_below_threshold(rows, monkeypatch, settings):
+    settings.ESTIMATED_COUNT_THRESHOLD = 100
+    monkeypatch.setattr(paginator, "estimate_count", lambda queryset: 99)
+
+    pages = EstimatedCountPaginator(rows, 10)
+
+    assert pages.count == rows.count()
+    assert not pages.estimated
+
+
+def test_estimated_last_page_is_not_cut(rows, monkeypatch, settings):
+    settings.ESTIMATED_COUNT_THRESHOLD = 0
+    # ANALYZE ran before the last rows were inserted.
+    monkeypatch.setattr(paginator, "estimate_count", lambda queryset: 15)
+
+    page = EstimatedCountPaginator(rows, 10).page(2)
+
+    assert len(page.object_list) == 10
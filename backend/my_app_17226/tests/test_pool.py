@@ -0,0 +1,157 @@
+import json
+import sqlite3
+import threading
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import OperationalError, connections
+from django.http import JsonResponse
+from django.urls import path
+
+from my_app_17226.db import pool as pool_module
+from my_app_17226.db.pool import DEFAULTS, ConnectionPool, PoolTimeout, get_pool, get_pool_stats
+
+
+@pytest.fixture
+def connect(tmp_path):
+    path = str(tmp_path / "pool.db")
+    return lambda: sqlite3.connect(path, check_same_thread=False)
+
+
+def test_connections_are_reused(connect):
+    pool = ConnectionPool(connect, max_size=2)
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    assert pool.stats()["connections_created"] == 1
+    assert pool.stats()["in_use"] == 1
+
+
+def test_min_size_is_opened_up_front(connect):
+    pool = ConnectionPool(connect, min_size=2)
+    pool.fill()
+    assert pool.stats()["idle"] == 2
+
+
+def test_acquire_waits_then_times_out(connect):
+    pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+    connection = pool.acquire()
+    with pytest.raises(PoolTimeout) as excinfo:
+        pool.acquire()
+    assert isinstance(excinfo.value, OperationalError)
+
+    threading.Timer(0.01, pool.release, [connection]).start()
+    pool.timeout = 5
+    assert pool.acquire() is connection
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["waits"] == 1
+    assert stats["wait_time_ms"] > 0
+
+
+def test_connections_are_recycled_after_max_uses(connect):
+    pool = ConnectionPool(connect, max_uses=2)
+    first = pool.acquire()
+    pool.release(first)
+    pool.release(pool.acquire())
+    assert pool.acquire() is not first
+    assert pool.stats()["recycled"] == 1
+
+
+def test_broken_connections_fail_the_pre_ping(connect):
+    pool = ConnectionPool(connect)
+    first = pool.acquire()
+    pool.release(first)
+    first.close()
+    assert pool.acquire() is not first
+    assert pool.stats()["failed_pings"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_idle_connections_expire(connect):
+    pool = ConnectionPool(connect, idle_timeout=0.01)
+    first = pool.acquire()
+    second = pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    threading.Event().wait(0.02)
+    pool.acquire()
+    assert pool.stats()["connections_closed"] == 2
+    assert pool.stats()["size"] == 1
+
+
+def test_pool_is_rebuilt_when_the_connection_params_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(pool_module, "_pools", {})
+    connect = {
+        name: lambda name=name: sqlite3.connect(str(tmp_path / name), check_same_thread=False)
+        for name in ("live.db", "test.db")
+    }
+
+    live = get_pool("db", {"database": "live.db"}, connect["live.db"], DEFAULTS)
+    in_use = live.acquire()
+    live.release(live.acquire())
+    assert get_pool("db", {"database": "live.db"}, connect["live.db"], DEFAULTS) is live
+
+    test = get_pool("db", {"database": "test.db"}, connect["test.db"], DEFAULTS)
+    assert test is not live
+    assert live.retired
+    assert live.stats()["idle"] == 0
+    live.release(in_use)
+    assert live.stats()["size"] == 0
+    assert test.acquire().execute("PRAGMA database_list").fetchone()[2].endswith("test.db")
+
+
+@pytest.mark.django_db
+def test_pool_endpoint_is_staff_only(client, admin_client):
+    assert client.get("/api/v1/db-pool/").status_code == 403
+    assert admin_client.get("/api/v1/db-pool/").status_code == 200
+
+
+def pooled_view(request):
+    connections["pooled"].cursor().execute("SELECT 1")
+    return JsonResponse(get_pool_stats()["pooled"])
+
+
+urlpatterns = [path("pooled/", pooled_view)]
+
+
+@pytest.fixture
+def pooled_alias(tmp_path, monkeypatch, settings, django_db_blocker):
+    settings.ROOT_URLCONF = __name__
+    monkeypatch.setattr(pool_module, "_pools", {})
+    connections.databases["pooled"] = {
+        "ENGINE": "my_app_17226.db.backends.sqlite3",
+        "NAME": str(tmp_path / "pooled.db"),
+        "POOL": DEFAULTS,
+    }
+    with django_db_blocker.unblock():
+        yield "pooled"
+        connections["pooled"].close()
+    del connections.databases["pooled"]
+    del connections["pooled"]
+
+
+def test_requests_return_their_connection_to_the_pool(pooled_alias):
+    # The test Client disconnects close_old_connections from the request
+    # signals, go through the handler a WSGI server calls instead.
+    handler = WSGIHandler()
+
+    def get(url):
+        environ = {"PATH_INFO": url}
+        setup_testing_defaults(environ)
+        response = handler(environ, lambda status, headers: None)
+        body = b"".join(response)
+        response.close()
+        return json.loads(body.decode())
+
+    during = get("/pooled/")
+    assert during["in_use"] == 1
+    assert get_pool_stats()["pooled"]["in_use"] == 0
+    assert get_pool_stats()["pooled"]["idle"] == 1
+
+    assert get("/pooled/")["in_use"] == 1
+    stats = get_pool_stats()["pooled"]
+    assert stats["acquired"] == 2
+    assert stats["connections_created"] == 1
+    assert stats["in_use"] == 0
@@ -0,0 +1,141 @@
+import pytest
+from allauth.account.models import EmailAddress
+from django.core.cache import cache
+from django.urls import reverse
+
+from home.models import CustomText
+from my_app_17226.db.routers import pin_keys
+from users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db(databases=["default", "replica_1"])
+
+
+@pytest.fixture(autouse=True)
+def replica(settings):
+    settings.DATABASE_REPLICAS = ["replica_1"]
+    return "replica_1"
+
+
+def replicate(instance):
+    type(instance)._default_manager.using("replica_1").bulk_create([instance])
+
+
+@pytest.fixture
+def staff(client):
+    user = UserFactory(is_staff=True)
+    replicate(user)
+    client.force_login(user)
+    return user
+
+
+@pytest.fixture
+def text():
+    text = CustomText.objects.create(title="Primary")
+    replicate(text)
+    return text
+
+
+def test_safe_requests_read_from_the_replica(client, staff, text):
+    CustomText.objects.filter(pk=text.pk).update(title="Not replicated yet")
+
+    response = client.get("/api/v1/customtext/%d/" % text.pk)
+
+    assert response.json()["title"] == "Primary"
+
+
+def test_writes_go_to_the_primary(client, staff, text):
+    response = client.patch(
+        "/api/v1/customtext/%d/" % text.pk, {"title": "Patched"}, content_type="application/json"
+    )
+
+    assert response.status_code == 200
+    assert CustomText.objects.using("default").get(pk=text.pk).title == "Patched"
+    assert CustomText.objects.using("replica_1").get(pk=text.pk).title == "Primary"
+
+
+def test_reads_after_a_write_stay_on_the_primary(client, staff, text, settings, request_factory):
+    client.patch("/api/v1/customtext/%d/" % text.pk, {"title": "Patched"}, content_type="application/json")
+
+    assert client.get("/api/v1/customtext/%d/" % text.pk).json()["title"] == "Patched"
+
+    # Once the window is over, the replica is expected to have caught up.
+    request = request_factory.get("/")
+    request.COOKIES = {name: cookie.value for name, cookie in client.cookies.items()}
+    cache.delete_many(pin_keys(request))
+    assert client.get("/api/v1/customtext/%d/" % text.pk).json()["title"] == "Primary"
+
+
+def test_other_clients_are_not_pinned(client, staff, text):
+    client.patch("/api/v1/customtext/%d/" % text.pk, {"title": "Patched"}, content_type="application/json")
+
+    other = UserFactory(is_staff=True)
+    replicate(other)
+    client.force_login(other)
+
+    assert client.get("/api/v1/customtext/%d/" % text.pk).json()["title"] == "Primary"
+
+
+def test_user_update_pins_the_session(client):
+    user = UserFactory(name="Before")
+    replicate(user)
+    client.force_login(user)
+
+    client.post(reverse("users:update"), {"name": "After"})
+
+    response = client.get(reverse("users:detail", kwargs={"username": user.username}))
+    assert response.context["object"].name == "After"
+
+
+@pytest.mark.parametrize(
+    "url, login, key", [("/api/v1/login/", "username", "token"), ("/rest-auth/login/", "email", "key")]
+)
+def test_token_issued_at_login_is_pinned(client, text, url, login, key):
+    user = UserFactory(is_staff=True)
+    user.set_password("password")
+    user.save()
+    EmailAddress.objects.create(user=user, email=user.email, primary=True, verified=True)
+    replicate(user)
+
+    response = client.post(url, {login: getattr(user, login), "password": "password"})
+    assert response.status_code == 200
+    client.cookies.clear()
+
+    # The token only exists on the primary yet.
+    authorization = "Token %s" % response.json()[key]
+    response = client.get("/api/v1/customtext/%d/" % text.pk, HTTP_AUTHORIZATION=authorization)
+    assert response.status_code == 200
+
+
+def test_reads_outside_requests_use_the_primary(text):
+    CustomText.objects.filter(pk=text.pk).update(title="Primary only")
+
+    assert CustomText.objects.get(pk=text.pk).title == "Primary only"
+
+
+def test_no_replicas_configured(client, staff, text, settings):
+    settings.DATABASE_REPLICAS = []
+    CustomText.objects.filter(pk=text.pk).update(title="Primary only")
+
+    assert client.get("/api/v1/customtext/%d/" % text.pk).json()["title"] == "Primary only"
+
+
+def test_home_content_cache_is_filled_from_the_primary(client, settings):
+    settings.HOME_CACHE_ENABLED = True
+    text = CustomText.objects.first()
+    CustomText.objects.using("replica_1").filter(pk=text.pk).update(title="Replicated title")
+    CustomText.objects.filter(pk=text.pk).update(title="Primary title")
+
+    assert b"Primary title" in client.get(reverse("home")).content
+
+
+def test_page_cache_misses_are_rendered_from_the_primary(client, staff, settings):
+    settings.PAGE_CACHE_ENABLED = True
+    settings.HOME_CACHE_ENABLED = False
+    type(staff).objects.filter(pk=staff.pk).update(name="Primary name")
+    url = reverse("users:detail", kwargs={"username": staff.username})
+
+    assert b"Primary name" in client.get(url).content
+    # Served from the page cache.
+    cached = client.get(url)
+    assert cached.context is None
+    assert b"Primary name" in cached.content
@@ -0,0 +1,117 @@
+import pytest
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from my_app_17226.checks import check_session_cache
+from my_app_17226.sessions import SessionStore
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def session_engine(settings):
+    # The engine is only the default with a shared CACHE_URL.
+    settings.SESSION_ENGINE = "my_app_17226.sessions"
+
+
+def session_queries(queries):
+    return [query["sql"] for query in queries if "django_session" in query["sql"]]
+
+
+@pytest.fixture
+def logged_in(client, user):
+    client.force_login(user)
+    return client
+
+
+def test_login_is_written_to_the_database(logged_in, user):
+    session = Session.objects.get(session_key=logged_in.session.session_key)
+
+    assert session.get_decoded()["_auth_user_id"] == str(user.pk)
+
+
+def test_logged_in_page_views_skip_the_session_table(logged_in, user):
+    url = reverse("users:detail", kwargs={"username": user.username})
+    logged_in.get(url)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert logged_in.get(url).status_code == 200
+        assert logged_in.post(reverse("users:update"), {"name": "New"}).status_code == 302
+
+    assert session_queries(queries) == []
+
+
+def test_login_survives_losing_the_cache(logged_in, user):
+    cache.clear()
+
+    response = logged_in.get(reverse("users:detail", kwargs={"username": user.username}))
+
+    assert response.status_code == 200
+    assert response.context["user"] == user
+
+
+def test_changes_are_written_behind(settings):
+    settings.SESSION_DB_SYNC_INTERVAL = 60
+    session = SessionStore()
+    session["_auth_user_id"] = "1"
+    session.save()
+    key = session.session_key
+
+    session = SessionStore(key)
+    session["cart"] = [1, 2]
+    session.save()
+    assert "cart" not in Session.objects.get(session_key=key).get_decoded()
+    assert SessionStore(key)["cart"] == [1, 2]
+
+    settings.SESSION_DB_SYNC_INTERVAL = 0
+    session = SessionStore(key)
+    session["cart"] = [1, 2, 3]
+    session.save()
+    assert Session.objects.get(session_key=key).get_decoded()["cart"] == [1, 2, 3]
+
+
+def test_anonymous_sessions_stay_in_the_cache():
+    session = SessionStore()
+    session["theme"] = "dark"
+    session.save()
+
+    assert not Session.objects.filter(session_key=session.session_key).exists()
+    assert SessionStore(session.session_key)["theme"] == "dark"
+
+
+def test_unchanged_save_is_skipped(django_assert_num_queries, settings):
+    settings.SESSION_DB_SYNC_INTERVAL = 0
+    session = SessionStore()
+    session["_auth_user_id"] = "1"
+    session.save()
+
+    session = SessionStore(session.session_key)
+    session["_auth_user_id"] = "1"
+    cache.delete(session.cache_key)
+    with django_assert_num_queries(0):
+        session.save()
+    assert session.cache_key not in cache
+
+
+def test_logout_deletes_everywhere(logged_in):
+    key = logged_in.session.session_key
+
+    logged_in.get(reverse("account_logout"))
+    logged_in.post(reverse("account_logout"))
+
+    assert not Session.objects.filter(session_key=key).exists()
+    assert SessionStore(key).load() == {}
+
+
+def test_check_warns_about_a_per_process_cache(settings):
+    assert [warning.id for warning in check_session_cache(None)] == ["my_app_17226.W001"]
+
+    settings.CACHES = {"default": {"BACKEND": "django_redis.cache.RedisCache", "LOCATION": "redis://redis:6379/1"}}
+    assert check_session_cache(None) == []
+
+    settings.SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    assert check_session_cache(None) == []
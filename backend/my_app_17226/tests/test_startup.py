@@ -0,0 +1,62 @@
+import pytest
+
+from my_app_17226.startup import parse_import_times, profile_startup
+
+# Cold start of the production profile: settings, apps and URLconf. About
+# 0.5s on a laptop; the margin is for slow CI machines.
+STARTUP_BUDGET_MS = 3000
+
+DEV_ONLY_MODULES = ("django_extensions", "drf_yasg.views", "drf_yasg.generators")
+
+
+def imported(profile):
+    return {module["module"] for module in profile["modules"]}
+
+
+@pytest.fixture(scope="module")
+def production():
+    return profile_startup(env={"DEBUG": "0", "SETTINGS_PROFILE": "production"})
+
+
+def test_production_startup_stays_within_budget(production):
+    assert set(production["phases"]) == {"settings", "apps", "urls"}
+    assert production["total_ms"] <= STARTUP_BUDGET_MS, production["phases"]
+
+
+def test_production_profile_skips_dev_only_modules(production):
+    modules = imported(production)
+
+    assert "home.signals" in modules
+    for module in modules:
+        assert not module.startswith(DEV_ONLY_MODULES), module
+
+
+def test_ready_cost_is_reported_per_app(production):
+    assert production["ready"]["home"] > 0
+    assert "django_extensions" not in production["ready"]
+    assert production["packages"]["django"] > 0
+
+
+def test_development_profile_loads_dev_apps():
+    profile = profile_startup(env={"SETTINGS_PROFILE": "development"}, urlconf=False)
+
+    assert "django_extensions" in profile["ready"]
+    assert "urls" not in profile["phases"]
+
+
+def test_failed_startup_raises():
+    with pytest.raises(RuntimeError, match="SETTINGS_PROFILE_MISSING"):
+        profile_startup(env={"DJANGO_SETTINGS_MODULE": "SETTINGS_PROFILE_MISSING"})
+
+
+def test_parse_import_times():
+    modules = parse_import_times(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:       300 |        420 | json\n"
+    )
+
+    assert modules == [
+        {"module": "json.decoder", "self_ms": 0.12, "cumulative_ms": 0.12, "depth": 1},
+        {"module": "json", "self_ms": 0.3, "cumulative_ms": 0.42, "depth": 0},
+    ]
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+from django.conf import settings as django_settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import HttpResponse
+
+from my_app_17226.static import StaticFilesMiddleware
+
+CSS = "body { color: #333; }\n" * 200
+
+
+@pytest.fixture
+def static_files(settings, tmp_path):
+    source = tmp_path / "static"
+    (source / "css").mkdir(parents=True)
+    (source / "css" / "site.css").write_text(CSS)
+    settings.STATICFILES_DIRS = [str(source)]
+    settings.STATICFILES_FINDERS = ["django.contrib.staticfiles.finders.FileSystemFinder"]
+    settings.STATIC_ROOT = str(tmp_path / "staticfiles")
+    settings.STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+    settings.DEBUG = False
+    call_command("collectstatic", interactive=False, verbosity=0)
+    return staticfiles_storage.url("css/site.css")
+
+
+@pytest.fixture
+def middleware(static_files):
+    return StaticFilesMiddleware(get_response=lambda request: HttpResponse("app"))
+
+
+def content(response):
+    return b"".join(response.streaming_content)
+
+
+def test_serves_before_rest_of_stack():
+    middleware = django_settings.MIDDLEWARE
+    assert middleware.index("my_app_17226.static.StaticFilesMiddleware") == 1
+    assert middleware[0] == "django.middleware.security.SecurityMiddleware"
+
+
+def test_collectstatic_writes_compressed_variants(static_files, settings):
+    path = os.path.join(settings.STATIC_ROOT, static_files[len(settings.STATIC_URL):])
+    assert os.path.exists(path + ".br")
+    assert os.path.exists(path + ".gz")
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [("gzip, deflate, br", "br"), ("gzip", "gzip"), ("", None)])
+def test_negotiates_encoding(middleware, static_files, request_factory, accept_encoding, encoding):
+    response = middleware(request_factory.get(static_files, HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    assert response.status_code == 200
+    assert response.get("Content-Encoding") == encoding
+    assert "Accept-Encoding" in response["Vary"]
+    assert int(response["Content-Length"]) == len(content(response))
+
+
+def test_hashed_names_are_immutable(middleware, static_files, request_factory):
+    hashed = middleware(request_factory.get(static_files))
+    unhashed = middleware(request_factory.get("/static/css/site.css"))
+
+    assert "immutable" in hashed["Cache-Control"]
+    assert "max-age=315360000" in hashed["Cache-Control"]
+    assert "immutable" not in unhashed["Cache-Control"]
+
+
+def test_served_from_memory(middleware, static_files, request_factory, settings):
+    for name in os.listdir(os.path.join(settings.STATIC_ROOT, "css")):
+        os.remove(os.path.join(settings.STATIC_ROOT, "css", name))
+
+    response = middleware(request_factory.get(static_files))
+
+    assert content(response) == CSS.encode()
+
+
+def test_large_files_are_read_from_disk(static_files, request_factory, settings):
+    settings.WHITENOISE_MEMORY_MAX_SIZE = 10
+    middleware = StaticFilesMiddleware(get_response=lambda request: HttpResponse("app"))
+
+    response = middleware(request_factory.get(static_files, HTTP_ACCEPT_ENCODING="gzip"))
+
+    assert not middleware.files[static_files].contents
+    assert response["Content-Encoding"] == "gzip"
+    assert hasattr(response.file_to_stream, "fileno")
+    response.file_to_stream.close()
+
+
+def test_range_requests(middleware, static_files, request_factory):
+    response = middleware(request_factory.get(static_files, HTTP_RANGE="bytes=0-3"))
+
+    assert response.status_code == 206
+    assert response["Content-Range"] == "bytes 0-3/%d" % len(CSS)
+    assert content(response) == CSS.encode()[:4]
+
+
+def test_other_paths_fall_through(middleware, request_factory):
+    response = middleware(request_factory.get("/"))
+
+    assert response.content == b"app"
@@ -16,9 +16,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from allauth.account.views import confirm_email
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from django.conf import settings
+
+from home.api.v1.viewsets import RestAuthLoginView, RestAuthRegisterView
+from my_app_17226.api_schema import api_docs
+from my_app_17226.metrics import metrics
 
 urlpatterns = [
     path("", include("home.urls")),
@@ -26,10 +28,13 @@ urlpatterns = [
     path("api/v1/", include("home.api.v1.urls")),
     path("admin/", admin.site.urls),
     path("users/", include("users.urls", namespace="users")),
+    path("rest-auth/login/", RestAuthLoginView.as_view(), name="rest_login"),
     path("rest-auth/", include("rest_auth.urls")),
     # Override email confirm to use allauth's HTML view instead of rest_auth's API view
     path("rest-auth/registration/account-confirm-email/<str:key>/", confirm_email),
+    path("rest-auth/registration/", RestAuthRegisterView.as_view(), name="rest_register"),
     path("rest-auth/registration/", include("rest_auth.registration.urls")),
+    path("metrics", metrics, name="metrics"),
 ]
 
 admin.site.site_header = "My App"
@@ -37,16 +42,5 @@ admin.site.site_title = "My App Admin Portal"
 admin.site.index_title = "My App Admin"
 
 # swagger
-schema_view = get_schema_view(
-    openapi.Info(
-        title="My App API",
-        default_version="v1",
-        description="API documentation for My App App",
-    ),
-    public=True,
-    permission_classes=(permissions.IsAuthenticated,),
-)
-
-urlpatterns += [
-    path("api-docs/", schema_view.with_ui("swagger", cache_timeout=0), name="api_docs")
-]
+if settings.API_DOCS_ENABLED:
+    urlpatterns += [path("api-docs/", api_docs, name="api_docs")]
@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth import admin as auth_admin
 from django.contrib.auth import get_user_model
 
+from my_app_17226.db.paginator import EstimatedCountPaginator
 from users.forms import UserChangeForm, UserCreationForm
+from users.search import search_users
 
 User = get_user_model()
 
@@ -14,4 +17,17 @@ class UserAdmin(auth_admin.UserAdmin):
     add_form = UserCreationForm
     fieldsets = (("User", {"fields": ("name",)}),) + auth_admin.UserAdmin.fieldsets
     list_display = ["username", "name", "is_superuser"]
-    search_fields = ["name"]
+    search_fields = ["name", "email", "username"]
+    # Estimated totals on large tables, and no second count of the whole
+    # table when a filter or search is applied.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def list_max_show_all(self):
+        return settings.USER_ADMIN_MAX_SHOW_ALL
+
+    def get_search_results(self, request, queryset, search_term):
+        # Answered by the index of users.search instead of icontains over
+        # search_fields, which scans the whole table.
+        return search_users(queryset, search_term), False
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+# Kept in sync with users.search, which queries these by name.
+FTS_TABLE = "users_user_search"
+TRIGRAM_INDEX = "users_user_search_trgm"
+SEARCH_FIELDS = ("name", "email", "username")
+
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', content_rowid='id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END",
+    "CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END",
+    "CREATE TRIGGER {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN {delete} {insert} END",
+    "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+]
+SQLITE_INSERT = "INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new});"
+SQLITE_DELETE = "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old});"
+
+
+def forwards(apps, schema_editor):
+    connection = schema_editor.connection
+    table = apps.get_model("users", "User")._meta.db_table
+    if connection.vendor == "postgresql":
+        quote = connection.ops.quote_name
+        name, email, username = ("%s.%s" % (quote(table), quote(field)) for field in SEARCH_FIELDS)
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS %s ON %s USING gin "
+            "((COALESCE(%s, '') || ' ' || %s || ' ' || %s) gin_trgm_ops)"
+            % (TRIGRAM_INDEX, table, name, email, username)
+        )
+    elif connection.vendor == "sqlite" and connection.Database.sqlite_version_info >= (3, 34, 0):
+        columns = ", ".join(SEARCH_FIELDS)
+        names = dict(fts=FTS_TABLE, table=table, columns=columns)
+        insert = SQLITE_INSERT.format(new=", ".join("new.%s" % field for field in SEARCH_FIELDS), **names)
+        delete = SQLITE_DELETE.format(old=", ".join("old.%s" % field for field in SEARCH_FIELDS), **names)
+        for statement in SQLITE_INDEX:
+            schema_editor.execute(statement.format(insert=insert, delete=delete, **names))
+
+
+def backwards(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS %s" % TRIGRAM_INDEX)
+    elif connection.vendor == "sqlite":
+        for trigger in ("insert", "delete", "update"):
+            schema_editor.execute("DROP TRIGGER IF EXISTS %s_%s" % (FTS_TABLE, trigger))
+        schema_editor.execute("DROP TABLE IF EXISTS %s" % FTS_TABLE)
+
+
+class Migration(migrations.Migration):
+    """
+    Indexes name, email and username for users.search.search_users().
+
+    The expression of the PostgreSQL index must stay the one
+    users.search.search_expression() builds, or the index isn't used.
+
+    On SQLite, altering users_user in a later migration rebuilds the table and
+    drops the triggers that keep users_user_search in sync: such a migration
+    has to run backwards() and forwards() of this one again.
+    """
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
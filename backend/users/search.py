@@ -0,0 +1,83 @@
+"""
+Indexed search over the name, email and username of users.
+
+Every whitespace separated word of the search term must appear, in any
+case, somewhere in one of the three fields, like the admin's `icontains`
+search. The index that answers it depends on the database:
+
+* PostgreSQL: a pg_trgm GIN index on name, email and username joined
+  together, which serves `ILIKE '%word%'`.
+* SQLite: an FTS5 table with the trigram tokenizer (SQLite 3.34+), kept in
+  sync with users_user by triggers. Words shorter than three characters
+  have no trigram and are matched with LIKE on the rows the index returned.
+
+Without an index (other databases, or an SQLite too old for the trigram
+tokenizer) the search falls back to `icontains`.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Q
+
+SEARCH_FIELDS = ("name", "email", "username")
+FTS_TABLE = "users_user_search"
+
+
+def search_expression(connection):
+    # The expression of the pg_trgm index created by users/migrations/0002.
+    table = connection.ops.quote_name(get_user_model()._meta.db_table)
+    name, email, username = (
+        "%s.%s" % (table, connection.ops.quote_name(field)) for field in SEARCH_FIELDS
+    )
+    return "(COALESCE(%s, '') || ' ' || %s || ' ' || %s)" % (name, email, username)
+
+
+def has_fts_table(connection):
+    # Looked up once per connection wrapper, i.e. once per thread.
+    if not hasattr(connection, "_users_search_fts"):
+        connection._users_search_fts = FTS_TABLE in connection.introspection.table_names()
+    return connection._users_search_fts
+
+
+def contains_any_field(word):
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{"%s__icontains" % field: word})
+    return condition
+
+
+def escape_like(word):
+    return word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_users(queryset, term):
+    """Filter a User queryset down to the users matching `term`."""
+    words = term.split()
+    if not words:
+        return queryset
+    connection = connections[queryset.db]
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+
+    if connection.vendor == "postgresql":
+        expression = search_expression(connection)
+        for word in words:
+            queryset = queryset.extra(
+                where=["%s ILIKE %%s" % expression], params=["%" + escape_like(word) + "%"]
+            )
+        return queryset
+
+    if connection.vendor == "sqlite" and has_fts_table(connection):
+        indexed = [word for word in words if len(word) >= 3]
+        if indexed:
+            # Quoted strings match as substrings, several of them must all match.
+            match = " ".join('"%s"' % word.replace('"', '""') for word in indexed)
+            queryset = queryset.extra(
+                where=["%s.%s IN (SELECT rowid FROM %s WHERE %s MATCH %%s)" % (
+                    table, connection.ops.quote_name("id"), FTS_TABLE, FTS_TABLE,
+                )],
+                params=[match],
+            )
+        words = [word for word in words if len(word) < 3]
+
+    for word in words:
+        queryset = queryset.filter(contains_any_field(word))
+    return queryset
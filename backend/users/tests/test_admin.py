@@ -0,0 +1,34 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users():
+    return UserFactory.create_batch(5)
+
+
+def count_queries(queries):
+    return [query["sql"] for query in queries if query["sql"].startswith("SELECT COUNT(*)")]
+
+
+def test_filtered_changelist_counts_once(admin_client, users):
+    with CaptureQueriesContext(connection) as queries:
+        response = admin_client.get("/admin/users/user/", {"is_staff__exact": "0"})
+
+    assert response.status_code == 200
+    assert response.context["cl"].result_count == 5
+    assert len(count_queries(queries)) == 1
+
+
+@pytest.mark.parametrize("max_show_all, can_show_all", [(200, True), (0, False)])
+def test_show_all_link_is_optional(admin_client, users, settings, max_show_all, can_show_all):
+    settings.USER_ADMIN_MAX_SHOW_ALL = max_show_all
+
+    response = admin_client.get("/admin/users/user/")
+
+    assert response.context["cl"].can_show_all is can_show_all
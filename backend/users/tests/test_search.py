@@ -0,0 +1,92 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.search import FTS_TABLE, search_users
+from users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def users():
+    return {
+        "alice": UserFactory(username="alice", email="alice@example.com", name="Alice Liddell"),
+        "bob": UserFactory(username="bob", email="bob@builder.org", name="Bob the Builder"),
+        "carol": UserFactory(username="carol_99", email="c@example.net", name=None),
+    }
+
+
+def usernames(queryset):
+    return sorted(queryset.values_list("username", flat=True))
+
+
+@pytest.mark.parametrize(
+    "term, expected",
+    [
+        ("alice", ["alice"]),
+        ("LIDD", ["alice"]),
+        ("example", ["alice", "carol_99"]),
+        ("builder bob", ["bob"]),
+        ("example alice", ["alice"]),
+        ("c@", ["carol_99"]),
+        ("ol_9", ["carol_99"]),
+        ("%", []),
+        ("nobody", []),
+        ("  ", ["alice", "bob", "carol_99"]),
+    ],
+)
+def test_search_users(users, term, expected):
+    assert usernames(search_users(User.objects.all(), term)) == expected
+
+
+def test_uses_the_fts_index(users):
+    with CaptureQueriesContext(connection) as queries:
+        usernames(search_users(User.objects.all(), "alice"))
+
+    assert FTS_TABLE in queries[0]["sql"]
+    assert "LIKE" not in queries[0]["sql"]
+
+
+def test_index_follows_updates_and_deletes(users):
+    users["alice"].name = "Alice Kingsleigh"
+    users["alice"].save()
+    users["bob"].delete()
+    User.objects.bulk_create([User(username="dave", email="dave@example.com", name="Liddell")])
+
+    assert usernames(search_users(User.objects.all(), "liddell")) == ["dave"]
+    assert usernames(search_users(User.objects.all(), "kingsleigh")) == ["alice"]
+    assert usernames(search_users(User.objects.all(), "builder")) == []
+
+
+def test_admin_search(admin_client, users):
+    response = admin_client.get("/admin/users/user/", {"q": "builder"})
+
+    assert response.status_code == 200
+    assert [user.username for user in response.context["cl"].result_list] == ["bob"]
+
+
+def test_api_search(admin_client, users):
+    response = admin_client.get("/api/v1/users/search/", {"q": "example", "page_size": 2})
+
+    assert response.status_code == 200
+    assert response.json()["results"][1] == {
+        "id": users["alice"].pk, "username": "alice", "email": "alice@example.com", "name": "Alice Liddell",
+    }
+    assert response.json()["results"][0]["username"] == "admin"
+    second = admin_client.get(response.json()["next"]).json()
+    assert [user["username"] for user in second["results"]] == ["carol_99"]
+    assert second["next"] is None
+
+
+def test_api_search_requires_a_term(admin_client):
+    assert admin_client.get("/api/v1/users/search/").status_code == 400
+
+
+def test_api_search_is_staff_only(client, user):
+    client.force_login(user)
+
+    assert client.get("/api/v1/users/search/", {"q": "a"}).status_code == 403
@@ -2,7 +2,7 @@ import pytest
 from django.conf import settings
 from django.test import RequestFactory
 
-from users.views import UserRedirectView, UserUpdateView
+from users.views import UserDetailView, UserRedirectView, UserUpdateView
 
 pytestmark = pytest.mark.django_db
 
@@ -50,3 +50,23 @@ class TestUserRedirectView:
         view.request = request
 
         assert view.get_redirect_url() == f"/users/{user.username}/"
+
+
+class TestUserDetailView:
+    @pytest.mark.parametrize("page_cache_enabled, queries", [(False, 1), (True, 2)])
+    def test_get_object(
+        self,
+        user: settings.AUTH_USER_MODEL,
+        request_factory: RequestFactory,
+        settings,
+        django_assert_num_queries,
+        page_cache_enabled,
+        queries,
+    ):
+        # The primary key is only looked up first to tag the page for the page cache.
+        settings.PAGE_CACHE_ENABLED = page_cache_enabled
+        view = UserDetailView(kwargs={"username": user.username})
+        view.request = request_factory.get("/fake-url/")
+
+        with django_assert_num_queries(queries):
+            assert view.get_object() == user
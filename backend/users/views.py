@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse
 from django.views.generic import DetailView, RedirectView, UpdateView
 
+from my_app_17226.page_cache import add_surrogate_keys, user_key
+
 User = get_user_model()
 
 
@@ -12,6 +15,16 @@ class UserDetailView(LoginRequiredMixin, DetailView):
     slug_field = "username"
     slug_url_kwarg = "username"
 
+    def get_object(self, queryset=None):
+        queryset = self.get_queryset() if queryset is None else queryset
+        if settings.PAGE_CACHE_ENABLED:
+            # Tagged before the row is read, so that a purge in between isn't missed.
+            username = self.kwargs[self.slug_url_kwarg]
+            pk = queryset.filter(username=username).values_list("pk", flat=True).first()
+            if pk is not None:
+                add_surrogate_keys(self.request, user_key(pk))
+        return super().get_object(queryset)
+
 
 user_detail_view = UserDetailView.as_view()
 